@@ -0,0 +1,54 @@
+"""
+Benchmark configuration and the shared synthetic corpus.
+
+Run with pytest-benchmark (requirements-dev.txt); see "Performance
+Benchmarking" in docs/TESTING.md.
+"""
+
+import base64
+import os
+
+import django
+import pytest
+from django.test import override_settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_project.settings')
+django.setup()
+
+from benchmarks.corpus import RESOLUTIONS, corpus as build_corpus  # noqa: E402
+from face_liveness_capture.backend.face_utils import decode_image_bytes  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def corpus():
+    """{resolution name: JPEG bytes}, generated once per session"""
+    return {name: frames[0] for name, frames in build_corpus().items()}
+
+
+@pytest.fixture(params=list(RESOLUTIONS))
+def resolution(request):
+    return request.param
+
+
+@pytest.fixture
+def jpeg(corpus, resolution):
+    return corpus[resolution]
+
+
+@pytest.fixture
+def data_url(jpeg):
+    return 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()
+
+
+@pytest.fixture
+def frame(jpeg):
+    return decode_image_bytes(jpeg)
+
+
+@pytest.fixture(autouse=True)
+def isolated_backend(tmp_path):
+    """Store captures in a temp dir and disable the result cache"""
+    with override_settings(FACE_LIVENESS_CAPTURE_ROOT=str(tmp_path),
+                           FACE_LIVENESS_RESULT_CACHE=False,
+                           FACE_LIVENESS_WRITE_BEHIND=False):
+        yield tmp_path
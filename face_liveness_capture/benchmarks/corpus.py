@@ -0,0 +1,141 @@
+"""
+Deterministic synthetic image corpus for benchmarks and load tests.
+
+Frames are generated from a fixed seed, so every run (and every machine)
+benchmarks the same pixels without shipping or downloading photos. Each
+frame has a smooth textured background, a skin-toned head with eyes and
+mouth, and shoulders, which gives the decoder, detector and quality
+checks realistic work.
+
+Write the corpus to disk with::
+
+    python -m benchmarks.corpus corpus/
+"""
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+# Name -> (width, height), from VGA to 12 MP
+RESOLUTIONS = {
+    "vga": (640, 480),
+    "hd": (1280, 720),
+    "fhd": (1920, 1080),
+    "5mp": (2592, 1944),
+    "12mp": (4000, 3000),
+}
+JPEG_QUALITY = 90
+SEED = 5
+# Head roll angles (degrees) of the detector accuracy set
+TILTS = (-30, -15, 0, 15, 30)
+
+
+def synthetic_frame(width, height, seed=SEED):
+    """BGR frame with a face-like figure on a textured background."""
+    rng = np.random.default_rng(seed)
+    # Low-frequency texture, upsampled so it compresses like a photo
+    texture = rng.integers(70, 190, (max(height // 32, 2), max(width // 32, 2)), dtype=np.uint8)
+    texture = cv2.resize(texture, (width, height), interpolation=cv2.INTER_CUBIC)
+    img = cv2.merge([texture, texture, (texture * 0.9).astype(np.uint8)])
+    # Scale-proportional edges (a "shelf" of boxes) keep the frame sharp at
+    # every resolution once it is reduced for analysis
+    unit = max(width // 160, 1)
+    for _ in range(60):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = (int(v) * unit for v in rng.integers(4, 20, 2))
+        shade = tuple(int(v) for v in rng.integers(30, 230, 3))
+        cv2.rectangle(img, (x, y), (x + w, y + h), shade, max(unit // 2, 1))
+
+    cx, cy = width // 2, int(height * 0.45)
+    head = int(min(width, height) * 0.22)
+    cv2.ellipse(img, (cx, int(cy + head * 2.2)), (int(head * 2.2), head), 0, 180, 360,
+                (90, 60, 40), -1)
+    cv2.ellipse(img, (cx, cy), (int(head * 0.78), head), 0, 0, 360, (140, 170, 210), -1)
+    for side in (-1, 1):
+        eye = (cx + side * int(head * 0.32), cy - int(head * 0.15))
+        cv2.ellipse(img, eye, (int(head * 0.14), int(head * 0.07)), 0, 0, 360, (250, 250, 250), -1)
+        cv2.circle(img, eye, int(head * 0.05), (40, 30, 30), -1)
+        brow = (eye[0], eye[1] - int(head * 0.14))
+        cv2.ellipse(img, brow, (int(head * 0.16), int(head * 0.04)), 0, 180, 360, (50, 50, 70), -1)
+    cv2.ellipse(img, (cx, cy + int(head * 0.2)), (int(head * 0.08), int(head * 0.12)), 0, 0, 360,
+                (110, 140, 180), -1)
+    cv2.ellipse(img, (cx, cy + int(head * 0.45)), (int(head * 0.25), int(head * 0.08)), 0, 0, 180,
+                (80, 80, 160), -1)
+
+    # Sensor-like noise keeps the JPEG size realistic
+    noise = rng.normal(0, 4, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def face_box(width, height):
+    """(x, y, w, h) of the head drawn by synthetic_frame()."""
+    cx, cy = width // 2, int(height * 0.45)
+    head = int(min(width, height) * 0.22)
+    half_width = int(head * 0.78)
+    return cx - half_width, cy - head, 2 * half_width, 2 * head
+
+
+def tilted_frame(width, height, angle, seed=SEED):
+    """synthetic_frame() rolled by `angle` degrees around the head centre.
+
+    The head's centre stays put, so face_box() still locates it.
+    """
+    img = synthetic_frame(width, height, seed)
+    x, y, w, h = face_box(width, height)
+    matrix = cv2.getRotationMatrix2D((x + w / 2, y + h / 2), angle, 1.0)
+    return cv2.warpAffine(img, matrix, (width, height), borderMode=cv2.BORDER_REFLECT)
+
+
+def recorded_sequence(frames, seed=0):
+    """FaceMesh landmarks that drift like a held head, with a blink every second."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.3, 0.7, (468, 3)).astype(np.float32)
+    drift = rng.normal(0, 0.002, (frames, 1, 3)).cumsum(axis=0).astype(np.float32)
+    landmarks = base + drift
+    landmarks[::30, [160, 158, 385, 387], 1] += 0.01
+    return landmarks
+
+
+def encode(img, quality=JPEG_QUALITY):
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode image")
+    return buf.tobytes()
+
+
+def corpus(resolutions=None, per_resolution=1):
+    """Return {name: [jpeg_bytes, ...]} for the given resolution names."""
+    names = resolutions or list(RESOLUTIONS)
+    return {
+        name: [encode(synthetic_frame(*RESOLUTIONS[name], seed=SEED + i))
+               for i in range(per_resolution)]
+        for name in names
+    }
+
+
+def write_corpus(directory, resolutions=None, per_resolution=1):
+    """Write the corpus as ``<name>-<n>.jpg`` files and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, frames in corpus(resolutions, per_resolution).items():
+        for i, data in enumerate(frames):
+            path = os.path.join(directory, f"{name}-{i}.jpg")
+            with open(path, "wb") as fh:
+                fh.write(data)
+            paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the synthetic benchmark corpus")
+    parser.add_argument("directory")
+    parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS))
+    parser.add_argument("--per-resolution", type=int, default=1)
+    args = parser.parse_args(argv)
+    for path in write_corpus(args.directory, args.resolutions, args.per_resolution):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
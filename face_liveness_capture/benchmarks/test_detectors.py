@@ -0,0 +1,119 @@
+"""
+Detector engine comparison: latency per resolution and accuracy.
+
+Latency runs every installed engine (backend/detectors.py) over the corpus
+resolutions, searching every face size and only the sizes
+face_size_bounds() allows. Accuracy runs each engine over the synthetic heads rolled by
+corpus.TILTS and, when ``FACE_LIVENESS_BENCH_FACES`` names a directory of
+labelled photos, over those as well::
+
+    faces/
+        labels.json   {"photo.jpg": [[x, y, w, h], ...], ...}
+        photo.jpg
+
+A labelled face counts as found when some detection's centre lies inside
+it and its centre lies inside that detection. Recall and false positives
+are reported in extra_info. Engines whose model files are missing are
+skipped; see backend/models/README.md.
+"""
+
+import json
+import os
+
+import pytest
+
+from benchmarks.corpus import RESOLUTIONS, TILTS, face_box, tilted_frame
+from face_liveness_capture.backend.detectors import registry
+from face_liveness_capture.backend.face_utils import decode_image_bytes, face_size_bounds
+
+ENGINES = list(registry.names())
+ACCURACY_RESOLUTION = "vga"
+
+
+@pytest.fixture(params=ENGINES)
+def engine(request):
+    if not registry.model(request.param).available():
+        pytest.skip(f"{request.param} model files not installed")
+    registry.warm_up([request.param])
+    return request.param
+
+
+def contains(rect, point):
+    x, y, w, h = rect
+    return x <= point[0] <= x + w and y <= point[1] <= y + h
+
+
+def centre(rect):
+    x, y, w, h = rect
+    return x + w / 2, y + h / 2
+
+
+def score(detections, labels):
+    """(faces found, false positives) for one image."""
+    matched = set()
+    for truth in labels:
+        for i, rect in enumerate(detections):
+            if i not in matched and contains(truth, centre(rect)) and contains(rect, centre(truth)):
+                matched.add(i)
+                break
+    return len(matched), len(detections) - len(matched)
+
+
+def synthetic_set():
+    width, height = RESOLUTIONS[ACCURACY_RESOLUTION]
+    box = face_box(width, height)
+    return [(f"tilt{angle:+d}", tilted_frame(width, height, angle), [box]) for angle in TILTS]
+
+
+def photo_set():
+    directory = os.environ.get("FACE_LIVENESS_BENCH_FACES")
+    if not directory:
+        return []
+    with open(os.path.join(directory, "labels.json")) as fh:
+        labels = json.load(fh)
+    images = []
+    for filename, boxes in sorted(labels.items()):
+        with open(os.path.join(directory, filename), "rb") as fh:
+            images.append((filename, decode_image_bytes(fh.read()), boxes))
+    return images
+
+
+def run_accuracy(benchmark, engine, images):
+    def detect_all():
+        return [registry.detect(img, engine)[0].tolist() for _, img, _ in images]
+
+    results = benchmark(detect_all)
+    found = false_positives = total = 0
+    for (name, _, labels), detections in zip(images, results):
+        hits, misses = score(detections, labels)
+        found += hits
+        false_positives += misses
+        total += len(labels)
+        benchmark.extra_info[name] = hits
+    benchmark.extra_info["engine"] = engine
+    benchmark.extra_info["recall"] = found / total if total else None
+    benchmark.extra_info["false_positives"] = false_positives
+
+
+@pytest.mark.benchmark(group="detector_latency")
+@pytest.mark.parametrize("bounded", [False, True], ids=["all_sizes", "bounded"])
+def test_detector_latency(benchmark, engine, resolution, frame, bounded):
+    bounds = face_size_bounds(frame.shape) if bounded else (None, None)
+    benchmark.extra_info["engine"] = engine
+    benchmark.extra_info["resolution"] = resolution
+    benchmark.extra_info["face_size_bounds"] = bounds
+    rects, _ = benchmark(registry.detect, frame, engine, *bounds)
+    benchmark.extra_info["detected"] = len(rects)
+
+
+@pytest.mark.benchmark(group="detector_accuracy_tilted")
+def test_detector_accuracy_tilted(benchmark, engine):
+    run_accuracy(benchmark, engine, synthetic_set())
+
+
+@pytest.mark.benchmark(group="detector_accuracy_photos")
+def test_detector_accuracy_photos(benchmark, engine):
+    images = photo_set()
+    if not images:
+        pytest.skip("FACE_LIVENESS_BENCH_FACES is not set")
+    run_accuracy(benchmark, engine, images)
@@ -0,0 +1,38 @@
+"""
+Landmark sequence verification (backend/landmarks.py) at recording lengths
+from one second to twenty seconds of 30 fps FaceMesh output.
+
+The array group measures the vectorized checks alone; the widget_json
+group includes converting the widget's lists of {"x", "y", "z"} dicts,
+which dominates for long sequences.
+"""
+
+import pytest
+
+from benchmarks.corpus import recorded_sequence
+from face_liveness_capture.backend.landmarks import verify_landmark_sequence
+
+FRAME_COUNTS = [30, 300, 600]
+
+
+@pytest.fixture(params=FRAME_COUNTS)
+def frame_count(request):
+    return request.param
+
+
+@pytest.mark.benchmark(group='landmarks_array')
+def test_verify_landmark_array(benchmark, frame_count):
+    landmarks = recorded_sequence(frame_count)
+    benchmark.extra_info['frames'] = frame_count
+    result = benchmark(verify_landmark_sequence, landmarks)
+    benchmark.extra_info['live'] = result['live']
+
+
+@pytest.mark.benchmark(group='landmarks_widget_json')
+def test_verify_landmark_dicts(benchmark, frame_count):
+    frames = [
+        [{'x': x, 'y': y, 'z': z} for x, y, z in frame]
+        for frame in recorded_sequence(frame_count).tolist()
+    ]
+    benchmark.extra_info['frames'] = frame_count
+    benchmark(verify_landmark_sequence, frames)
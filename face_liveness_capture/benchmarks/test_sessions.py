@@ -0,0 +1,49 @@
+"""
+Streaming liveness sessions (backend/liveness_session.py and the
+django_integration session store).
+
+session_frame times one landmark frame at different session ages; the
+cost should not grow with the frames already seen. Each run records the
+bytes a session holds next to what the same window of widget landmark
+dicts would take.
+"""
+
+import sys
+
+import pytest
+
+from benchmarks.corpus import recorded_sequence
+from face_liveness_capture.backend.liveness_session import WINDOW, LivenessSession
+from face_liveness_capture.django_integration.session_store import LivenessSessionStore
+
+SESSION_AGES = [0, 1000, 10000]
+
+
+def dict_frame_bytes(frame):
+    """Rough size of one frame as the widget's list of {"x", "y", "z"} dicts."""
+    points = [{'x': x, 'y': y, 'z': z} for x, y, z in frame]
+    return sys.getsizeof(points) + sum(
+        sys.getsizeof(p) + sum(sys.getsizeof(v) for v in p.values()) for p in points)
+
+
+@pytest.mark.benchmark(group='session_frame')
+@pytest.mark.parametrize('age', SESSION_AGES)
+def test_session_frame(benchmark, age):
+    frames = recorded_sequence(32).tolist()
+    session = LivenessSession()
+    session.frames = session.buffered = age
+    benchmark.extra_info['age'] = age
+    benchmark.extra_info['session_bytes'] = session.nbytes
+    benchmark.extra_info['dict_window_bytes'] = WINDOW * dict_frame_bytes(frames[0])
+    position = iter(range(10 ** 9))
+    benchmark(lambda: session.add_landmarks(frames[next(position) % len(frames)]))
+
+
+@pytest.mark.benchmark(group='session_store')
+def test_session_store_lookup(benchmark):
+    store = LivenessSessionStore()
+    keys = [store.create()[0] for _ in range(1000)]
+    benchmark.extra_info['sessions'] = len(keys)
+    benchmark.extra_info['bytes'] = store.stats()['bytes']
+    position = iter(range(10 ** 9))
+    benchmark(lambda: store.get(keys[next(position) % len(keys)]))
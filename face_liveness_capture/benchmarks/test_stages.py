@@ -0,0 +1,86 @@
+"""
+Per-stage and end-to-end benchmarks over the synthetic corpus.
+
+Every benchmark runs once per corpus resolution and is grouped by stage,
+so the report shows how each stage scales from VGA to 12 MP.
+"""
+
+import itertools
+
+import pytest
+
+from face_liveness_capture.backend.analysis import FrameAnalysis
+from face_liveness_capture.backend.detection import verify_liveness
+from face_liveness_capture.backend.detectors import registry
+from face_liveness_capture.backend.face_utils import decode_base64_image, detect_face, save_image
+from face_liveness_capture.backend.validation import (
+    has_face_contrast,
+    is_bright_enough,
+    is_face_bright_enough,
+    is_face_sharp,
+    is_not_blurry,
+)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def warm_detectors():
+    registry.warm_up()
+
+
+def describe(benchmark, resolution, frame):
+    benchmark.extra_info['resolution'] = resolution
+    benchmark.extra_info['pixels'] = frame.shape[0] * frame.shape[1]
+
+
+@pytest.mark.benchmark(group='decode_base64_image')
+def test_decode_base64_image(benchmark, resolution, data_url, frame):
+    describe(benchmark, resolution, frame)
+    benchmark(decode_base64_image, data_url)
+
+
+@pytest.mark.benchmark(group='detect_face')
+def test_detect_face(benchmark, resolution, frame):
+    describe(benchmark, resolution, frame)
+    benchmark.extra_info['detected'] = len(benchmark(detect_face, frame))
+
+
+@pytest.mark.benchmark(group='is_bright_enough')
+def test_is_bright_enough(benchmark, resolution, frame):
+    describe(benchmark, resolution, frame)
+    benchmark(is_bright_enough, frame)
+
+
+@pytest.mark.benchmark(group='is_not_blurry')
+def test_is_not_blurry(benchmark, resolution, frame):
+    describe(benchmark, resolution, frame)
+    benchmark(is_not_blurry, frame)
+
+
+@pytest.mark.benchmark(group='face_roi_quality')
+def test_face_roi_quality(benchmark, resolution, frame):
+    """Brightness, contrast and sharpness of the face crop (QUALITY_ROI)"""
+    describe(benchmark, resolution, frame)
+    faces = FrameAnalysis(frame).faces
+
+    def measure():
+        analysis = FrameAnalysis(frame)
+        analysis.__dict__['faces'] = faces
+        return is_face_bright_enough(analysis), has_face_contrast(analysis), is_face_sharp(analysis)
+
+    benchmark.extra_info['passed'] = all(benchmark(measure))
+
+
+@pytest.mark.benchmark(group='save_image')
+def test_save_image(benchmark, resolution, frame, tmp_path):
+    describe(benchmark, resolution, frame)
+    # Captures are content-addressed, so each round writes to a fresh root
+    roots = (str(tmp_path / str(i)) for i in itertools.count())
+    benchmark.pedantic(save_image, setup=lambda: ((frame, next(roots)), {}),
+                       rounds=5, iterations=1)
+
+
+@pytest.mark.benchmark(group='verify_liveness')
+def test_verify_liveness(benchmark, resolution, jpeg, frame):
+    describe(benchmark, resolution, frame)
+    result = benchmark(verify_liveness, jpeg)
+    benchmark.extra_info['outcome'] = result.get('error') or 'saved'
@@ -0,0 +1,156 @@
+"""
+Per-request frame analysis.
+
+A FrameAnalysis wraps one decoded frame and lazily computes the values the
+validation checks need (grayscale, face rectangles, statistics). Each value
+is computed at most once per request no matter how many checks read it.
+"""
+from .face_utils import detect_faces_scored, detector_input
+from .lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+class lazy_attribute:
+    """Compute a value on first access and store it on the instance.
+
+    Unlike functools.cached_property (which on Python < 3.12 holds one lock
+    per property for every instance of the class), this takes no lock: the
+    value lands in the instance __dict__, which shadows the descriptor from
+    then on. Two threads racing on the same instance may both compute it,
+    which is harmless for these pure measurements; threads working on
+    different frames never wait on each other.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self.func(instance)
+        instance.__dict__[self.name] = value
+        return value
+
+
+class FrameAnalysis:
+    """Lazily computed, cached measurements of one BGR frame."""
+
+    def __init__(self, img):
+        self.img = img
+
+    @property
+    def shape(self):
+        return self.img.shape
+
+    @lazy_attribute
+    def gray(self):
+        if self.img.ndim == 2:
+            return self.img
+        return cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
+
+    @lazy_attribute
+    def detection(self):
+        """(rects, scores) from the DEFAULT_DETECTOR engine.
+
+        Cascades run on the cached grayscale frame, DNN engines on the
+        colour frame, so neither converts the image a second time.
+        """
+        if detector_input() == "gray":
+            return detect_faces_scored(self.gray)
+        return detect_faces_scored(self.img)
+
+    @lazy_attribute
+    def faces(self):
+        """Detected face rectangles as (x, y, w, h) rows."""
+        return self.detection[0]
+
+    @lazy_attribute
+    def face_scores(self):
+        """Detector confidence of each row of `faces`."""
+        return self.detection[1]
+
+    @lazy_attribute
+    def largest_face(self):
+        if len(self.faces) == 0:
+            return None
+        return tuple(int(v) for v in max(self.faces, key=lambda rect: rect[2] * rect[3]))
+
+    @lazy_attribute
+    def brightness(self):
+        """Mean gray level of the whole frame.
+
+        Gray is a fixed weighted sum of B, G and R, so its mean can be taken
+        from the channel means without converting the frame. That keeps the
+        brightness check cheap enough to run before anything else.
+        """
+        if "gray" in self.__dict__ or self.img.ndim == 2:
+            return cv2.mean(self.gray)[0]
+        blue, green, red, _ = cv2.mean(self.img)
+        return 0.114 * blue + 0.587 * green + 0.299 * red
+
+    @lazy_attribute
+    def sharpness(self):
+        """Variance of the Laplacian of the whole frame.
+
+        The Laplacian of an 8-bit image fits in int16, which halves the
+        memory traffic of the old CV_64F version; meanStdDev accumulates in
+        double precision so the variance is unchanged.
+        """
+        laplacian = cv2.Laplacian(self.gray, cv2.CV_16S)
+        _, std = cv2.meanStdDev(laplacian)
+        return float(std[0][0]) ** 2
+
+    @lazy_attribute
+    def face_roi(self):
+        """Grayscale crop of the largest face, or None.
+
+        A view into the cached grayscale frame when there is one; otherwise
+        (DNN engines) only the crop is converted.
+        """
+        if self.largest_face is None:
+            return None
+        x, y, w, h = self.largest_face
+        if "gray" in self.__dict__ or self.img.ndim == 2:
+            return self.gray[y:y + h, x:x + w]
+        return cv2.cvtColor(self.img[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+
+    @lazy_attribute
+    def face_stats(self):
+        """(mean, stddev) of the gray levels inside the largest face, or None.
+
+        One meanStdDev pass over the crop gives both brightness and
+        contrast.
+        """
+        if self.face_roi is None:
+            return None
+        mean, std = cv2.meanStdDev(self.face_roi)
+        return (float(mean[0][0]), float(std[0][0]))
+
+    @lazy_attribute
+    def face_sharpness(self):
+        """Variance of the Laplacian inside the largest face, or None.
+
+        Same measure as `sharpness`, over a few thousand face pixels instead
+        of the whole frame, so a sharp background cannot hide a blurred face.
+        """
+        if self.face_roi is None:
+            return None
+        laplacian = cv2.Laplacian(self.face_roi, cv2.CV_16S)
+        _, std = cv2.meanStdDev(laplacian)
+        return float(std[0][0]) ** 2
+
+
+def as_analysis(frame):
+    """Return `frame` as a FrameAnalysis, wrapping plain ndarrays."""
+    if isinstance(frame, FrameAnalysis):
+        return frame
+    if isinstance(frame, np.ndarray):
+        return FrameAnalysis(frame)
+    raise TypeError(f"Expected FrameAnalysis or ndarray, got {type(frame).__name__}")
@@ -0,0 +1,126 @@
+"""
+Content-hash cache of verification results.
+
+Retries and double submissions send byte-identical images. verify_liveness
+hashes the encoded bytes and looks the digest up here before decoding, so
+a repeated frame returns the earlier result (including the path it was
+saved to) instead of being verified and saved again.
+
+The first tier is an in-process TTL-bound LRU. Setting
+``FACE_LIVENESS_RESULT_CACHE_ALIAS`` to a Django cache alias adds a second
+tier shared by every worker that uses that cache. A shared tier that fails
+is logged and treated as a miss, so the image is simply verified.
+
+Keys combine the content hash with a digest of the RESULT_SETTINGS, so
+changing the detector or a check setting does not serve stale results.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import get_setting
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "face_liveness:result:"
+# Settings that change what verify_liveness returns for the same bytes
+RESULT_SETTINGS = (
+    "DEFAULT_DETECTOR", "DETECTOR_MODEL_DIR", "DETECTOR_SIZE_BOUNDS", "MIN_FACE_AREA",
+    "MAX_FACE_HEIGHT", "ANALYSIS_MAX_SIDE", "QUALITY_ROI", "STORE_ORIGINAL",
+    "PASSPORT_CROP", "PASSPORT_SIZE", "PASSPORT_MAX_BYTES", "PASSPORT_MIN_QUALITY",
+    "PASSPORT_MAX_QUALITY", "CAPTURE_ROOT", "CAPTURE_SHARD_DEPTH", "WRITE_BEHIND",
+)
+
+
+def content_hash(data):
+    """Fast 128-bit digest of encoded image bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def result_key(data):
+    """Cache key of encoded image bytes under the current RESULT_SETTINGS."""
+    settings = repr(tuple(get_setting(name) for name in RESULT_SETTINGS)).encode()
+    return f"{content_hash(data)}:{hashlib.blake2b(settings, digest_size=8).hexdigest()}"
+
+
+def _shared_cache():
+    alias = get_setting("RESULT_CACHE_ALIAS")
+    if not alias:
+        return None
+    from django.core.cache import caches
+    return caches[alias]
+
+
+class ResultCache:
+    """TTL-bound LRU with an optional Django-cache second tier."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0,
+                       "shared_errors": 0}
+
+    def get(self, key):
+        """Return the cached result for `key`, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, result = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return result
+                del self._entries[key]
+
+        result = self._shared_call("get", key)
+        with self._lock:
+            if result is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["shared_hits"] += 1
+        self._store_local(key, result)
+        return result
+
+    def set(self, key, result):
+        self._store_local(key, result)
+        self._shared_call("set", key, result, get_setting("RESULT_CACHE_TTL"))
+
+    def _shared_call(self, method, key, *args):
+        """Call the shared tier; None if there is none or it fails."""
+        try:
+            shared = _shared_cache()
+            if shared is None:
+                return None
+            return getattr(shared, method)(_KEY_PREFIX + key, *args)
+        except Exception:
+            logger.warning("Shared result cache %s failed", method, exc_info=True)
+            with self._lock:
+                self._stats["shared_errors"] += 1
+            return None
+
+    def _store_local(self, key, result):
+        expires = time.monotonic() + get_setting("RESULT_CACHE_TTL")
+        max_entries = get_setting("RESULT_CACHE_SIZE")
+        with self._lock:
+            self._entries[key] = (expires, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit, miss and eviction counters plus the current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        return stats
+
+
+result_cache = ResultCache()
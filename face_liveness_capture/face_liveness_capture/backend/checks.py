@@ -0,0 +1,197 @@
+"""
+Declarative verification checks and a cost-aware scheduler.
+
+verify_liveness always decodes first and saves last; the checks in between
+are independent apart from declared requirements, so the scheduler runs
+them in the order that rejects bad frames most cheaply: lowest
+cost / rejection-rate first. Each check starts from a declared estimate
+and the scheduler keeps moving averages of the measured cost and
+rejection rate, so the order follows the live traffic.
+
+Lazily computed values several checks read (the grayscale frame, the face
+detection) are timed separately from the checks: whichever check needs
+one first would otherwise be charged for it, and the checks after it
+would look cheaper than they are. A check's ranking cost is its own cost
+plus the shared values no earlier check computes.
+"""
+import threading
+import time
+
+from ..config import get_setting
+from .metrics import enabled as metrics_enabled, record_stage
+from .validation import (
+    face_size_ok,
+    has_face_contrast,
+    is_bright_enough,
+    is_face_bright_enough,
+    is_face_sharp,
+    is_not_blurry,
+)
+
+
+def has_face(frame):
+    """At least one face was detected."""
+    return frame.largest_face is not None
+
+
+class Check:
+    """One pass/fail stage of the pipeline."""
+
+    def __init__(self, name, error, predicate, cost, reject_rate, requires=(), shares=()):
+        self.name = name
+        self.error = error
+        self.predicate = predicate
+        self.cost = cost                # estimated seconds on an analysis frame
+        self.reject_rate = reject_rate  # estimated fraction of frames rejected
+        self.requires = tuple(requires)
+        self.shares = tuple(shares)     # SHARED_COSTS values the check reads
+
+
+# Estimated seconds to compute each shared FrameAnalysis value
+SHARED_COSTS = {"gray": 0.0005, "detection": 0.02}
+
+CHECKS = (
+    Check("brightness", "Image too dark", is_bright_enough, cost=0.0001, reject_rate=0.3),
+    Check("blur", "Image too blurry", is_not_blurry, cost=0.0015, reject_rate=0.2,
+          shares=("gray",)),
+    Check("face", "No face detected", has_face, cost=0.00001, reject_rate=0.3,
+          shares=("detection",)),
+    Check("face_size", "Face too small", face_size_ok, cost=0.00001, reject_rate=0.1,
+          requires=("face",)),
+)
+
+# QUALITY_ROI: image quality is measured inside the largest face only, so
+# detection comes first and the quality checks read a crop of a few
+# thousand pixels instead of the whole frame
+ROI_CHECKS = (
+    Check("face", "No face detected", has_face, cost=0.00001, reject_rate=0.3,
+          shares=("detection",)),
+    Check("face_size", "Face too small", face_size_ok, cost=0.00001, reject_rate=0.1,
+          requires=("face",)),
+    Check("face_brightness", "Face too dark", is_face_bright_enough, cost=0.00002,
+          reject_rate=0.2, requires=("face",)),
+    Check("face_contrast", "Face contrast too low", has_face_contrast, cost=0.00001,
+          reject_rate=0.05, requires=("face",)),
+    Check("face_blur", "Face too blurry", is_face_sharp, cost=0.0001, reject_rate=0.2,
+          requires=("face",)),
+)
+
+
+class CheckScheduler:
+    """Runs checks cheapest-and-most-selective first, learning from each run."""
+
+    # Weight of the newest observation in the moving averages
+    SMOOTHING = 0.05
+    # Floor for the rejection rate so checks that never reject still rank
+    MIN_REJECT_RATE = 0.01
+    # Runs between recomputations of the order
+    REORDER_EVERY = 50
+
+    def __init__(self, checks=CHECKS):
+        self.checks = tuple(checks)
+        self._lock = threading.Lock()
+        self._stats = {
+            check.name: {
+                "cost": check.cost,
+                "reject_rate": check.reject_rate,
+                "runs": 0,
+                "rejections": 0,
+            }
+            for check in self.checks
+        }
+        self._shared = {
+            name: {"cost": SHARED_COSTS[name], "runs": 0}
+            for check in self.checks for name in check.shares
+        }
+        self._runs = 0
+        self._order = self._compute_order()
+
+    def _rank(self, check, computed=()):
+        stats = self._stats[check.name]
+        cost = stats["cost"] + sum(
+            self._shared[name]["cost"] for name in check.shares if name not in computed
+        )
+        return cost / max(stats["reject_rate"], self.MIN_REJECT_RATE)
+
+    def _compute_order(self):
+        """Greedy lowest-rank-first order that respects `requires`."""
+        pending = list(self.checks)
+        done = set()
+        computed = set()
+        order = []
+        while pending:
+            ready = [c for c in pending if all(r in done for r in c.requires)]
+            if not ready:
+                raise ValueError("Check requirements cannot be satisfied")
+            best = min(ready, key=lambda check: self._rank(check, computed))
+            order.append(best)
+            done.add(best.name)
+            computed.update(best.shares)
+            pending.remove(best)
+        return tuple(order)
+
+    def order(self):
+        """Current execution order (declared order when scheduling is off)."""
+        if not get_setting("ADAPTIVE_CHECK_ORDER"):
+            return self.checks
+        return self._order
+
+    def _record(self, check, elapsed, rejected):
+        alpha = self.SMOOTHING
+        with self._lock:
+            stats = self._stats[check.name]
+            stats["runs"] += 1
+            stats["rejections"] += rejected
+            stats["cost"] += alpha * (elapsed - stats["cost"])
+            stats["reject_rate"] += alpha * (rejected - stats["reject_rate"])
+
+    def _record_shared(self, name, elapsed):
+        with self._lock:
+            stats = self._shared[name]
+            stats["runs"] += 1
+            stats["cost"] += self.SMOOTHING * (elapsed - stats["cost"])
+
+    def run(self, frame):
+        """Run checks on a FrameAnalysis; returns the first error or None."""
+        error = None
+        report = metrics_enabled()
+        for check in self.order():
+            started = time.perf_counter()
+            for name in check.shares:
+                if name not in frame.__dict__:
+                    shared_started = time.perf_counter()
+                    getattr(frame, name)
+                    self._record_shared(name, time.perf_counter() - shared_started)
+            checked = time.perf_counter()
+            passed = check.predicate(frame)
+            finished = time.perf_counter()
+            self._record(check, finished - checked, not passed)
+            if report:
+                record_stage(f"check_{check.name}", finished - started)
+            if not passed:
+                error = check.error
+                break
+
+        with self._lock:
+            self._runs += 1
+            if self._runs % self.REORDER_EVERY == 0:
+                self._order = self._compute_order()
+        return error
+
+    def stats(self):
+        """Per-check and shared-value moving averages and the current order."""
+        with self._lock:
+            return {
+                "order": [check.name for check in self._order],
+                "checks": {name: dict(stats) for name, stats in self._stats.items()},
+                "shared": {name: dict(stats) for name, stats in self._shared.items()},
+            }
+
+
+scheduler = CheckScheduler()
+roi_scheduler = CheckScheduler(ROI_CHECKS)
+
+
+def get_scheduler():
+    """The scheduler for the configured check set (QUALITY_ROI)."""
+    return roi_scheduler if get_setting("QUALITY_ROI") else scheduler
@@ -1,42 +1,344 @@
-from .face_utils import decode_base64_image, detect_face, save_image
-from .validation import is_bright_enough, is_not_blurry
-import json
+from ..config import get_setting
+from .analysis import FrameAnalysis
+from .cache import content_hash, result_cache, result_key
+from .checks import get_scheduler
+from .detectors import registry
+from .metrics import enabled as metrics_enabled, record_image, record_result, stage
+from .passport import passport_capture, passport_rect
+from .persistence import writer
+from .storage import is_capture_id, storage
+from .face_utils import (
+    decode_base64_bytes,
+    decode_for_analysis,
+    decode_image_bytes,
+    encode_jpeg,
+    full_resolution_shape,
+    image_dimensions,
+    is_jpeg,
+    scale_rect,
+)
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
-def verify_liveness(image_base64):
-    """Main function to validate and save face image."""
-    # 1. Decode
+def warm_up():
+    """Import OpenCV and NumPy and load the DEFAULT_DETECTOR engine in this thread.
+
+    Heavy libraries are imported on first use (backend/lazy.py), so the
+    first verification pays for them unless something warms up first.
+    Detector instances are per thread, so this warms the calling thread
+    only; with WARMUP set, other threads warm their own instance when they
+    first use it. AppConfig.ready() calls this according to WARMUP; call it
+    directly to choose the moment, e.g. from a gunicorn post_worker_init
+    hook. Returns the detector registry stats.
+    """
+    return registry.warm_up([get_setting("DEFAULT_DETECTOR")])
+
+def preload():
+    """Import OpenCV and NumPy and read the DEFAULT_DETECTOR model files.
+
+    Builds no detector instance, so it suits a thread that serves no
+    requests: WARMUP = "background" runs this at startup.
+    """
+    return registry.preload([get_setting("DEFAULT_DETECTOR")])
+
+def image_bytes(image_data):
+    """Return encoded image bytes from a base64/data URL string or raw bytes."""
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        return image_data
+    return decode_base64_bytes(image_data)
+
+def decode_image(image_data):
+    """Decode either a base64/data URL string or raw encoded image bytes."""
+    return decode_image_bytes(image_bytes(image_data))
+
+def run_checks(frame):
+    """Run the validation checks on a FrameAnalysis.
+
+    Returns the error message of the first failing check, or None. The
+    checks run cheapest-and-most-selective first (see backend/checks.py);
+    with QUALITY_ROI, quality is measured inside the face only.
+    """
+    return get_scheduler().run(frame)
+
+def check_frame(analysis):
+    """Run the checks inline or on the process engine.
+
+    Returns (error, largest_face) for the analysis-resolution frame.
+    """
+    if get_setting("ENGINE") == "process":
+        from .engine import get_engine
+        return get_engine().check(analysis)
+    frame = FrameAnalysis(analysis)
+    return run_checks(frame), frame.largest_face
+
+def verify_liveness(image_data):
+    """Main function to validate and save face image.
+
+    `image_data` is a base64 string / data URL (JSON clients) or the raw
+    encoded image bytes (binary and multipart uploads).
+
+    Detection and quality checks run on a copy reduced to about
+    ANALYSIS_MAX_SIDE pixels. A JPEG that passes is stored byte for byte
+    (STORE_ORIGINAL), so it is never decoded at full resolution; other
+    formats are decoded and re-encoded as JPEG once every check has passed.
+    All checks share one FrameAnalysis, so grayscale and statistics are
+    computed once per request. With ENGINE = "process" the checks run in a
+    worker process instead.
+
+    Byte-identical images within RESULT_CACHE_TTL get the cached result.
+    With WRITE_BEHIND the image is queued for writing and the result is
+    returned before it is on disk; see capture_status().
+
+    Every stage is timed and every outcome counted (backend/metrics.py)
+    unless METRICS is off.
+    """
+    with stage("total"):
+        result = _verify(image_data)
+    record_result(result)
+    return result
+
+def _verify(image_data):
     try:
-        img = decode_base64_image(image_base64)
-        logger.debug("Image decoded successfully")
+        data = image_bytes(image_data)
     except Exception as e:
         logger.warning("Image decode failed: %s", e)
         return {"success": False, "error": f"Invalid image: {e}"}
 
-    # 2. Detect face
-    try:
-        if not detect_face(img):
-            return {"success": False, "error": "No face detected"}
+    if metrics_enabled():
+        dims = image_dimensions(data)
+        record_image(len(data), dims[0] * dims[1] if dims else None)
+
+    if not get_setting("RESULT_CACHE"):
+        return _verify_bytes(data)
+
+    with stage("cache"):
+        key = result_key(data)
+        cached = result_cache.get(key)
+    if cached is not None:
+        logger.debug("Result cache hit for %s", key)
+        return dict(cached)
+
+    result = _verify_bytes(data)
+    if result["success"] and get_setting("WRITE_BEHIND"):
+        # Only cache a capture once it is on disk, so a failed write is
+        # not reported as a success again
+        writer.when_persisted(result["capture_id"],
+                              functools.partial(result_cache.set, key, dict(result)))
+    # Processing errors may be transient (e.g. a crashed engine worker)
+    elif not result.get("error", "").startswith("Processing error"):
+        result_cache.set(key, dict(result))
+    return result
+
+def _verify_bytes(data):
+    max_side = get_setting("ANALYSIS_MAX_SIDE")
 
-        # 3. Check brightness
-        if not is_bright_enough(img):
-            return {"success": False, "error": "Image too dark"}
+    # 1. Decode
+    try:
+        with stage("decode"):
+            if max_side:
+                analysis, img = decode_for_analysis(data, max_side)
+            else:
+                analysis = img = decode_image_bytes(data)
+        logger.debug("Image decoded successfully (analysis size %s)", analysis.shape[:2])
+    except Exception as e:
+        logger.warning("Image decode failed: %s", e)
+        return {"success": False, "error": f"Invalid image: {e}"}
 
-        # 4. Check blur
-        if not is_not_blurry(img):
-            return {"success": False, "error": "Image too blurry"}
+    try:
+        # 2. Detection and quality checks
+        with stage("checks"):
+            error, largest_face = check_frame(analysis)
+        if error:
+            return {"success": False, "error": error}
 
-        # 5. Save
-        path = save_image(img)
-        logger.info("Saved validated face to %s", path)
+        # 3. Save
+        with stage("encode"):
+            encoded, face, details = _encode_capture(data, analysis, img, largest_face)
+            capture_id = content_hash(encoded)
+        # The decoded frames are not needed to store the capture
+        del analysis, img
+        with stage("store"):
+            if get_setting("WRITE_BEHIND"):
+                path = writer.submit(capture_id, encoded)
+                logger.info("Queued validated face for %s", path)
+            else:
+                path = storage.path(storage.save(encoded, capture_id))
+                logger.info("Saved validated face to %s", path)
 
-        return {
+        result = {
             "success": True,
+            "capture_id": capture_id,
             "path": path,
+            "face": list(face),
             "message": "Face validated and saved successfully"
         }
+        if details:
+            result["passport"] = details
+        return result
     except Exception as e:
         logger.exception("Error during verification")
         return {"success": False, "error": f"Processing error: {e}"}
+
+def _encode_capture(data, analysis, img, largest_face):
+    """Choose the bytes to store; returns (encoded, face, passport_details).
+
+    With PASSPORT_CROP the face is cropped and encoded to the byte budget,
+    from the analysis copy when it has enough pixels for PASSPORT_SIZE.
+    Otherwise the client's JPEG is kept as sent (STORE_ORIGINAL) and other
+    formats are re-encoded.
+    """
+    if get_setting("PASSPORT_CROP"):
+        height = get_setting("PASSPORT_SIZE")[1]
+        if passport_rect(largest_face, analysis.shape)[3] >= height:
+            source, face = analysis, largest_face
+        else:
+            if img is None:
+                img = decode_image_bytes(data)
+            source, face = img, scale_rect(largest_face, analysis.shape, img.shape)
+        return passport_capture(source, face)
+
+    if get_setting("STORE_ORIGINAL") and is_jpeg(data):
+        full_shape = img.shape if img is not None else full_resolution_shape(data, analysis)
+        # Copy views of request buffers; decoded bytearrays are already ours
+        stored = data if isinstance(data, (bytes, bytearray)) else bytes(data)
+        return stored, scale_rect(largest_face, analysis.shape, full_shape), None
+
+    if img is None:
+        img = decode_image_bytes(data)
+    return encode_jpeg(img), scale_rect(largest_face, analysis.shape, img.shape), None
+
+def capture_status(capture_id):
+    """Persistence status of a capture: "pending", "persisted" or "failed".
+
+    Returns None for unknown IDs. Captures written by another process are
+    reported as persisted once their file exists.
+    """
+    if not is_capture_id(capture_id):
+        return None
+    status = writer.status(capture_id)
+    if status is None:
+        if not storage.exists(capture_id):
+            return None
+        status = {"status": "persisted", "path": storage.path(capture_id), "error": None}
+    return dict(status, capture_id=capture_id)
+
+_executors = {}
+# Thread count of each executor, fixed when it is created
+_executor_workers = {}
+_executors_lock = threading.Lock()
+# Seconds warm_executors() waits for busy pool threads
+_WARM_TIMEOUT = 60
+
+def _warm_pool_thread(barrier):
+    """Hold this pool thread until all are started, then warm it up."""
+    try:
+        barrier.wait(_WARM_TIMEOUT)
+    except threading.BrokenBarrierError:
+        # Some threads were busy with real work; warm the ones that came
+        pass
+    warm_up()
+
+def _shared_executor(kind, max_workers):
+    """Process-wide thread pool named `kind`, created on first use."""
+    executor = _executors.get(kind)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(kind)
+            if executor is None:
+                executor = _executors[kind] = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix=f"face-liveness-{kind}",
+                )
+                _executor_workers[kind] = max_workers
+    return executor
+
+def _batch_worker_count():
+    workers = get_setting("BATCH_MAX_WORKERS")
+    return workers or min(4, os.cpu_count() or 1)
+
+def get_batch_executor():
+    """Thread pool for batch verification."""
+    return _shared_executor("batch", _batch_worker_count())
+
+def _verify_worker_count():
+    return get_setting("ASYNC_MAX_WORKERS") or os.cpu_count() or 1
+
+def get_verify_executor():
+    """Thread pool that async callers offload CPU-bound verification to.
+
+    Sized to ASYNC_MAX_WORKERS (CPU count by default) so an event loop can
+    hold many waiting uploads while only that many are being processed.
+    """
+    return _shared_executor("verify", _verify_worker_count())
+
+_POOLS = {"verify": get_verify_executor, "batch": get_batch_executor}
+
+def warm_executors(kinds=("verify", "batch")):
+    """Start every thread of the `kinds` pools now and warm each one up.
+
+    ThreadPoolExecutor starts threads on demand, and each thread builds its
+    own detector on first use; without this the first jobs on each thread
+    would wait for that. One job per thread waits on a barrier, which makes
+    the pool start all of its threads, then warms the thread it ran on.
+    AppConfig.ready() calls this for WARMUP_POOLS.
+    """
+    for kind in kinds:
+        executor = _POOLS[kind]()
+        workers = _executor_workers[kind]
+        barrier = threading.Barrier(workers)
+        jobs = [executor.submit(_warm_pool_thread, barrier) for _ in range(workers)]
+        for job in jobs:
+            job.result()
+
+async def run_in_verify_executor(func, *args):
+    """Await `func(*args)` on the verify executor without blocking the event loop.
+
+    The caller's context variables (e.g. the request's stage timings) are
+    visible to `func`.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_verify_executor(), functools.partial(context.run, func, *args)
+    )
+
+async def verify_liveness_async(image_data):
+    """Async wrapper around verify_liveness for ASGI callers."""
+    return await run_in_verify_executor(verify_liveness, image_data)
+
+def _verify_item(image_data):
+    try:
+        return verify_liveness(image_data)
+    except Exception as e:
+        logger.exception("Error during batch verification")
+        return {"success": False, "error": f"Processing error: {e}"}
+
+def verify_liveness_batch(images, max_in_flight=None):
+    """Verify several images on the batch thread pool.
+
+    OpenCV releases the GIL while decoding and detecting, so the threads run
+    in parallel. Results come back in input order, one verify_liveness()
+    result per image; a failing image only affects its own entry. At most
+    `max_in_flight` images (BATCH_MAX_IN_FLIGHT by default) are submitted at
+    once, which bounds how many decoded frames are held in memory.
+    """
+    if max_in_flight is None:
+        max_in_flight = get_setting("BATCH_MAX_IN_FLIGHT") or 2 * _batch_worker_count()
+    executor = get_batch_executor()
+    slots = threading.BoundedSemaphore(max_in_flight)
+    futures = []
+
+    for image_data in images:
+        slots.acquire()
+        future = executor.submit(_verify_item, image_data)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+
+    return [future.result() for future in futures]
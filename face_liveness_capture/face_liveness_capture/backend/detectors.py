@@ -0,0 +1,403 @@
+"""
+Process-wide registry of face detection engines.
+
+Every engine is a model class with the same interface: ``create()`` builds
+an instance, ``detect(instance, image, min_size, max_size)`` returns
+``(rects, scores)``, an ``(N, 4)`` int32 array of (x, y, w, h) boxes and
+``N`` float32 confidences. Faces whose size (the geometric mean of width
+and height) is outside ``[min_size, max_size]`` are not returned; the
+cascades do not even search those scales.
+
+* ``haar_frontalface``: OpenCV's Haar cascade (bundled with OpenCV);
+* ``lbp_frontalface``: LBP cascade, faster and less accurate than Haar;
+* ``yunet``: YuNet CNN through ``cv2.FaceDetectorYN``;
+* ``ssd_res10``: ResNet-10 SSD through ``cv2.dnn``.
+
+Cascade scores are the number of merged neighbour detections, DNN scores a
+probability in [0, 1]. The engine used by the pipeline is chosen with
+``FACE_LIVENESS_DEFAULT_DETECTOR``. Model files other than the Haar cascade
+live in ``backend/models/`` (or ``FACE_LIVENESS_DETECTOR_MODEL_DIR``).
+
+Model files are read from disk once per process. OpenCV detectors keep
+scratch buffers inside the instance, so every thread gets its own instance
+built from the cached model source instead of sharing one.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+
+from ..config import get_setting
+from .lazy import lazy_import
+from .metrics import rss_bytes
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+HAAR_FRONTALFACE = "haar_frontalface"
+LBP_FRONTALFACE = "lbp_frontalface"
+YUNET = "yunet"
+SSD_RES10 = "ssd_res10"
+
+# Model files shipped with the package (see models/README.md)
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+
+def _opencv_data_path(filename):
+    return os.path.join(cv2.data.haarcascades, filename)
+
+
+def _model_dir_path(filename):
+    return os.path.join(get_setting("DETECTOR_MODEL_DIR") or MODEL_DIR, filename)
+
+
+def opencv_data(filename):
+    """Path of a cascade bundled with OpenCV, resolved on first use."""
+    return functools.partial(_opencv_data_path, filename)
+
+
+def bundled_model(filename):
+    """Path of a file in the model directory, resolved on first use."""
+    return functools.partial(_model_dir_path, filename)
+
+
+def _empty_detections():
+    return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32)
+
+
+def _clip_rects(boxes, shape):
+    """Round float (x, y, w, h) boxes to int32 and clip them to the frame."""
+    height, width = shape[:2]
+    x1 = np.clip(boxes[:, 0], 0, width)
+    y1 = np.clip(boxes[:, 1], 0, height)
+    x2 = np.clip(boxes[:, 0] + boxes[:, 2], 0, width)
+    y2 = np.clip(boxes[:, 1] + boxes[:, 3], 0, height)
+    return np.rint(np.stack([x1, y1, x2 - x1, y2 - y1], axis=1)).astype(np.int32)
+
+
+def bound_detections(rects, scores, min_size=None, max_size=None):
+    """Drop detections whose size sqrt(w * h) is outside [min_size, max_size]."""
+    if len(rects) == 0 or (not min_size and not max_size):
+        return rects, scores
+    sizes = np.sqrt(rects[:, 2].astype(np.float32) * rects[:, 3])
+    keep = np.ones(len(rects), dtype=bool)
+    if min_size:
+        keep &= sizes >= min_size
+    if max_size:
+        keep &= sizes <= max_size
+    return rects[keep], scores[keep]
+
+
+def yunet_detections(faces, shape):
+    """(rects, scores) from FaceDetectorYN output rows (box, landmarks, score)."""
+    if faces is None or len(faces) == 0:
+        return _empty_detections()
+    faces = np.asarray(faces, dtype=np.float32)
+    return _clip_rects(faces[:, :4], shape), faces[:, 14].copy()
+
+
+def ssd_detections(output, shape, score_threshold):
+    """(rects, scores) from a (1, 1, N, 7) SSD output of relative corner boxes."""
+    rows = output.reshape(-1, 7)
+    rows = rows[rows[:, 2] >= score_threshold]
+    if len(rows) == 0:
+        return _empty_detections()
+    height, width = shape[:2]
+    corners = rows[:, 3:7] * np.array([width, height, width, height], dtype=np.float32)
+    boxes = np.concatenate([corners[:, :2], corners[:, 2:] - corners[:, :2]], axis=1)
+    return _clip_rects(boxes, shape), rows[:, 2].astype(np.float32)
+
+
+class DetectorModel:
+    """Model files read once per process, parsed into per-thread instances.
+
+    Paths are strings or callables resolved on first use, so registering a
+    model neither imports cv2 nor requires its files to exist. `input` is
+    the image type detect() expects, "gray" or "bgr".
+    """
+
+    input = "gray"
+
+    def __init__(self, *paths):
+        self._paths = paths
+        self._sources = None
+        self._lock = threading.Lock()
+
+    @property
+    def paths(self):
+        return [path() if callable(path) else path for path in self._paths]
+
+    @property
+    def path(self):
+        return self.paths[0]
+
+    def available(self):
+        """Whether every model file exists."""
+        return all(os.path.exists(path) for path in self.paths)
+
+    def sources(self):
+        """Return the model files' bytes, reading them on first use."""
+        if self._sources is None:
+            with self._lock:
+                if self._sources is None:
+                    sources = []
+                    for path in self.paths:
+                        try:
+                            with open(path, "rb") as fh:
+                                sources.append(fh.read())
+                        except FileNotFoundError:
+                            raise ValueError(
+                                f"Detector model file not found: {path} (see backend/models/README.md)"
+                            )
+                    self._sources = sources
+        return self._sources
+
+    def source_size(self):
+        return sum(len(source) for source in self._sources) if self._sources is not None else 0
+
+    def prepare(self, image):
+        """Convert a BGR or grayscale frame to the input this model expects."""
+        if self.input == "gray" and image.ndim == 3:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self.input == "bgr" and image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        return image
+
+    def create(self):
+        raise NotImplementedError
+
+    def detect(self, instance, image, min_size=None, max_size=None):
+        """Return (rects, scores) for an image already in `input` form.
+
+        `min_size` and `max_size` bound the face size in pixels; None
+        leaves that end unbounded.
+        """
+        raise NotImplementedError
+
+    def warm_up(self, instance):
+        """Run one dummy inference so lazy OpenCV allocations happen now."""
+        channels = () if self.input == "gray" else (3,)
+        self.detect(instance, np.zeros((240, 320) + channels, dtype=np.uint8))
+
+
+class CascadeModel(DetectorModel):
+    """A Haar or LBP cascade run with detectMultiScale."""
+
+    def __init__(self, path, scale_factor=1.3, min_neighbors=5):
+        super().__init__(path)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def source(self):
+        """The cascade XML as text."""
+        return self.sources()[0].decode("utf-8")
+
+    def create(self):
+        """Build a new classifier instance from the cached source."""
+        storage = cv2.FileStorage(
+            self.source(), cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY
+        )
+        classifier = cv2.CascadeClassifier()
+        if not classifier.read(storage.getFirstTopLevelNode()):
+            raise ValueError(f"Could not load cascade model: {self.path}")
+        return classifier
+
+    def detect(self, instance, image, min_size=None, max_size=None):
+        # Same boxes as detectMultiScale, plus the neighbour count of each.
+        # The cascade only slides windows between minSize and maxSize, so
+        # out-of-range scales cost nothing.
+        rects, neighbours = instance.detectMultiScale2(
+            image, self.scale_factor, self.min_neighbors,
+            minSize=(min_size or 0,) * 2, maxSize=(max_size or 0,) * 2,
+        )
+        if len(rects) == 0:
+            return _empty_detections()
+        return (np.asarray(rects, dtype=np.int32).reshape(-1, 4),
+                np.asarray(neighbours, dtype=np.float32).reshape(-1))
+
+
+class YuNetModel(DetectorModel):
+    """YuNet face detector (ONNX) run on the CPU by cv2.FaceDetectorYN."""
+
+    input = "bgr"
+
+    def __init__(self, path, score_threshold=0.6, nms_threshold=0.3, top_k=50):
+        super().__init__(path)
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self.top_k = top_k
+
+    def create(self):
+        model = np.frombuffer(self.sources()[0], np.uint8)
+        return cv2.FaceDetectorYN.create(
+            "onnx", model, np.empty(0, np.uint8), (320, 320),
+            self.score_threshold, self.nms_threshold, self.top_k,
+        )
+
+    def detect(self, instance, image, min_size=None, max_size=None):
+        height, width = image.shape[:2]
+        instance.setInputSize((width, height))
+        _, faces = instance.detect(image)
+        return bound_detections(*yunet_detections(faces, image.shape), min_size, max_size)
+
+
+class SsdModel(DetectorModel):
+    """ResNet-10 SSD face detector (Caffe) run on the CPU by cv2.dnn."""
+
+    input = "bgr"
+    # Network input size and the per-channel means it was trained with
+    INPUT_SIZE = (300, 300)
+    MEAN = (104.0, 177.0, 123.0)
+
+    def __init__(self, prototxt, caffemodel, score_threshold=0.6):
+        super().__init__(prototxt, caffemodel)
+        self.score_threshold = score_threshold
+
+    def create(self):
+        prototxt, caffemodel = self.sources()
+        net = cv2.dnn.readNetFromCaffe(np.frombuffer(prototxt, np.uint8),
+                                       np.frombuffer(caffemodel, np.uint8))
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return net
+
+    def detect(self, instance, image, min_size=None, max_size=None):
+        blob = cv2.dnn.blobFromImage(image, 1.0, self.INPUT_SIZE, self.MEAN)
+        instance.setInput(blob)
+        detections = ssd_detections(instance.forward(), image.shape, self.score_threshold)
+        return bound_detections(*detections, min_size, max_size)
+
+
+class DetectorRegistry:
+    """Loads each registered model once and hands out per-thread instances."""
+
+    def __init__(self):
+        self._models = {}
+        self._stats = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def register(self, name, model):
+        with self._lock:
+            self._models[name] = model
+            self._stats[name] = {
+                "instances": 0,
+                "load_seconds": 0.0,
+                "rss_delta_bytes": None,
+                "source_bytes": 0,
+                "warmup_seconds": None,
+                "warmed_threads": 0,
+            }
+
+    def names(self):
+        return list(self._models)
+
+    def model(self, name):
+        try:
+            return self._models[name]
+        except KeyError:
+            raise ValueError(f"Unknown detector: {name}")
+
+    def available(self):
+        """Names of the models whose files are present."""
+        return [name for name, model in self._models.items() if model.available()]
+
+    def get(self, name=HAAR_FRONTALFACE):
+        """Return this thread's instance of model `name`, loading it if needed.
+
+        With WARMUP set, a new instance is warmed up before it is returned,
+        so whichever thread first uses an engine (a gunicorn request
+        thread, a pool thread) warms its own instance.
+        """
+        instance = getattr(self._local, "instances", {}).get(name)
+        if instance is None:
+            instance = self._instance(name, bool(get_setting("WARMUP")))
+        return instance
+
+    def _instance(self, name, warm):
+        instances = getattr(self._local, "instances", None)
+        if instances is None:
+            instances = self._local.instances = {}
+        instance = instances.get(name)
+        if instance is None:
+            instance = instances[name] = self._load(name)
+            if warm:
+                self._warm(name, instance)
+        return instance
+
+    def _load(self, name):
+        model = self.model(name)
+
+        rss_before = rss_bytes()
+        started = time.perf_counter()
+        instance = model.create()
+        elapsed = time.perf_counter() - started
+        rss_after = rss_bytes()
+
+        with self._lock:
+            stats = self._stats[name]
+            stats["instances"] += 1
+            stats["load_seconds"] += elapsed
+            stats["source_bytes"] = model.source_size()
+            if rss_before is not None and rss_after is not None and stats["rss_delta_bytes"] is None:
+                stats["rss_delta_bytes"] = rss_after - rss_before
+        logger.debug("Loaded detector %s in %.1f ms", name, elapsed * 1000)
+        return instance
+
+    def detect(self, image, name=HAAR_FRONTALFACE, min_size=None, max_size=None):
+        """Run model `name` on a BGR or grayscale frame; returns (rects, scores).
+
+        Only faces between `min_size` and `max_size` pixels are searched for.
+        """
+        model = self.model(name)
+        return model.detect(self.get(name), model.prepare(image), min_size, max_size)
+
+    def preload(self, names=None):
+        """Import OpenCV and read the given models' files, without building instances.
+
+        Useful from a thread that will not run detections itself.
+        """
+        for name in names or self.available():
+            model = self.model(name)
+            model.sources()
+            with self._lock:
+                self._stats[name]["source_bytes"] = model.source_size()
+        cv2.CascadeClassifier  # resolve the lazy import
+        return self.stats()
+
+    def warm_up(self, names=None):
+        """Load and exercise the given models (all available ones by default) in this thread.
+
+        Instances are per thread, so this only helps detections that run
+        in the calling thread. An instance this thread already built is not
+        warmed again.
+        """
+        for name in names or self.available():
+            self._instance(name, warm=True)
+        return self.stats()
+
+    def _warm(self, name, instance):
+        started = time.perf_counter()
+        self._models[name].warm_up(instance)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats[name]["warmup_seconds"] = elapsed
+            self._stats[name]["warmed_threads"] += 1
+
+    def stats(self):
+        """Per-model load time and memory figures."""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+registry = DetectorRegistry()
+registry.register(HAAR_FRONTALFACE, CascadeModel(opencv_data("haarcascade_frontalface_default.xml")))
+registry.register(LBP_FRONTALFACE, CascadeModel(bundled_model("lbpcascade_frontalface_improved.xml")))
+registry.register(YUNET, YuNetModel(bundled_model("face_detection_yunet_2023mar.onnx")))
+registry.register(SSD_RES10, SsdModel(
+    bundled_model("deploy.prototxt"),
+    bundled_model("res10_300x300_ssd_iter_140000_fp16.caffemodel"),
+))
@@ -0,0 +1,280 @@
+"""
+Process-pool verification engine.
+
+Runs the verification checks in a pool of pre-warmed worker processes so
+CPU-heavy detector configurations are not limited to one web worker. The
+decoded frame is copied once into a per-worker shared-memory segment
+instead of being pickled. Workers are replaced after a fixed number of jobs
+and whenever they crash or time out, so a bad image never takes the web
+worker down with it.
+
+Enable with ``FACE_LIVENESS_ENGINE = "process"``.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+from ..config import configure, get_setting
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# Settings copied into every worker so it behaves like the parent
+_WORKER_SETTINGS = (
+    "DEFAULT_DETECTOR", "DETECTOR_MODEL_DIR", "DETECTOR_SIZE_BOUNDS", "MIN_FACE_AREA",
+    "MAX_FACE_HEIGHT", "ANALYSIS_MAX_SIDE", "QUALITY_ROI",
+)
+
+
+class EngineError(RuntimeError):
+    """A job could not be completed by a worker process."""
+
+
+def _worker_main(conn, settings):
+    """Worker process loop: warm up, then run jobs until told to stop."""
+    configure(**settings)
+    from .analysis import FrameAnalysis
+    from .detection import run_checks, warm_up
+
+    warm_up()
+    conn.send(("ready", os.getpid()))
+
+    segment = None
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        name, shape, dtype = job
+        try:
+            if segment is None or segment.name != name:
+                if segment is not None:
+                    segment.close()
+                segment = shared_memory.SharedMemory(name=name)
+            img = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+            frame = FrameAnalysis(img)
+            result = ("ok", run_checks(frame), frame.largest_face)
+            del frame, img
+        except Exception as exc:
+            result = ("error", f"{type(exc).__name__}: {exc}", None)
+        conn.send(result)
+
+    if segment is not None:
+        segment.close()
+    conn.close()
+
+
+class _Worker:
+    """Parent-side handle of one worker process and its shared-memory segment."""
+
+    def __init__(self, context, settings):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, settings), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.segment = None
+        self.jobs = 0
+
+    def wait_ready(self, timeout):
+        try:
+            if not self.conn.poll(timeout):
+                raise EngineError("Worker did not start in time")
+            self.conn.recv()
+        except (EOFError, OSError):
+            raise EngineError("Worker process exited during start-up")
+
+    def frame_buffer(self, nbytes):
+        """Return this worker's segment, growing it if the frame does not fit."""
+        if self.segment is None or self.segment.size < nbytes:
+            self.release_segment()
+            self.segment = shared_memory.SharedMemory(create=True, size=nbytes)
+        return self.segment
+
+    def release_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+
+    def stop(self, timeout=5):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.release_segment()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self.release_segment()
+
+
+class ProcessPoolEngine:
+    """Pool of worker processes that run the verification checks."""
+
+    def __init__(self, workers=None, max_jobs_per_worker=None, timeout=None,
+                 start_method=None):
+        self.workers = workers or get_setting("ENGINE_WORKERS") or os.cpu_count() or 1
+        self.max_jobs_per_worker = max_jobs_per_worker or get_setting("ENGINE_MAX_JOBS_PER_WORKER")
+        self.timeout = timeout or get_setting("ENGINE_TIMEOUT")
+        self._context = multiprocessing.get_context(
+            start_method or get_setting("ENGINE_START_METHOD")
+        )
+        self._settings = {name: get_setting(name) for name in _WORKER_SETTINGS}
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "queue_depth": 0,
+            "busy": 0,
+            "completed": 0,
+            "failed": 0,
+            "crashes": 0,
+            "timeouts": 0,
+            "recycled": 0,
+        }
+
+        started = [_Worker(self._context, self._settings) for _ in range(self.workers)]
+        for worker in started:
+            worker.wait_ready(self.timeout)
+            self._idle.put(worker)
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def stats(self):
+        """Queue depth and job counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["workers"] = self.workers
+        stats["idle"] = self._idle.qsize()
+        return stats
+
+    def _replace(self, worker, graceful):
+        """Retire `worker` and start a pre-warmed replacement, in the background.
+
+        Stopping a worker gracefully can take a few seconds, so the calling
+        request thread does not wait for it.
+        """
+        def start():
+            if graceful:
+                worker.stop()
+            else:
+                worker.kill()
+            if self._closed:
+                return
+            try:
+                replacement = _Worker(self._context, self._settings)
+                replacement.wait_ready(self.timeout)
+            except Exception:
+                logger.exception("Could not start replacement engine worker")
+                return
+            self._idle.put(replacement)
+
+        threading.Thread(target=start, name="face-liveness-engine-spawn", daemon=True).start()
+
+    def check(self, img):
+        """Run the checks on `img` in a worker; returns (error, largest_face)."""
+        if self._closed:
+            raise EngineError("Engine is shut down")
+
+        self._count("queue_depth")
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise EngineError("No engine worker became available")
+        finally:
+            self._count("queue_depth", -1)
+
+        self._count("busy")
+        try:
+            try:
+                segment = worker.frame_buffer(img.nbytes)
+                np.ndarray(img.shape, dtype=img.dtype, buffer=segment.buf)[...] = img
+            except BaseException:
+                # Nothing was sent, so the worker can take the next job
+                self._idle.put(worker)
+                raise
+            try:
+                worker.conn.send((segment.name, img.shape, img.dtype.str))
+                ready = worker.conn.poll(self.timeout)
+                reply = worker.conn.recv() if ready else None
+            except (EOFError, OSError):
+                self._count("crashes")
+                logger.error("Engine worker %s crashed", worker.process.pid)
+                self._replace(worker, graceful=False)
+                raise EngineError("Worker process crashed")
+            except BaseException:
+                # The worker may still be on this job; never hand it out again
+                self._replace(worker, graceful=False)
+                raise
+            if reply is None:
+                self._count("timeouts")
+                logger.error("Engine worker %s timed out", worker.process.pid)
+                self._replace(worker, graceful=False)
+                raise EngineError("Worker process timed out")
+        finally:
+            self._count("busy", -1)
+
+        worker.jobs += 1
+        if worker.jobs >= self.max_jobs_per_worker:
+            self._count("recycled")
+            self._replace(worker, graceful=True)
+        else:
+            self._idle.put(worker)
+
+        status, error, largest_face = reply
+        if status != "ok":
+            self._count("failed")
+            raise EngineError(error)
+        self._count("completed")
+        return error, largest_face
+
+    def shutdown(self):
+        """Stop all idle workers and release their shared memory."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide engine, started on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                started = time.perf_counter()
+                _engine = ProcessPoolEngine()
+                atexit.register(_engine.shutdown)
+                logger.info("Started %d engine workers in %.2fs",
+                            _engine.workers, time.perf_counter() - started)
+    return _engine
+
+
+def engine_stats():
+    """stats() of the process-wide engine, or None if it has not started."""
+    engine = _engine
+    return engine.stats() if engine is not None else None
@@ -1,20 +1,45 @@
-import cv2
 import base64
-import numpy as np
-import os
-import uuid
+import binascii
 
-def decode_base64_image(base64_str):
-    """Convert base64 string from frontend into an OpenCV image."""
-    try:
-        if "," in base64_str:
-            header, encoded = base64_str.split(",", 1)
-        else:
-            encoded = base64_str
+from ..config import get_setting
+from .detectors import registry
+from .lazy import lazy_import
+from .storage import CaptureStorage, storage
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
 
-        img_data = base64.b64decode(encoded)
-        np_array = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(np_array, cv2.IMREAD_COLOR)
+# JPEG start-of-frame markers that carry the image dimensions
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                     0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Bytes base64.b64decode() ignores, i.e. everything outside the alphabet
+_NON_BASE64 = bytes(set(range(256)) - set(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="))
+# Base64 characters decoded per step by decode_base64_bytes() in LOW_MEMORY mode
+BASE64_CHUNK_CHARS = 1 << 16
+
+# Names of the cv2 decoder flags for each power-of-two reduction (JPEG
+# decodes these via DCT scaling); looked up on use so cv2 loads lazily
+REDUCED_DECODE_FLAGS = {
+    1: "IMREAD_COLOR",
+    2: "IMREAD_REDUCED_COLOR_2",
+    4: "IMREAD_REDUCED_COLOR_4",
+    8: "IMREAD_REDUCED_COLOR_8",
+}
+
+def decode_image_bytes(data, flags=None):
+    """Decode encoded image bytes (JPEG/PNG/WebP) into an OpenCV image.
+
+    Accepts bytes, bytearray or memoryview and wraps it without copying.
+    `flags` defaults to cv2.IMREAD_COLOR.
+    """
+    if flags is None:
+        flags = cv2.IMREAD_COLOR
+    try:
+        np_array = np.frombuffer(data, np.uint8)
+        img = cv2.imdecode(np_array, flags)
 
         if img is None:
             raise ValueError("Could not decode image (imdecode returned None)")
@@ -23,19 +48,225 @@ def decode_base64_image(base64_str):
     except Exception as exc:
         raise ValueError(f"Invalid image data: {exc}")
 
-def save_image(img, folder="captured_faces"):
-    """Save the image and return file path."""
-    os.makedirs(folder, exist_ok=True)
-    filename = f"{uuid.uuid4().hex}.jpg"
-    path = os.path.join(folder, filename)
-    cv2.imwrite(path, img)
-    return path
-
-def detect_face(img):
-    """Basic face detection using OpenCV Haar Cascade."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    )
-    faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-    return len(faces) > 0
+class Base64Decoder:
+    """Incremental base64 decoder writing into one pre-sized bytearray.
+
+    Input may be fed in pieces of any length, as str or bytes; characters
+    that do not complete a 4-character group are carried over to the next
+    feed(). Only one piece is copied at a time, so decoding needs the output
+    plus a chunk instead of a second copy of the payload.
+    """
+
+    def __init__(self, size_hint=0):
+        self._buffer = bytearray(size_hint)
+        self._length = 0
+        self._carry = b""
+
+    def feed(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode("ascii")
+        chunk = self._carry + chunk.translate(None, _NON_BASE64)
+        usable = len(chunk) - len(chunk) % 4
+        self._carry = chunk[usable:]
+        decoded = binascii.a2b_base64(chunk[:usable])
+        end = self._length + len(decoded)
+        self._buffer[self._length:end] = decoded
+        self._length = end
+
+    def finish(self):
+        """Return the decoded bytes; raises binascii.Error on a partial group."""
+        if self._carry:
+            raise binascii.Error("Incorrect padding")
+        del self._buffer[self._length:]
+        return self._buffer
+
+def decode_base64_bytes(base64_str):
+    """Strip an optional data URL header and base64-decode the payload.
+
+    With LOW_MEMORY the payload is decoded in chunks straight from the
+    string instead of slicing out a copy of it first.
+    """
+    try:
+        if get_setting("LOW_MEMORY"):
+            start = base64_str.find(",") + 1
+            decoder = Base64Decoder((len(base64_str) - start) * 3 // 4)
+            for offset in range(start, len(base64_str), BASE64_CHUNK_CHARS):
+                decoder.feed(base64_str[offset:offset + BASE64_CHUNK_CHARS])
+            return decoder.finish()
+        if "," in base64_str:
+            header, encoded = base64_str.split(",", 1)
+        else:
+            encoded = base64_str
+
+        return base64.b64decode(encoded)
+    except Exception as exc:
+        raise ValueError(f"Invalid image data: {exc}")
+
+def decode_base64_image(base64_str):
+    """Convert base64 string from frontend into an OpenCV image."""
+    return decode_image_bytes(decode_base64_bytes(base64_str))
+
+def image_dimensions(data):
+    """Read (width, height) from a JPEG or PNG header without decoding.
+
+    Returns None for other formats or truncated headers.
+    """
+    data = memoryview(data)
+    if bytes(data[:8]) == _PNG_SIGNATURE and len(data) >= 24:
+        return (int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big"))
+    if bytes(data[:2]) != b"\xff\xd8":
+        return None
+
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return (width, height)
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # no length field
+            i += 2
+            continue
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+def is_jpeg(data):
+    """True if the encoded bytes start with a JPEG SOI marker."""
+    return bytes(data[:2]) == b"\xff\xd8"
+
+def full_resolution_shape(data, analysis):
+    """(height, width) of the full-resolution frame, read from the header.
+
+    The decoder applies EXIF orientation, so the header axes are swapped
+    when they disagree with the orientation of the decoded `analysis` copy.
+    Returns None when the header carries no dimensions.
+    """
+    dims = image_dimensions(data)
+    if dims is None:
+        return None
+    width, height = dims
+    if (analysis.shape[1] >= analysis.shape[0]) != (width >= height):
+        width, height = height, width
+    return (height, width)
+
+def reduction_factor(width, height, max_side):
+    """Largest power-of-two reduction that keeps the long side >= max_side."""
+    factor = 1
+    while factor < 8 and max(width, height) // (factor * 2) >= max_side:
+        factor *= 2
+    return factor
+
+def downscale(img, max_side):
+    """Halve the image with pyrDown until another halving would go below max_side."""
+    while max(img.shape[:2]) // 2 >= max_side:
+        img = cv2.pyrDown(img)
+    return img
+
+def decode_for_analysis(data, max_side):
+    """Decode a reduced copy of the image for detection and quality checks.
+
+    Returns (analysis_img, full_img). When the header tells us the size, the
+    reduced copy is decoded directly and full_img is None, so callers only
+    pay for a full-resolution decode once they actually need it. Otherwise
+    the full image is decoded and reduced with an image pyramid.
+    """
+    dims = image_dimensions(data)
+    if dims is None:
+        full = decode_image_bytes(data)
+        return downscale(full, max_side), full
+
+    factor = reduction_factor(dims[0], dims[1], max_side)
+    if factor == 1:
+        full = decode_image_bytes(data)
+        return full, full
+    return decode_image_bytes(data, getattr(cv2, REDUCED_DECODE_FLAGS[factor])), None
+
+def scale_rect(rect, from_shape, to_shape):
+    """Map an (x, y, w, h) rectangle between two resolutions of one image."""
+    sx = to_shape[1] / from_shape[1]
+    sy = to_shape[0] / from_shape[0]
+    x, y, w, h = rect
+    return (int(round(x * sx)), int(round(y * sy)), int(round(w * sx)), int(round(h * sy)))
+
+def encode_jpeg(img):
+    """Encode a BGR image as JPEG bytes."""
+    ok, encoded = cv2.imencode(".jpg", img)
+    if not ok:
+        raise ValueError("Could not encode image")
+    return encoded.tobytes()
+
+def save_image(img, folder=None):
+    """Save the image and return file path.
+
+    Images are stored content-addressed under `folder` (default
+    FACE_LIVENESS_CAPTURE_ROOT); see backend/storage.py.
+    """
+    target = CaptureStorage(root=folder) if folder else storage
+    return target.path(target.save(encode_jpeg(img)))
+
+def detector_input(detector=None):
+    """Image type ("gray" or "bgr") the detector engine works on."""
+    return registry.model(detector or get_setting("DEFAULT_DETECTOR")).input
+
+def face_size_bounds(shape):
+    """(min_size, max_size) in pixels of the faces worth searching for.
+
+    A face smaller than MIN_FACE_AREA of the frame fails face_size_ok(),
+    and one taller than MAX_FACE_HEIGHT of the frame cannot be framed as a
+    passport photo, so the detector never needs to look at those scales.
+    Returns (None, None) with DETECTOR_SIZE_BOUNDS off.
+    """
+    if not get_setting("DETECTOR_SIZE_BOUNDS"):
+        return None, None
+    height, width = shape[:2]
+    min_size = int((width * height * get_setting("MIN_FACE_AREA")) ** 0.5)
+    max_size = max(int(height * get_setting("MAX_FACE_HEIGHT")), min_size)
+    return min_size, max_size
+
+def detect_faces_scored(img, detector=None):
+    """Run a detector engine (default DEFAULT_DETECTOR) on a BGR or gray frame.
+
+    Returns (rects, scores): (x, y, w, h) int32 rows and one float32
+    confidence each, limited to face_size_bounds(); see backend/detectors.py.
+    """
+    name = detector or get_setting("DEFAULT_DETECTOR")
+    return registry.detect(img, name, *face_size_bounds(img.shape))
+
+class FaceDetections:
+    """Faces found in one frame: (x, y, w, h) `rects` and their `scores`.
+
+    Truthy when at least one face was found, so ``if detect_face(img):``
+    reads as before.
+    """
+
+    __slots__ = ("rects", "scores")
+
+    def __init__(self, rects, scores):
+        self.rects = rects
+        self.scores = scores
+
+    def __bool__(self):
+        return len(self.rects) > 0
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __repr__(self):
+        return f"FaceDetections(rects={self.rects.tolist()}, scores={self.scores.tolist()})"
+
+    @property
+    def largest(self):
+        """The largest face as an (x, y, w, h) tuple, or None."""
+        if len(self.rects) == 0:
+            return None
+        areas = self.rects[:, 2].astype(np.int64) * self.rects[:, 3]
+        return tuple(int(v) for v in self.rects[int(np.argmax(areas))])
+
+def detect_face(img, detector=None):
+    """Detect faces with the DEFAULT_DETECTOR engine; returns FaceDetections."""
+    return FaceDetections(*detect_faces_scored(img, detector))
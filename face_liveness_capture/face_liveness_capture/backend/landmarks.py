@@ -0,0 +1,256 @@
+"""
+Server-side liveness checks on MediaPipe FaceMesh landmark sequences.
+
+The widget runs its blink and head-turn checks in the browser, where a
+client can skip them. This module repeats them on the server over the
+landmark frames the client recorded. A sequence is one float32 array of
+shape ``(frames, 468, 3)`` with MediaPipe's normalized x, y and z, and
+every measurement is computed for all frames at once with NumPy:
+
+* eye aspect ratio (EAR) of both eyes, with the same six points per eye
+  as ``calculateEyeAspectRatio`` in widget.js;
+* head yaw, pitch and roll in degrees, in closed form from the 3D eye
+  corners, forehead and chin. MediaPipe already supplies depth, so no
+  camera model or per-frame ``solvePnP`` is needed;
+* blink and turn events: runs of closed-eye or turned-head frames.
+
+Directions are in image coordinates: a "left" turn points the face at
+the left edge of the image, as the widget's ``detectTurnLeft`` does.
+"""
+import itertools
+import operator
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+LANDMARK_COUNT = 468
+# p1..p6 of each eye in the widget's order: outer corner, two upper lid
+# points, inner corner, two lower lid points
+LEFT_EYE = (33, 160, 158, 133, 153, 144)
+RIGHT_EYE = (362, 385, 387, 263, 373, 380)
+# Points that define the head axes
+EYE_OUTER_LEFT = 33    # image-left eye corner
+EYE_OUTER_RIGHT = 263  # image-right eye corner
+FOREHEAD = 10
+CHIN = 152
+NOSE_TIP = 1
+# Every point the measurements read; sparse_frame() copies only these
+FEATURE_POINTS = tuple(sorted(set(
+    LEFT_EYE + RIGHT_EYE + (EYE_OUTER_LEFT, EYE_OUTER_RIGHT, FOREHEAD, CHIN, NOSE_TIP)
+)))
+
+# Eyes count as closed below this EAR and open again above the second
+# value; the gap keeps noise around one threshold from producing blinks
+BLINK_CLOSE_EAR = 0.2
+BLINK_OPEN_EAR = 0.25
+# Closed-eye frames of one blink; longer runs are eyes kept shut
+BLINK_MIN_FRAMES = 1
+BLINK_MAX_FRAMES = 15
+# Yaw (degrees) a head turn must reach, and for how many frames
+TURN_YAW = 20.0
+TURN_MIN_FRAMES = 2
+# Events the widget asks for, in order
+REQUIRED_EVENTS = ("blink", "turn_left", "turn_right")
+
+_XYZ = operator.itemgetter("x", "y", "z")
+
+
+def _dict_frames(frames):
+    """(frames, points, 3) array from lists of {"x", "y", "z"} dicts."""
+    lengths = {len(frame) for frame in frames}
+    if len(lengths) != 1:
+        raise ValueError("Landmark frames must all have the same shape")
+    points = itertools.chain.from_iterable(frames)
+    try:
+        # One flat pass through C-level iterators; about twice as fast as
+        # building nested lists for np.asarray()
+        values = np.fromiter(itertools.chain.from_iterable(map(_XYZ, points)), np.float32)
+    except KeyError:
+        try:
+            values = np.fromiter(itertools.chain.from_iterable(
+                (p["x"], p["y"], p.get("z", 0.0)) for p in itertools.chain.from_iterable(frames)
+            ), np.float32)
+        except KeyError as exc:
+            raise ValueError(f"Landmark point without {exc}")
+    return values.reshape(len(frames), lengths.pop(), 3)
+
+
+def as_landmark_array(frames):
+    """Return landmark frames as a float32 array of shape (frames, 468, 3).
+
+    Accepts an array of shape (frames, 468, 2 or 3) or (468, 2 or 3), or
+    nested lists of [x, y(, z)] points or {"x", "y", "z"} dicts as sent by
+    the widget. Missing z is taken as 0. Raises ValueError for any other
+    shape.
+    """
+    if not isinstance(frames, np.ndarray):
+        frames = list(frames)
+        if frames and not isinstance(frames[0], (list, tuple, dict, np.ndarray)):
+            raise ValueError("Expected landmark frames")
+        if frames and isinstance(frames[0], dict):
+            frames = [frames]
+        if frames and len(frames[0]) and isinstance(frames[0][0], dict):
+            frames = _dict_frames(frames)
+    try:
+        landmarks = np.asarray(frames, dtype=np.float32)
+    except ValueError:
+        raise ValueError("Landmark frames must all have the same shape")
+    if landmarks.ndim == 2:
+        landmarks = landmarks[np.newaxis]
+    if landmarks.ndim != 3 or landmarks.shape[1] != LANDMARK_COUNT or landmarks.shape[2] not in (2, 3):
+        raise ValueError(f"Expected landmark frames of shape (n, {LANDMARK_COUNT}, 3), "
+                         f"got {landmarks.shape}")
+    if landmarks.shape[2] == 2:
+        landmarks = np.concatenate([landmarks, np.zeros(landmarks.shape[:2] + (1,), np.float32)], axis=2)
+    return landmarks
+
+
+def sparse_frame(points):
+    """(1, 468, 3) array holding only FEATURE_POINTS of one frame.
+
+    `points` is a list of 468 [x, y(, z)] points or {"x", "y", "z"} dicts,
+    or a dict mapping point indices (int or str) to points that contains
+    at least FEATURE_POINTS. Only those points are read, so the cost does
+    not depend on how many were sent; the others stay 0.
+    """
+    frame = np.zeros((1, LANDMARK_COUNT, 3), dtype=np.float32)
+    try:
+        if isinstance(points, dict):
+            picked = [points[i] if i in points else points[str(i)] for i in FEATURE_POINTS]
+        else:
+            if len(points) != LANDMARK_COUNT:
+                raise ValueError(f"Expected {LANDMARK_COUNT} landmarks, got {len(points)}")
+            picked = [points[i] for i in FEATURE_POINTS]
+        for index, point in zip(FEATURE_POINTS, picked):
+            if isinstance(point, dict):
+                point = (point["x"], point["y"], point.get("z", 0.0))
+            frame[0, index, :len(point)] = point
+    except (KeyError, TypeError, IndexError) as exc:
+        raise ValueError(f"Invalid landmark frame: {exc!r}")
+    return frame
+
+
+def _isotropic(landmarks, aspect):
+    """Scale y so x, y and z share units (normalized coords are per axis)."""
+    if aspect == 1.0:
+        return landmarks
+    return landmarks * np.array([1.0, 1.0 / aspect, 1.0], dtype=np.float32)
+
+
+def eye_aspect_ratio(landmarks, aspect=1.0):
+    """Mean EAR of both eyes for every frame; shape (frames,).
+
+    EAR = (|p2 - p6| + |p3 - p5|) / (2 |p1 - p4|), from the image-plane
+    coordinates. `aspect` is the frame's width / height.
+    """
+    points = _isotropic(landmarks, aspect)[:, LEFT_EYE + RIGHT_EYE, :2]
+    points = points.reshape(len(points), 2, 6, 2)
+    vertical = (np.linalg.norm(points[:, :, 1] - points[:, :, 5], axis=-1)
+                + np.linalg.norm(points[:, :, 2] - points[:, :, 4], axis=-1))
+    horizontal = np.linalg.norm(points[:, :, 0] - points[:, :, 3], axis=-1)
+    ear = vertical / (2.0 * np.maximum(horizontal, 1e-6))
+    return ear.mean(axis=1)
+
+
+def head_pose(landmarks, aspect=1.0):
+    """(yaw, pitch, roll) in degrees for every frame; shape (frames, 3).
+
+    The head's x axis runs between the outer eye corners and its y axis
+    from forehead to chin (made orthogonal to x); their cross product is
+    the face normal. The angles decompose the head rotation as yaw, then
+    pitch, then roll. Yaw is positive when the face points at the right of
+    the image, pitch when it points up, roll when the right eye is lower.
+    """
+    points = _isotropic(landmarks, aspect)
+    x_axis = points[:, EYE_OUTER_RIGHT] - points[:, EYE_OUTER_LEFT]
+    x_axis /= np.maximum(np.linalg.norm(x_axis, axis=1, keepdims=True), 1e-9)
+    y_axis = points[:, CHIN] - points[:, FOREHEAD]
+    y_axis -= np.sum(y_axis * x_axis, axis=1, keepdims=True) * x_axis
+    y_axis /= np.maximum(np.linalg.norm(y_axis, axis=1, keepdims=True), 1e-9)
+    # Image x right, y down, z away from the camera: x cross y points away,
+    # so the face looks along its negation
+    facing = -np.cross(x_axis, y_axis)
+    yaw = np.degrees(np.arctan2(facing[:, 0], -facing[:, 2]))
+    pitch = np.degrees(np.arcsin(np.clip(-facing[:, 1], -1.0, 1.0)))
+    roll = np.degrees(np.arctan2(x_axis[:, 1], y_axis[:, 1]))
+    return np.stack([yaw, pitch, roll], axis=1)
+
+
+def _runs(mask):
+    """(starts, ends) of the runs of True in a boolean array; ends exclusive."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def blink_events(ear, close=BLINK_CLOSE_EAR, open_=BLINK_OPEN_EAR,
+                 min_frames=BLINK_MIN_FRAMES, max_frames=BLINK_MAX_FRAMES):
+    """(start, end) frame ranges of the blinks in an EAR series.
+
+    A blink is a run of `min_frames` to `max_frames` frames with EAR below
+    `close`, with an open-eye frame (EAR above `open_`) somewhere before it
+    and after it.
+    """
+    ear = np.asarray(ear)
+    starts, ends = _runs(ear < close)
+    if len(starts) == 0:
+        return []
+    frame = np.arange(len(ear))
+    is_open = ear > open_
+    last_open = np.maximum.accumulate(np.where(is_open, frame, -1))
+    next_open = np.minimum.accumulate(np.where(is_open, frame, len(ear))[::-1])[::-1]
+    lengths = ends - starts
+    keep = ((lengths >= min_frames) & (lengths <= max_frames)
+            & (last_open[starts] >= 0) & (next_open[ends - 1] < len(ear)))
+    return list(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+
+def turn_events(yaw, threshold=TURN_YAW, min_frames=TURN_MIN_FRAMES):
+    """{"turn_left": [...], "turn_right": [...]} (start, end) frame ranges
+    where |yaw| stays beyond `threshold` for at least `min_frames` frames.
+    """
+    yaw = np.asarray(yaw)
+    events = {}
+    for name, mask in (("turn_left", yaw < -threshold), ("turn_right", yaw > threshold)):
+        starts, ends = _runs(mask)
+        keep = ends - starts >= min_frames
+        events[name] = list(zip(starts[keep].tolist(), ends[keep].tolist()))
+    return events
+
+
+def _in_order(events, required):
+    """Whether each required event starts after the previous one ended."""
+    position = 0
+    for name in required:
+        # Event ranges are sorted by start
+        following = [end for start, end in events[name] if start >= position]
+        if not following:
+            return False
+        position = following[0]
+    return True
+
+
+def verify_landmark_sequence(frames, aspect=1.0, required=REQUIRED_EVENTS, ordered=True):
+    """Check a recorded landmark sequence for blink and head-turn events.
+
+    `frames` is anything as_landmark_array() accepts and `aspect` the
+    camera frame's width / height. Returns a dict with "live" (every
+    `required` event found and, when `ordered`, "in_order"), the "missing"
+    event names, the (start, end) frame ranges of each event under
+    "events", and the per-frame "ear" and "yaw" ranges.
+    """
+    landmarks = as_landmark_array(frames)
+    ear = eye_aspect_ratio(landmarks, aspect)
+    yaw = head_pose(landmarks, aspect)[:, 0]
+    events = {"blink": blink_events(ear), **turn_events(yaw)}
+    missing = [name for name in required if not events[name]]
+    in_order = not missing and _in_order(events, required)
+    return {
+        "live": not missing and (in_order or not ordered),
+        "in_order": in_order,
+        "missing": missing,
+        "events": events,
+        "frames": len(landmarks),
+        "ear": (float(ear.min()), float(ear.max())),
+        "yaw": (float(yaw.min()), float(yaw.max())),
+    }
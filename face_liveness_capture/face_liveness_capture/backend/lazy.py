@@ -0,0 +1,26 @@
+"""
+Deferred imports of heavy third-party modules.
+
+``cv2 = lazy_import("cv2")`` binds a placeholder module that imports OpenCV
+the first time one of its attributes is used. Importing the package (URLconf
+loading, management commands, worker boot) then stays cheap, and the first
+verification, or an explicit warm-up, pays for the import instead. Once
+loaded, the real module's attributes are copied onto the placeholder, so
+later lookups cost the same as with a plain import.
+"""
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Placeholder that imports the named module on first attribute access."""
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """Return a placeholder for module `name`; see LazyModule."""
+    return LazyModule(name)
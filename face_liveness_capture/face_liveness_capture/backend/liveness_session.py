@@ -0,0 +1,192 @@
+"""
+Incremental liveness state for one streaming session.
+
+A LivenessSession takes landmark frames one at a time, as a WebSocket
+receives them, and walks through the widget's stages: face centred, blink,
+turn left, turn right, then capture. Each frame costs the same no matter
+how long the session has run. Only the FEATURE_POINTS of a frame are read
+(backend/landmarks.py), and the blink and turn detectors keep run counters
+instead of re-scanning history. Fixed-size float32 ring buffers hold the
+FEATURE_POINTS and the (EAR, yaw, pitch) of the recent frames, and EAR
+mean and variance are kept as running (Welford) statistics, so a session
+holds a few kilobytes however long it runs (``nbytes``).
+
+The thresholds are the ones verify_landmark_sequence() uses, so a recorded
+session and a streamed one reach the same verdict.
+"""
+import time
+
+from . import landmarks as lm
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+STAGES = ("face", "blink", "turn_left", "turn_right", "capture", "done")
+# Nose distance from the frame centre, as a fraction of the shorter side,
+# that counts as centred (the widget's circle guide)
+FACE_CENTRE_RADIUS = 0.33
+# Recent landmark frames kept per session
+WINDOW = 64
+# Columns of the measurement ring buffer
+EAR, YAW, PITCH = range(3)
+
+
+class LivenessSession:
+    """Stage machine fed one landmark frame (or face observation) at a time."""
+
+    __slots__ = (
+        "aspect", "stage", "frames", "started", "buffered", "landmarks", "recent",
+        "ear_count", "ear_mean", "_ear_m2", "_seen_open", "_closed_run",
+        "_pending_blink", "_left_run", "_right_run",
+    )
+
+    def __init__(self, aspect=1.0, window=WINDOW):
+        self.aspect = aspect
+        self.stage = STAGES[0]
+        self.frames = 0
+        self.started = time.monotonic()
+        # Ring buffers of the last `window` landmark frames: their
+        # FEATURE_POINTS, and (EAR, yaw, pitch)
+        self.buffered = 0
+        self.landmarks = np.zeros((window, len(lm.FEATURE_POINTS), 3), dtype=np.float32)
+        self.recent = np.zeros((window, 3), dtype=np.float32)
+        # Running EAR statistics (Welford)
+        self.ear_count = 0
+        self.ear_mean = 0.0
+        self._ear_m2 = 0.0
+        # Blink detector: open frame seen, length of the current closed run,
+        # and a closed run of blink length still waiting for the eyes to open
+        self._seen_open = False
+        self._closed_run = 0
+        self._pending_blink = False
+        # Consecutive frames turned left / right
+        self._left_run = 0
+        self._right_run = 0
+
+    @property
+    def ear_std(self):
+        if self.ear_count < 2:
+            return 0.0
+        return (self._ear_m2 / (self.ear_count - 1)) ** 0.5
+
+    @property
+    def nbytes(self):
+        """Bytes held by the ring buffers."""
+        return self.landmarks.nbytes + self.recent.nbytes
+
+    def _ordered(self, ring):
+        count = min(self.buffered, len(ring))
+        start = (self.buffered - count) % len(ring)
+        return np.roll(ring, -start, axis=0)[:count]
+
+    def window(self):
+        """The buffered (EAR, yaw, pitch) rows, oldest first."""
+        return self._ordered(self.recent)
+
+    def landmark_window(self):
+        """The buffered frames as a (frames, 468, 3) array, oldest first.
+
+        Only FEATURE_POINTS are filled, which is all verify_landmark_sequence()
+        reads.
+        """
+        points = self._ordered(self.landmarks)
+        frames = np.zeros((len(points), lm.LANDMARK_COUNT, 3), dtype=np.float32)
+        frames[:, lm.FEATURE_POINTS] = points
+        return frames
+
+    def _advance(self):
+        self.stage = STAGES[STAGES.index(self.stage) + 1]
+        return self.stage
+
+    def _centred(self, x, y):
+        """Whether normalized point (x, y) lies in the centre circle."""
+        dx, dy = x - 0.5, y - 0.5
+        if self.aspect >= 1:
+            dx *= self.aspect
+        else:
+            dy /= self.aspect
+        return dx * dx + dy * dy < FACE_CENTRE_RADIUS ** 2
+
+    def _track_ear(self, ear):
+        self.ear_count += 1
+        delta = ear - self.ear_mean
+        self.ear_mean += delta / self.ear_count
+        self._ear_m2 += delta * (ear - self.ear_mean)
+
+        blinked = False
+        if ear < lm.BLINK_CLOSE_EAR:
+            self._closed_run += 1
+        else:
+            if self._closed_run and self._seen_open and (
+                    lm.BLINK_MIN_FRAMES <= self._closed_run <= lm.BLINK_MAX_FRAMES):
+                self._pending_blink = True
+            self._closed_run = 0
+            if ear > lm.BLINK_OPEN_EAR:
+                blinked = self._pending_blink
+                self._pending_blink = False
+                self._seen_open = True
+        return blinked
+
+    def _track_yaw(self, yaw):
+        self._left_run = self._left_run + 1 if yaw < -lm.TURN_YAW else 0
+        self._right_run = self._right_run + 1 if yaw > lm.TURN_YAW else 0
+
+    def add_landmarks(self, points):
+        """Process one landmark frame (see landmarks.sparse_frame()).
+
+        Returns the new stage if this frame completed the current one,
+        otherwise None. Raises ValueError for a malformed frame.
+        """
+        frame = lm.sparse_frame(points)
+        ear = float(lm.eye_aspect_ratio(frame, self.aspect)[0])
+        yaw, pitch, _ = lm.head_pose(frame, self.aspect)[0].tolist()
+        slot = self.buffered % len(self.recent)
+        self.landmarks[slot] = frame[0, lm.FEATURE_POINTS]
+        self.recent[slot] = (ear, yaw, pitch)
+        self.buffered += 1
+        self.frames += 1
+        blinked = self._track_ear(ear)
+        self._track_yaw(yaw)
+
+        stage = self.stage
+        if stage == "face":
+            nose = frame[0, lm.NOSE_TIP]
+            done = self._centred(nose[0], nose[1])
+        elif stage == "blink":
+            done = blinked
+        elif stage == "turn_left":
+            done = self._left_run >= lm.TURN_MIN_FRAMES
+        elif stage == "turn_right":
+            done = self._right_run >= lm.TURN_MIN_FRAMES
+        else:
+            done = False
+        return self._advance() if done else None
+
+    def add_face(self, rect, shape):
+        """Process a face found in a small video frame of `shape`.
+
+        Frames can only complete the "face" stage (the others need
+        landmarks). Returns the new stage or None.
+        """
+        self.frames += 1
+        if self.stage != "face" or rect is None:
+            return None
+        x, y, w, h = rect
+        height, width = shape[:2]
+        if self._centred((x + w / 2) / width, (y + h / 2) / height):
+            return self._advance()
+        return None
+
+    def finish(self):
+        """Mark the capture as verified."""
+        self.stage = "done"
+
+    def summary(self):
+        """JSON-serializable state for status messages."""
+        return {
+            "stage": self.stage,
+            "frames": self.frames,
+            "seconds": round(time.monotonic() - self.started, 3),
+            "ear_mean": round(self.ear_mean, 4),
+            "ear_std": round(self.ear_std, 4),
+        }
@@ -0,0 +1,398 @@
+"""
+Per-stage timing and Prometheus metrics for the verification pipeline.
+
+verify_liveness wraps each stage (decode, checks, encode, store) in
+``stage(name)``, which feeds a latency histogram and, inside
+``collect_timings()``, the per-request timings the upload views send as a
+``Server-Timing`` header. Outcomes are counted per rejection reason, and
+upload sizes and resolutions go into histograms. ``render()`` produces the
+Prometheus text format served by the metrics view.
+
+With ``FACE_LIVENESS_METRICS = False`` ``stage()`` returns a shared no-op
+context manager and nothing is recorded.
+
+With ``FACE_LIVENESS_MEMORY_PROFILE = True`` every stage also records the
+peak traced allocation (tracemalloc; NumPy buffers included) above the level
+at stage entry and the change in resident set size. Peaks feed
+``face_liveness_stage_peak_bytes`` and, inside ``collect_memory()``, the
+``X-Memory-Profile`` header. tracemalloc is process-wide, so per-stage peaks
+are only exact while one request is processed at a time; run the profiler
+with a single worker thread. Tracing runs only while a stage is open: if
+the profiler started tracemalloc, it stops it when the last open stage in
+the process exits. Peak tracking needs Python 3.9 or later.
+"""
+import contextlib
+import contextvars
+import os
+import threading
+import time
+import tracemalloc
+
+from ..config import get_setting
+
+# Timings of the request being handled; set by collect_timings()
+_current_timings = contextvars.ContextVar("face_liveness_timings", default=None)
+# Memory peaks of the request being handled; set by collect_memory()
+_current_memory = contextvars.ContextVar("face_liveness_memory", default=None)
+# Memory stages open in this thread, innermost last
+_open_stages = threading.local()
+# Outermost memory stages open in any thread, and whether they started
+# tracemalloc (and so must stop it)
+_tracing = {"stages": 0, "started": False}
+_tracing_lock = threading.Lock()
+_NOOP = contextlib.nullcontext()
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_le(bound):
+    return "+Inf" if bound == float("inf") else _format_value(float(bound))
+
+
+class Counter:
+    """Monotonic counter with one label."""
+
+    def __init__(self, name, help, label):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value):
+        with self._lock:
+            return self._values.get(label_value, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_value, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{{{self.label}="{label_value}"}} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with an optional label."""
+
+    def __init__(self, name, help, buckets, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, label_value=None):
+        with self._lock:
+            series = self._series.get(label_value)
+            return series[2] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, (counts, total, count) in sorted(
+                    self._series.items(), key=lambda item: str(item[0])):
+                labels = f'{self.label}="{label_value}",' if self.label else ""
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f'{self.name}_bucket{{{labels}le="{_format_le(bound)}"}} {cumulative}')
+                suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+                lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+                lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "face_liveness_stage_seconds",
+    "Time spent in each verification stage.",
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    label="stage",
+)
+RESULTS = Counter(
+    "face_liveness_results_total",
+    "Verification results by outcome (saved or rejection reason).",
+    label="outcome",
+)
+IMAGE_BYTES = Histogram(
+    "face_liveness_image_bytes",
+    "Encoded size of uploaded images.",
+    (16 << 10, 32 << 10, 64 << 10, 128 << 10, 256 << 10, 512 << 10,
+     1 << 20, 2 << 20, 4 << 20, 8 << 20),
+)
+IMAGE_PIXELS = Histogram(
+    "face_liveness_image_pixels",
+    "Resolution (width x height) of uploaded images.",
+    (320 * 240, 640 * 480, 1280 * 720, 1920 * 1080, 2592 * 1944, 3264 * 2448, 4000 * 3000,
+     6000 * 4000),
+)
+STAGE_PEAK_BYTES = Histogram(
+    "face_liveness_stage_peak_bytes",
+    "Peak traced allocation in each verification stage (MEMORY_PROFILE only).",
+    (64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20, 64 << 20, 256 << 20, 1 << 30),
+    label="stage",
+)
+METRICS = [STAGE_SECONDS, RESULTS, IMAGE_BYTES, IMAGE_PIXELS, STAGE_PEAK_BYTES]
+
+
+def enabled():
+    return get_setting("METRICS")
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None if unknown."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, name)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_stage(self.name, time.perf_counter() - self.started)
+
+
+class _MemoryStage:
+    """Stage that also measures peak traced memory and the RSS change.
+
+    tracemalloc keeps one peak, so entering a nested stage hands the peak
+    reached so far to its parent before resetting it.
+    """
+    __slots__ = ("name", "timed", "started", "base", "child_peak", "rss")
+
+    def __init__(self, name, timed):
+        self.name = name
+        self.timed = timed
+
+    def __enter__(self):
+        stack = getattr(_open_stages, "stack", None)
+        if stack is None:
+            stack = _open_stages.stack = []
+        if not stack:
+            with _tracing_lock:
+                if _tracing["stages"] == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracing["started"] = True
+                _tracing["stages"] += 1
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self.base = current
+        self.child_peak = 0
+        self.rss = rss_bytes()
+        stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        stack = _open_stages.stack
+        stack.pop()
+        peak = None
+        if hasattr(tracemalloc, "reset_peak"):
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak) - self.base
+        if not stack:
+            with _tracing_lock:
+                _tracing["stages"] -= 1
+                if _tracing["stages"] == 0 and _tracing["started"]:
+                    tracemalloc.stop()
+                    _tracing["started"] = False
+        rss = rss_bytes()
+        rss_delta = rss - self.rss if rss is not None and self.rss is not None else None
+        record_memory(self.name, peak, rss_delta)
+        if self.timed:
+            record_stage(self.name, elapsed)
+
+
+def stage(name):
+    """Context manager timing one pipeline stage."""
+    if get_setting("MEMORY_PROFILE"):
+        return _MemoryStage(name, timed=enabled())
+    if not enabled():
+        return _NOOP
+    return _Stage(name)
+
+
+def record_memory(name, peak_bytes, rss_delta_bytes):
+    if peak_bytes is not None:
+        STAGE_PEAK_BYTES.observe(peak_bytes, name)
+    memory = _current_memory.get()
+    if memory is not None:
+        memory[name] = {"peak_bytes": peak_bytes, "rss_delta_bytes": rss_delta_bytes}
+
+
+def outcome_label(result):
+    """Bounded label for a verification result, e.g. "image_too_dark"."""
+    error = result.get("error")
+    if not error:
+        return "saved"
+    return error.split(":", 1)[0].strip().lower().replace(" ", "_")
+
+
+def record_result(result):
+    if enabled():
+        RESULTS.inc(outcome_label(result))
+
+
+def record_image(nbytes, pixels=None):
+    if enabled():
+        IMAGE_BYTES.observe(nbytes)
+        if pixels:
+            IMAGE_PIXELS.observe(pixels)
+
+
+@contextlib.contextmanager
+def collect_timings():
+    """Collect the stage timings of the current request into a dict."""
+    timings = {}
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextlib.contextmanager
+def collect_memory():
+    """Collect the per-stage memory of the current request into a dict."""
+    memory = {}
+    token = _current_memory.set(memory)
+    try:
+        yield memory
+    finally:
+        _current_memory.reset(token)
+
+
+def server_timing(timings):
+    """Format stage timings (seconds) as a Server-Timing header value."""
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+
+
+def memory_profile(memory):
+    """Format per-stage memory as an X-Memory-Profile header value."""
+    parts = []
+    for name, values in memory.items():
+        fields = [name]
+        if values["peak_bytes"] is not None:
+            fields.append(f"peak={values['peak_bytes']}")
+        if values["rss_delta_bytes"] is not None:
+            fields.append(f"rss={values['rss_delta_bytes']}")
+        parts.append(";".join(fields))
+    return ", ".join(parts)
+
+
+def _sample(name, kind, help, value):
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+
+
+# engine.stats() key -> (metric name, type, help)
+_ENGINE_METRICS = {
+    "queue_depth": ("face_liveness_engine_queue_depth", "gauge", "Jobs waiting for an engine worker."),
+    "busy": ("face_liveness_engine_busy_workers", "gauge", "Engine workers running a job."),
+    "idle": ("face_liveness_engine_idle_workers", "gauge", "Engine workers waiting for a job."),
+    "workers": ("face_liveness_engine_workers", "gauge", "Configured engine worker processes."),
+    "completed": ("face_liveness_engine_jobs_completed_total", "counter", "Engine jobs completed."),
+    "failed": ("face_liveness_engine_jobs_failed_total", "counter", "Engine jobs that failed."),
+    "crashes": ("face_liveness_engine_worker_crashes_total", "counter", "Engine workers that crashed."),
+    "timeouts": ("face_liveness_engine_worker_timeouts_total", "counter", "Engine jobs that timed out."),
+    "recycled": ("face_liveness_engine_workers_recycled_total", "counter",
+                 "Engine workers replaced after ENGINE_MAX_JOBS_PER_WORKER jobs."),
+}
+
+
+def _engine_samples():
+    """Process engine queue and worker metrics, once the engine has started."""
+    from .engine import engine_stats
+
+    stats = engine_stats()
+    if stats is None:
+        return []
+    lines = []
+    for key, (name, kind, help) in _ENGINE_METRICS.items():
+        lines.extend(_sample(name, kind, help, stats[key]))
+    return lines
+
+
+def _websocket_samples():
+    """Streaming liveness connections and session store figures."""
+    from ..django_integration.websocket import session_stats
+
+    stats = session_stats()
+    store = stats["store"]
+    lines = []
+    for name, kind, help, value in (
+        ("face_liveness_websocket_connections", "gauge",
+         "Open liveness WebSocket connections.", stats["active"]),
+        ("face_liveness_sessions", "gauge", "Liveness sessions in the session store.",
+         store["sessions"]),
+        ("face_liveness_session_bytes", "gauge",
+         "Ring-buffer bytes held by stored liveness sessions.", store["bytes"]),
+        ("face_liveness_sessions_created_total", "counter", "Liveness sessions created.",
+         store["created"]),
+        ("face_liveness_sessions_expired_total", "counter",
+         "Liveness sessions dropped after SESSION_STORE_TTL.", store["expired"]),
+        ("face_liveness_sessions_evicted_total", "counter",
+         "Liveness sessions evicted to stay under SESSION_STORE_MAX_BYTES.", store["evicted"]),
+    ):
+        lines.extend(_sample(name, kind, help, value))
+    return lines
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    from .cache import result_cache
+    from .persistence import writer
+
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    cache = result_cache.stats()
+    lines.extend(_sample("face_liveness_result_cache_hits_total", "counter",
+                         "Result cache hits.", cache["hits"] + cache["shared_hits"]))
+    lines.extend(_sample("face_liveness_result_cache_misses_total", "counter",
+                         "Result cache misses.", cache["misses"]))
+    lines.extend(_sample("face_liveness_write_behind_queue_depth", "gauge",
+                         "Captures waiting to be written.", writer.stats()["queue_depth"]))
+    if get_setting("ENGINE") == "process":
+        lines.extend(_engine_samples())
+    lines.extend(_websocket_samples())
+    return "\n".join(lines) + "\n"
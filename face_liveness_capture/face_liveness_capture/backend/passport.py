@@ -0,0 +1,132 @@
+"""
+Server-side passport crop and size-targeted JPEG encoding.
+
+With ``FACE_LIVENESS_PASSPORT_CROP = True`` verify_liveness stores a 7:9
+(35x45 mm) crop around the detected face, with headroom and shoulders,
+resized to PASSPORT_SIZE and encoded at the highest JPEG quality that fits
+PASSPORT_MAX_BYTES. Leave it off for clients that already upload a
+passport crop (the bundled widget does).
+"""
+import time
+
+from ..config import get_setting
+from .lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+# Width / height of a 35x45 mm passport photo
+PASSPORT_ASPECT = 7 / 9
+# Detected face box height as a fraction of the crop height
+FACE_HEIGHT_FRACTION = 0.5
+# Space above the face box as a fraction of the crop height (hair, headroom)
+HEADROOM_FRACTION = 0.22
+
+
+def passport_rect(face, frame_shape):
+    """7:9 crop (x, y, w, h) around a face rectangle, clamped to the frame.
+
+    The crop is centred on the face horizontally and extends below it to
+    include the shoulders. When the frame is too small for the ideal crop,
+    the largest 7:9 crop that fits is used instead.
+    """
+    fx, fy, fw, fh = face
+    frame_h, frame_w = frame_shape[:2]
+
+    h = fh / FACE_HEIGHT_FRACTION
+    w = h * PASSPORT_ASPECT
+    if w > frame_w:
+        w, h = frame_w, frame_w / PASSPORT_ASPECT
+    if h > frame_h:
+        w, h = frame_h * PASSPORT_ASPECT, frame_h
+
+    x = fx + fw / 2 - w / 2
+    y = fy - h * HEADROOM_FRACTION
+    x = min(max(x, 0), frame_w - w)
+    y = min(max(y, 0), frame_h - h)
+    return (int(round(x)), int(round(y)), int(w), int(h))
+
+
+def crop_passport(img, face, size=None):
+    """Crop `img` to the passport rectangle around `face` and resize to `size`.
+
+    Returns (passport_img, face_in_passport), the face rectangle mapped into
+    the resized crop.
+    """
+    width, height = size or get_setting("PASSPORT_SIZE")
+    x, y, w, h = passport_rect(face, img.shape)
+    crop = img[y:y + h, x:x + w]
+    interpolation = cv2.INTER_AREA if w > width else cv2.INTER_CUBIC
+    passport = cv2.resize(crop, (width, height), interpolation=interpolation)
+
+    sx, sy = width / w, height / h
+    fx, fy, fw, fh = face
+    mapped = (int(round((fx - x) * sx)), int(round((fy - y) * sy)),
+              int(round(fw * sx)), int(round(fh * sy)))
+    return passport, mapped
+
+
+def encode_to_budget(img, max_bytes=None, min_quality=None, max_quality=None):
+    """Encode `img` as the highest-quality JPEG no larger than `max_bytes`.
+
+    JPEG size grows monotonically with quality, so the quality is found by
+    binary search after trying `max_quality` first (most small crops fit
+    at once). Returns (data, quality, passes). If even `min_quality` is too
+    large, that encoding is returned.
+    """
+    max_bytes = max_bytes or get_setting("PASSPORT_MAX_BYTES")
+    lo = min_quality or get_setting("PASSPORT_MIN_QUALITY")
+    hi = max_quality or get_setting("PASSPORT_MAX_QUALITY")
+    passes = 0
+
+    def encode(quality):
+        nonlocal passes
+        passes += 1
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Could not encode image")
+        return buf.tobytes()
+
+    data = encode(hi)
+    if len(data) <= max_bytes:
+        return data, hi, passes
+
+    # Invariant: everything above `hi` is too large
+    best = best_quality = None
+    floor = lo
+    hi -= 1
+    while lo <= hi:
+        quality = (lo + hi) // 2
+        data = encode(quality)
+        if len(data) <= max_bytes:
+            best, best_quality = data, quality
+            lo = quality + 1
+        else:
+            hi = quality - 1
+
+    if best is None:
+        # Nothing fits; the search ended on the lowest quality
+        return data, floor, passes
+    return best, best_quality, passes
+
+
+def passport_capture(img, face):
+    """Crop and encode a passport photo; returns (data, face, details).
+
+    `details` reports the chosen quality, encode passes and stage timings
+    in milliseconds.
+    """
+    started = time.perf_counter()
+    passport, mapped = crop_passport(img, face)
+    cropped = time.perf_counter()
+    data, quality, passes = encode_to_budget(passport)
+    encoded = time.perf_counter()
+    details = {
+        "quality": quality,
+        "bytes": len(data),
+        "encode_passes": passes,
+        "timings": {
+            "crop_ms": round((cropped - started) * 1000, 3),
+            "encode_ms": round((encoded - cropped) * 1000, 3),
+        },
+    }
+    return data, mapped, details
@@ -0,0 +1,153 @@
+"""
+Write-behind persistence of validated captures.
+
+With ``FACE_LIVENESS_WRITE_BEHIND = True`` verify_liveness hands the encoded
+image to a bounded queue and returns its capture ID immediately. Background
+writer threads store it in the capture storage (backend/storage.py) with an
+fsync before the atomic rename and of the directory after it; only then does
+the capture's status become "persisted". If the queue stays full, the image is written synchronously
+rather than dropped. The queue is flushed when the process exits.
+"""
+import atexit
+import logging
+import queue
+import threading
+from collections import OrderedDict
+
+from ..config import get_setting
+from .storage import storage
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PERSISTED = "persisted"
+FAILED = "failed"
+
+
+class WriteBehindWriter:
+    """Bounded queue drained by background writer threads."""
+
+    def __init__(self):
+        self._queue = None
+        self._threads = []
+        self._status = OrderedDict()
+        # Callbacks waiting for a pending capture to be persisted
+        self._on_persisted = {}
+        self._lock = threading.Lock()
+        self._stats = {"queued": 0, "persisted": 0, "failed": 0, "sync_fallbacks": 0}
+
+    def _ensure_started(self):
+        if self._queue is not None:
+            return
+        with self._lock:
+            if self._queue is not None:
+                return
+            self._queue = queue.Queue(maxsize=get_setting("WRITE_BEHIND_QUEUE_SIZE"))
+            for i in range(get_setting("WRITE_BEHIND_WORKERS")):
+                thread = threading.Thread(
+                    target=self._run, name=f"face-liveness-writer-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def _set_status(self, capture_id, status, path, error=None):
+        with self._lock:
+            self._status[capture_id] = {"status": status, "path": path, "error": error}
+            self._status.move_to_end(capture_id)
+            while len(self._status) > get_setting("WRITE_BEHIND_STATUS_SIZE"):
+                self._status.popitem(last=False)
+
+    def submit(self, capture_id, data):
+        """Queue encoded image bytes for storage; returns their eventual path."""
+        self._ensure_started()
+        path = storage.path(capture_id)
+        self._set_status(capture_id, PENDING, path)
+        try:
+            self._queue.put((capture_id, path, data), timeout=get_setting("WRITE_BEHIND_PUT_TIMEOUT"))
+        except queue.Full:
+            logger.warning("Write-behind queue full, writing %s synchronously", capture_id)
+            with self._lock:
+                self._stats["sync_fallbacks"] += 1
+            self._write(capture_id, path, data)
+            return path
+        with self._lock:
+            self._stats["queued"] += 1
+        return path
+
+    def when_persisted(self, capture_id, callback):
+        """Call `callback()` once `capture_id` is on disk.
+
+        Runs it now if the capture is already persisted, and never if its
+        write fails or this process did not queue it.
+        """
+        with self._lock:
+            entry = self._status.get(capture_id)
+            if entry is None or entry["status"] == FAILED:
+                return
+            if entry["status"] == PENDING:
+                self._on_persisted.setdefault(capture_id, []).append(callback)
+                return
+        callback()
+
+    def _write(self, capture_id, path, data):
+        try:
+            storage.save(data, capture_id, fsync=True)
+        except Exception as e:
+            logger.exception("Could not persist capture %s", capture_id)
+            self._set_status(capture_id, FAILED, path, str(e))
+            with self._lock:
+                self._stats["failed"] += 1
+                self._on_persisted.pop(capture_id, None)
+            return
+        self._set_status(capture_id, PERSISTED, path)
+        with self._lock:
+            self._stats["persisted"] += 1
+            callbacks = self._on_persisted.pop(capture_id, ())
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Persisted callback failed for capture %s", capture_id)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            finally:
+                self._queue.task_done()
+
+    def status(self, capture_id):
+        """Status dict of a capture queued in this process, or None."""
+        with self._lock:
+            entry = self._status.get(capture_id)
+            return dict(entry) if entry is not None else None
+
+    def flush(self):
+        """Block until every queued capture has been written."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def shutdown(self):
+        """Flush the queue and stop the writer threads."""
+        if self._queue is None:
+            return
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._queue = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+
+writer = WriteBehindWriter()
@@ -0,0 +1,183 @@
+"""
+Sharded, content-addressed storage of captured images.
+
+A capture is stored under the digest of its encoded bytes, in directories
+named after the leading digest characters::
+
+    <root>/3f/a2/3fa2...9c.jpg
+
+so no directory grows past a few thousand entries and byte-identical frames
+are stored once. Writes go to a temporary file in the target directory and
+are renamed into place, so readers never see a partial image. The root is
+``FACE_LIVENESS_CAPTURE_ROOT``; ``django_integration/storage.py`` exposes
+the same layout as a Django ``Storage``.
+"""
+import os
+import re
+import tempfile
+
+from ..config import get_setting
+from .cache import content_hash
+
+CAPTURE_EXTENSION = ".jpg"
+# Hex characters per shard directory level
+SHARD_WIDTH = 2
+
+_CAPTURE_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def _fsync_directory(path):
+    """Flush the entries of directory `path` (e.g. a rename into it) to disk."""
+    if os.name == "nt":
+        # Windows cannot open a directory for fsync; NTFS journals renames
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def is_capture_id(value):
+    """True for strings shaped like a capture ID (32 lowercase hex digits)."""
+    return isinstance(value, str) and _CAPTURE_ID_RE.fullmatch(value) is not None
+
+
+class CaptureStorage:
+    """Content-addressed image store with hash-prefix shard directories."""
+
+    def __init__(self, root=None, shard_depth=None, fsync=None):
+        self._root = root
+        self._shard_depth = shard_depth
+        self._fsync = fsync
+
+    @property
+    def root(self):
+        return self._root or get_setting("CAPTURE_ROOT")
+
+    @property
+    def shard_depth(self):
+        if self._shard_depth is not None:
+            return self._shard_depth
+        return get_setting("CAPTURE_SHARD_DEPTH")
+
+    @property
+    def fsync(self):
+        return self._fsync if self._fsync is not None else get_setting("CAPTURE_FSYNC")
+
+    def _shards(self, capture_id):
+        return [capture_id[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH]
+                for i in range(self.shard_depth)]
+
+    def relative_path(self, capture_id):
+        """Path of a capture relative to the root, e.g. ``3f/a2/3fa2...jpg``."""
+        if not is_capture_id(capture_id):
+            raise ValueError(f"Invalid capture ID: {capture_id!r}")
+        return os.path.join(*self._shards(capture_id), capture_id + CAPTURE_EXTENSION)
+
+    def path(self, capture_id):
+        return os.path.join(self.root, self.relative_path(capture_id))
+
+    def exists(self, capture_id):
+        return os.path.exists(self.path(capture_id))
+
+    def save(self, data, capture_id=None, fsync=None):
+        """Store encoded image bytes and return their capture ID.
+
+        `capture_id` defaults to the content hash of `data`. Content that
+        is already stored is not written again. `fsync` overrides
+        CAPTURE_FSYNC for this write; with it, the file and the directory
+        entries leading to it (the rename and any new shard directories)
+        are flushed before this returns.
+        """
+        capture_id = capture_id or content_hash(data)
+        path = self.path(capture_id)
+        if os.path.exists(path):
+            return capture_id
+        if fsync is None:
+            fsync = self.fsync
+
+        folder = os.path.dirname(path)
+        # Directories whose new entries must be flushed, innermost first
+        synced = [os.path.abspath(folder)]
+        while not os.path.isdir(synced[-1]):
+            synced.append(os.path.dirname(synced[-1]))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=CAPTURE_EXTENSION)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+                if fsync:
+                    fh.flush()
+                    os.fsync(fh.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        if fsync:
+            for directory in synced:
+                _fsync_directory(directory)
+        return capture_id
+
+    def read(self, capture_id):
+        with open(self.path(capture_id), "rb") as fh:
+            return fh.read()
+
+    def delete(self, capture_id):
+        try:
+            os.unlink(self.path(capture_id))
+        except FileNotFoundError:
+            pass
+
+    def _scan(self, folder, level, prefix, start_after):
+        """Yield capture IDs below `folder` in sorted order.
+
+        Shard directories that cannot contain IDs matching `prefix` or
+        sorting after `start_after` are skipped without being listed.
+        """
+        try:
+            names = sorted(entry.name for entry in os.scandir(folder))
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        if level < self.shard_depth:
+            lo = level * SHARD_WIDTH
+            hi = lo + SHARD_WIDTH
+            for name in names:
+                if not name.startswith(prefix[lo:hi]):
+                    continue
+                bound = start_after
+                if start_after:
+                    if name < start_after[lo:hi]:
+                        continue
+                    if name > start_after[lo:hi]:
+                        # Everything below this shard sorts after start_after
+                        bound = None
+                yield from self._scan(os.path.join(folder, name), level + 1, prefix, bound)
+            return
+        for name in names:
+            capture_id = name[:-len(CAPTURE_EXTENSION)]
+            if not name.endswith(CAPTURE_EXTENSION) or not is_capture_id(capture_id):
+                continue
+            if capture_id.startswith(prefix) and (not start_after or capture_id > start_after):
+                yield capture_id
+
+    def list(self, prefix="", start_after=None, limit=1000):
+        """Page of stored capture IDs in ascending order.
+
+        Only the shards overlapping `prefix` and following `start_after`
+        are read, and the scan stops after `limit` IDs, so listing a page
+        costs roughly one shard directory rather than a walk of the store.
+        Pass the last ID of a page as `start_after` to get the next one.
+        """
+        ids = []
+        for capture_id in self._scan(self.root, 0, prefix, start_after):
+            ids.append(capture_id)
+            if limit is not None and len(ids) >= limit:
+                break
+        return ids
+
+
+storage = CaptureStorage()
@@ -1,21 +1,48 @@
-import cv2
-import numpy as np
+from ..config import get_setting
+from .analysis import as_analysis
 
-def is_bright_enough(img, threshold=80):
-    """Check if image brightness is ok."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    brightness = gray.mean()
-    return brightness > threshold
+def is_bright_enough(frame, threshold=80):
+    """Check if image brightness is ok.
 
-def is_not_blurry(img, threshold=120):
+    `frame` is a FrameAnalysis or a BGR image.
+    """
+    return as_analysis(frame).brightness > threshold
+
+def is_not_blurry(frame, threshold=120):
     """Detect blur using Laplacian variance."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    variance = cv2.Laplacian(gray, cv2.CV_64F).var()
-    return variance > threshold
+    return as_analysis(frame).sharpness > threshold
+
+def face_size_ok(frame, face_rect=None):
+    """Face should occupy a reasonable area of the image.
 
-def face_size_ok(img, face_rect):
-    """Face should occupy a reasonable area of the image."""
+    Uses the largest detected face when `face_rect` is not given. The face
+    must cover at least MIN_FACE_AREA of the frame.
+    """
+    frame = as_analysis(frame)
+    if face_rect is None:
+        face_rect = frame.largest_face
+        if face_rect is None:
+            return False
     (x, y, w, h) = face_rect
-    img_area = img.shape[0] * img.shape[1]
+    img_area = frame.shape[0] * frame.shape[1]
     face_area = w * h
-    return face_area > img_area * 0.05  # at least 5%
+    return face_area > img_area * get_setting("MIN_FACE_AREA")
+
+def is_face_bright_enough(frame, threshold=80):
+    """Mean gray level of the largest face, so a bright background cannot
+    hide a dark face. False without a face.
+    """
+    stats = as_analysis(frame).face_stats
+    return stats is not None and stats[0] > threshold
+
+def has_face_contrast(frame, threshold=15):
+    """Gray-level standard deviation inside the largest face; a washed-out
+    or uniformly lit blob has almost none.
+    """
+    stats = as_analysis(frame).face_stats
+    return stats is not None and stats[1] > threshold
+
+def is_face_sharp(frame, threshold=60):
+    """Laplacian variance inside the largest face."""
+    sharpness = as_analysis(frame).face_sharpness
+    return sharpness is not None and sharpness > threshold
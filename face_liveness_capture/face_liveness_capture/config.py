@@ -0,0 +1,164 @@
+"""
+Runtime settings for face_liveness_capture.
+
+Every option has a default here and can be overridden from Django settings
+with a ``FACE_LIVENESS_`` prefix, e.g. ``FACE_LIVENESS_WARMUP = False``.
+The backend also works without Django, in which case the defaults apply.
+"""
+
+DEFAULTS = {
+    # Warm up detectors: every thread exercises a detector once when it
+    # builds its instance. At startup True also warms the DEFAULT_DETECTOR in
+    # the thread running AppConfig.ready(); "background" only preloads OpenCV
+    # and the model files in a thread; False warms nothing (call warm_up()
+    # yourself)
+    "WARMUP": "background",
+    # Thread pools AppConfig.ready() starts and warms when WARMUP is set:
+    # "verify" for ASGI deployments serving upload/async/, "batch" if the
+    # batch upload view is used. Other pools start on first use.
+    "WARMUP_POOLS": (),
+    # Face detector engine used by the pipeline and detect_face():
+    # "haar_frontalface", "lbp_frontalface", "yunet" or "ssd_res10"
+    # (backend/detectors.py)
+    "DEFAULT_DETECTOR": "haar_frontalface",
+    # Directory with the detector model files; None uses backend/models/
+    "DETECTOR_MODEL_DIR": None,
+    # Only search for faces between MIN_FACE_AREA and MAX_FACE_HEIGHT, so
+    # the detector skips scales no valid capture can have; smaller faces are
+    # then reported as "No face detected" instead of "Face too small"
+    "DETECTOR_SIZE_BOUNDS": True,
+    # Smallest face box face_size_ok() accepts, as a fraction of the frame area
+    "MIN_FACE_AREA": 0.05,
+    # Tallest face box searched for, as a fraction of the frame height; the
+    # passport framing needs headroom above the face and the chin below it
+    "MAX_FACE_HEIGHT": 0.8,
+    # Long side (px) of the reduced copy used for detection and quality
+    # checks; None analyses the full-resolution frame
+    "ANALYSIS_MAX_SIDE": 640,
+    # Measure brightness, contrast and sharpness inside the largest face
+    # instead of over the whole frame (backend/checks.py ROI_CHECKS)
+    "QUALITY_ROI": False,
+    # Reorder the verification checks from measured cost and rejection
+    # rate; False runs them in the declared order
+    "ADAPTIVE_CHECK_ORDER": True,
+    # Return the cached result for byte-identical images
+    "RESULT_CACHE": True,
+    # Seconds a cached result stays valid
+    "RESULT_CACHE_TTL": 300,
+    # Entries kept in the in-process LRU
+    "RESULT_CACHE_SIZE": 1024,
+    # Django cache alias used as a second tier shared across workers;
+    # None keeps the cache in-process only
+    "RESULT_CACHE_ALIAS": None,
+    # Store a validated JPEG exactly as uploaded instead of re-encoding the
+    # decoded frame; other formats are always re-encoded as JPEG
+    "STORE_ORIGINAL": True,
+    # Store a 7:9 passport crop around the detected face instead of the
+    # uploaded frame (backend/passport.py)
+    "PASSPORT_CROP": False,
+    # (width, height) in pixels of the stored passport photo
+    "PASSPORT_SIZE": (350, 450),
+    # Byte budget of the encoded passport photo
+    "PASSPORT_MAX_BYTES": 50 * 1024,
+    # JPEG quality range searched to meet the byte budget
+    "PASSPORT_MIN_QUALITY": 30,
+    "PASSPORT_MAX_QUALITY": 95,
+    # Root directory of the content-addressed capture store
+    "CAPTURE_ROOT": "captured_faces",
+    # Levels of two-hex-digit shard directories below CAPTURE_ROOT
+    "CAPTURE_SHARD_DEPTH": 2,
+    # fsync captures before renaming them into place, and their directory
+    # after (write-behind always does)
+    "CAPTURE_FSYNC": False,
+    # Return before the validated image is on disk and write it from
+    # background threads (backend/persistence.py)
+    "WRITE_BEHIND": False,
+    # Writer threads draining the write-behind queue
+    "WRITE_BEHIND_WORKERS": 2,
+    # Captures waiting to be written before submitters block
+    "WRITE_BEHIND_QUEUE_SIZE": 256,
+    # Seconds a submitter waits for queue space before writing synchronously
+    "WRITE_BEHIND_PUT_TIMEOUT": 1.0,
+    # Capture statuses remembered for capture_status() lookups
+    "WRITE_BEHIND_STATUS_SIZE": 10000,
+    # Record stage timings, outcomes and image sizes (backend/metrics.py)
+    # and send Server-Timing headers
+    "METRICS": True,
+    # Serve the metrics/ URL; off by default because it reveals traffic and
+    # rejection counts to anyone who can reach it
+    "METRICS_ENDPOINT": False,
+    # Trace peak Python/NumPy allocations and RSS change per stage and send
+    # X-Memory-Profile headers; slows every allocation, so profiling only
+    "MEMORY_PROFILE": False,
+    # Decode base64 strings in chunks and drop each intermediate buffer once
+    # the next stage has used it (JSON bodies are always streamed)
+    "LOW_MEMORY": False,
+    # Threads used by verify_liveness_batch(); None uses min(4, CPU count)
+    "BATCH_MAX_WORKERS": None,
+    # Most batch images decoded and being verified at the same time;
+    # None uses twice the worker count
+    "BATCH_MAX_IN_FLIGHT": None,
+    # Largest batch the batch upload view accepts
+    "BATCH_MAX_SIZE": 50,
+    # Threads the async upload view runs verification on; None uses the CPU count
+    "ASYNC_MAX_WORKERS": None,
+    # Uploads the async view accepts while others are still being processed;
+    # further requests get a 503
+    "ASYNC_MAX_PENDING": 64,
+    # Path of the streaming liveness WebSocket served by websocket_router()
+    # (django_integration/websocket.py)
+    "WEBSOCKET_PATH": "/face-capture/ws/liveness/",
+    # Liveness sessions open at once in one process; further connections
+    # are closed with code 1013
+    "WEBSOCKET_MAX_SESSIONS": 100,
+    # Largest WebSocket message (landmark packet or image) in bytes
+    "WEBSOCKET_MAX_MESSAGE_BYTES": 1024 * 1024,
+    # Seconds a liveness session may stay open
+    "WEBSOCKET_SESSION_TIMEOUT": 120,
+    # Frames one session may send (about 60 s at 30 fps)
+    "WEBSOCKET_MAX_FRAMES": 1800,
+    # Seconds an idle liveness session stays in the session store
+    # (django_integration/session_store.py)
+    "SESSION_STORE_TTL": 300,
+    # Ring-buffer bytes the session store may hold; the least recently used
+    # sessions are evicted beyond it
+    "SESSION_STORE_MAX_BYTES": 32 * 1024 * 1024,
+    # Landmark frames kept per session
+    "SESSION_STORE_WINDOW": 64,
+    # "inline" runs checks in the calling thread, "process" hands them to a
+    # pool of pre-warmed worker processes (backend/engine.py)
+    "ENGINE": "inline",
+    # Worker processes for the process engine; None uses the CPU count
+    "ENGINE_WORKERS": None,
+    # A worker process is replaced after this many jobs
+    "ENGINE_MAX_JOBS_PER_WORKER": 500,
+    # Seconds to wait for one job before the worker is killed and replaced
+    "ENGINE_TIMEOUT": 30,
+    # multiprocessing start method for worker processes
+    "ENGINE_START_METHOD": "spawn",
+}
+
+# Values set with configure(); they take precedence over Django settings
+_overrides = {}
+
+
+def configure(**values):
+    """Override settings for this process (used by worker processes and tests)."""
+    unknown = set(values) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    _overrides.update(values)
+
+
+def get_setting(name):
+    """Return a setting from Django settings, falling back to DEFAULTS."""
+    if name in _overrides:
+        return _overrides[name]
+    default = DEFAULTS[name]
+    try:
+        from django.conf import settings
+        if not settings.configured:
+            return default
+        return getattr(settings, f"FACE_LIVENESS_{name}", default)
+    except ImportError:
+        return default
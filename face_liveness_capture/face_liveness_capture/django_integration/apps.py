@@ -1,5 +1,46 @@
+import logging
+import threading
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
+
+def _warm_up(this_thread=True):
+    """Warm the detector in this thread (or only preload it) and in WARMUP_POOLS."""
+    from face_liveness_capture.backend.detection import preload, warm_executors, warm_up
+    from face_liveness_capture.config import get_setting
+    try:
+        if this_thread:
+            warm_up()
+        else:
+            preload()
+        warm_executors(get_setting("WARMUP_POOLS"))
+    except Exception:
+        logger.exception("Detector warm-up failed")
+        return
+    from face_liveness_capture.backend.detectors import registry
+    for name, model_stats in registry.stats().items():
+        if model_stats["warmed_threads"]:
+            logger.info("Detector %s warmed up: %s", name, model_stats)
+
+
 class FaceLivenessCaptureConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'face_liveness_capture.django_integration'
+
+    def ready(self):
+        from face_liveness_capture.config import get_setting
+        warmup = get_setting("WARMUP")
+        if not warmup:
+            return
+        if warmup == "background":
+            # Importing OpenCV takes a while; do not hold up startup for it.
+            # Detector instances are per thread, so this thread only preloads
+            # imports and model files; serving threads warm their own
+            # instance when they first use it.
+            threading.Thread(target=_warm_up, args=(False,), name="face-liveness-warmup",
+                             daemon=True).start()
+        else:
+            # Warm this thread too: a sync worker may serve requests from it
+            _warm_up()
@@ -5,7 +5,6 @@ Django REST Framework serializers for face liveness capture
 from rest_framework import serializers
 import base64
 from django.core.files.base import ContentFile
-from PIL import Image
 from io import BytesIO
 
 
@@ -50,6 +49,9 @@ class FaceCaptureSerializer(serializers.Serializer):
         if value.size > 10 * 1024 * 1024:
             raise serializers.ValidationError("Image too large. Max 10MB.")
         
+        # Pillow is only needed here; importing it lazily keeps module import cheap
+        from PIL import Image
+
         # Check file format
         allowed_formats = ['JPEG', 'PNG', 'WEBP']
         try:
@@ -0,0 +1,106 @@
+# django_integration/session_store.py
+"""
+In-process store of streaming liveness sessions.
+
+A LivenessSession keeps its recent landmarks in fixed-size float32 ring
+buffers (about 12 KB for the default 64-frame window), so the store can
+account for every byte it holds instead of growing with lists of landmark
+dicts. Sessions are kept in least-recently-used order:
+
+* a session not touched for SESSION_STORE_TTL seconds expires;
+* when the buffers of all sessions exceed SESSION_STORE_MAX_BYTES, the
+  least recently used sessions are evicted, whatever their TTL.
+
+Because every access refreshes the TTL and moves the session to the end,
+expired sessions are always at the front, and pruning stops at the first
+live one.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from face_liveness_capture.backend.liveness_session import LivenessSession
+from face_liveness_capture.config import get_setting
+
+
+class _Entry:
+    __slots__ = ("session", "expires")
+
+    def __init__(self, session, expires):
+        self.session = session
+        self.expires = expires
+
+
+class LivenessSessionStore:
+    """TTL-bound, memory-capped LRU of LivenessSession objects."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stats = {"created": 0, "expired": 0, "evicted": 0}
+
+    def _pop_oldest(self):
+        _, entry = self._entries.popitem(last=False)
+        self._bytes -= entry.session.nbytes
+
+    def _prune(self, now):
+        """Drop expired sessions, then LRU sessions beyond the memory cap."""
+        while self._entries and next(iter(self._entries.values())).expires <= now:
+            self._pop_oldest()
+            self._stats["expired"] += 1
+        max_bytes = get_setting("SESSION_STORE_MAX_BYTES")
+        # The newest session is kept even if it alone exceeds the cap
+        while self._bytes > max_bytes and len(self._entries) > 1:
+            self._pop_oldest()
+            self._stats["evicted"] += 1
+
+    def create(self, aspect=1.0):
+        """Start a session; returns (key, session)."""
+        session = LivenessSession(aspect=aspect, window=get_setting("SESSION_STORE_WINDOW"))
+        key = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = _Entry(session, now + get_setting("SESSION_STORE_TTL"))
+            self._bytes += session.nbytes
+            self._stats["created"] += 1
+            self._prune(now)
+        return key, session
+
+    def get(self, key):
+        """Return the session for `key` and refresh its TTL, or None."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.expires = now + get_setting("SESSION_STORE_TTL")
+            self._entries.move_to_end(key)
+            return entry.session
+
+    def discard(self, key):
+        """Remove the session for `key` if it is still stored."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.session.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Stored sessions, bytes held by their buffers, and eviction counters."""
+        with self._lock:
+            self._prune(time.monotonic())
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = get_setting("SESSION_STORE_MAX_BYTES")
+        return stats
+
+
+session_store = LivenessSessionStore()
@@ -0,0 +1,85 @@
+# django_integration/storage.py
+"""
+Django ``Storage`` over the sharded, content-addressed capture store.
+
+Use it for a ``FileField``/``ImageField`` or as a ``STORAGES`` entry::
+
+    STORAGES = {
+        "captures": {
+            "BACKEND": "face_liveness_capture.django_integration.storage.CaptureFileStorage",
+        },
+    }
+
+Saved files are named after their content hash (``3f/a2/3fa2...jpg``), so
+the name passed to ``save()`` is ignored and saving the same bytes twice
+returns the same name.
+"""
+import os
+from urllib.parse import urljoin
+
+from django.core.files.base import File
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+
+from face_liveness_capture.backend.storage import CAPTURE_EXTENSION, CaptureStorage, is_capture_id
+
+
+@deconstructible
+class CaptureFileStorage(Storage):
+    """Django storage backed by CaptureStorage."""
+
+    def __init__(self, location=None, base_url=None, shard_depth=None):
+        self.location = location
+        self.base_url = base_url
+        self.captures = CaptureStorage(root=location, shard_depth=shard_depth)
+
+    def _capture_id(self, name):
+        capture_id = os.path.basename(name)[:-len(CAPTURE_EXTENSION)]
+        if not is_capture_id(capture_id) or name != self.captures.relative_path(capture_id):
+            raise ValueError(f"Not a capture name: {name!r}")
+        return capture_id
+
+    def _open(self, name, mode="rb"):
+        return File(open(self.path(name), mode))
+
+    def _save(self, name, content):
+        if hasattr(content, "seek"):
+            content.seek(0)
+        capture_id = self.captures.save(content.read())
+        return self.captures.relative_path(capture_id)
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from content in _save(); existing files are reused
+        return name
+
+    def path(self, name):
+        return self.captures.path(self._capture_id(name))
+
+    def exists(self, name):
+        try:
+            return self.captures.exists(self._capture_id(name))
+        except ValueError:
+            return False
+
+    def delete(self, name):
+        self.captures.delete(self._capture_id(name))
+
+    def size(self, name):
+        return os.path.getsize(self.path(name))
+
+    def url(self, name):
+        if self.base_url is None:
+            raise ValueError("This storage has no base_url")
+        return urljoin(self.base_url, name.replace(os.sep, "/"))
+
+    def listdir(self, path):
+        """List shard directories, or captures in a leaf shard, below `path`."""
+        parts = [p for p in path.replace(os.sep, "/").split("/") if p]
+        if len(parts) < self.captures.shard_depth:
+            root = os.path.join(self.captures.root, *parts)
+            try:
+                return sorted(e.name for e in os.scandir(root) if e.is_dir()), []
+            except FileNotFoundError:
+                return [], []
+        ids = self.captures.list(prefix="".join(parts), limit=None)
+        return [], [capture_id + CAPTURE_EXTENSION for capture_id in ids]
@@ -1,10 +1,18 @@
 # django_integration/urls.py
 from django.urls import path
+from face_liveness_capture.django_integration.views import capture_status_view
+from face_liveness_capture.django_integration.views import metrics_view
 from face_liveness_capture.django_integration.views import upload_face
+from face_liveness_capture.django_integration.views import upload_face_async
+from face_liveness_capture.django_integration.views import upload_face_batch
 from face_liveness_capture.django_integration.views import widget_view
 
 urlpatterns = [
     path('', widget_view, name='widget'),
     path('upload/', upload_face, name='upload-face'),
+    path('upload/async/', upload_face_async, name='upload-face-async'),
+    path('upload/batch/', upload_face_batch, name='upload-face-batch'),
+    path('captures/<str:capture_id>/', capture_status_view, name='capture-status'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
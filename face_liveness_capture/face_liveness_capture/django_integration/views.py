@@ -1,28 +1,138 @@
 # django_integration/views.py
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_protect, ensure_csrf_cookie
 from django.shortcuts import render
+import binascii
 import json
-import base64
 import logging
-from face_liveness_capture.backend.detection import verify_liveness
-from django.middleware.csrf import get_token
+import threading
+from face_liveness_capture.backend.detection import (
+    capture_status,
+    image_bytes,
+    run_in_verify_executor,
+    verify_liveness,
+    verify_liveness_batch,
+)
+from face_liveness_capture.backend import metrics
+from face_liveness_capture.backend.json_stream import extract_base64_field
+from face_liveness_capture.config import get_setting
+from django.middleware.csrf import CsrfViewMiddleware, get_token
 
 logger = logging.getLogger(__name__)
 
 
-@csrf_protect
-def upload_face(request):
-    """Accepts JSON POST with `image` (data URL / base64) and returns verification result."""
-    if request.method != "POST":
-        return JsonResponse({"success": False, "error": "POST method required"}, status=400)
+# Content types accepted as a raw encoded image body
+BINARY_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "application/octet-stream"}
+
+
+def _uploaded_file_bytes(uploaded):
+    """Return the bytes of an uploaded file, without copying in-memory uploads."""
+    buffer = getattr(uploaded.file, "getbuffer", None)
+    if buffer is not None:
+        return buffer()
+    uploaded.seek(0)
+    return uploaded.read()
+
+
+class _LimitedBody:
+    """Read-only view of the request body capped at DATA_UPLOAD_MAX_MEMORY_SIZE.
+
+    request.body enforces the limit, but reading the stream with
+    request.read() does not, so the bytes are counted here instead.
+    """
+
+    def __init__(self, request, limit):
+        self._request = request
+        self._limit = limit
+        self._read = 0
+
+    def read(self, size=-1):
+        chunk = self._request.read(size)
+        self._read += len(chunk)
+        if self._limit is not None and self._read > self._limit:
+            raise RequestDataTooBig("Request body exceeded settings.DATA_UPLOAD_MAX_MEMORY_SIZE.")
+        return chunk
+
+
+def _json_size_hint(request, limit):
+    """Content-Length to pre-size the decoder with, never above `limit`.
+
+    The header comes from the client, so it is only trusted up to the
+    upload limit; without a limit the decoder starts empty and grows.
+    """
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return 0
+    if limit is None:
+        return 0
+    if length > limit:
+        raise RequestDataTooBig("Request body exceeded settings.DATA_UPLOAD_MAX_MEMORY_SIZE.")
+    return max(length, 0)
+
+
+def _extract_image(request):
+    """Pull the encoded image out of a JSON, raw binary or multipart request.
 
+    Returns a bytes-like object, or the string of a base64 `image` form
+    field; None only when no image was sent. An image that is present but
+    empty (e.g. base64 that decodes to nothing) is returned as is, to be
+    rejected as invalid. Binary and multipart files skip base64 entirely;
+    for JSON the "image" member is decoded
+    while the body is read, without building the JSON text or the base64
+    string (backend/json_stream.py).
+    """
+    content_type = request.content_type
+    if content_type in BINARY_IMAGE_TYPES:
+        return request.body or None
+    if content_type == "multipart/form-data":
+        uploaded = request.FILES.get("image")
+        if uploaded is not None:
+            return _uploaded_file_bytes(uploaded)
+        return request.POST.get("image")
+    limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    size_hint = _json_size_hint(request, limit)
+    return extract_base64_field(_LimitedBody(request, limit), "image", size_hint=size_hint)
+
+
+def _timed_response(payload, status, timings, memory=None):
+    """JsonResponse carrying the request's stage timings as Server-Timing.
+
+    Per-stage memory (MEMORY_PROFILE) is logged and sent as X-Memory-Profile.
+    """
+    response = JsonResponse(payload, status=status)
+    if timings:
+        response["Server-Timing"] = metrics.server_timing(timings)
+    if memory:
+        profile = metrics.memory_profile(memory)
+        logger.info("Memory profile: %s", profile)
+        response["X-Memory-Profile"] = profile
+    return response
+
+
+def _handle_upload(request):
+    """Extract and verify the uploaded image; returns (payload, status)."""
     try:
-        data = json.loads(request.body)
-        image_data = data.get("image")
-        if not image_data:
+        with metrics.stage("extract"):
+            try:
+                image_data = _extract_image(request)
+            except binascii.Error as e:
+                # Undecodable base64 is a rejected image, as in verify_liveness
+                result = {"success": False, "error": f"Invalid image: {e}"}
+                metrics.record_result(result)
+                return result, 200
+            if image_data is not None and get_setting("LOW_MEMORY"):
+                # Decode a base64 form field now so the string is freed before
+                # verification; invalid data is left for verify_liveness to report
+                try:
+                    image_data = image_bytes(image_data)
+                except ValueError:
+                    pass
+        if image_data is None:
             logger.warning("upload_face called without image")
-            return JsonResponse({"success": False, "error": "No image provided"}, status=400)
+            return {"success": False, "error": "No image provided"}, 400
 
         logger.info("Received upload_face request from %s", request.META.get('REMOTE_ADDR'))
 
@@ -31,13 +141,151 @@ def upload_face(request):
 
         logger.info("verify_liveness result: %s", result)
 
-        return JsonResponse(result)
+        return result, 200
 
+    except RequestDataTooBig:
+        logger.warning("upload_face body larger than DATA_UPLOAD_MAX_MEMORY_SIZE")
+        return {"success": False, "error": "Request body too large"}, 413
     except Exception as e:
         logger.exception("Exception in upload_face")
+        return {"success": False, "error": str(e)}, 500
+
+
+@csrf_protect
+def upload_face(request):
+    """Accepts a POST with the face image and returns verification result.
+
+    The image can be sent as JSON (`{"image": "<data URL / base64>"}`), as a
+    raw `image/jpeg` / `image/png` / `image/webp` body, or as the `image`
+    file field of a `multipart/form-data` form.
+
+    The response has a `Server-Timing` header with the time spent in each
+    verification stage, and with MEMORY_PROFILE an `X-Memory-Profile`
+    header with each stage's peak allocation.
+    """
+    if request.method != "POST":
+        return JsonResponse({"success": False, "error": "POST method required"}, status=400)
+
+    with metrics.collect_timings() as timings, metrics.collect_memory() as memory:
+        payload, status = _handle_upload(request)
+    return _timed_response(payload, status, timings, memory)
+
+
+class _PendingLimit:
+    """Thread-safe counter of uploads admitted by upload_face_async."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pending = 0
+
+    def acquire(self):
+        with self._lock:
+            if self.pending >= get_setting("ASYNC_MAX_PENDING"):
+                return False
+            self.pending += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.pending -= 1
+
+
+_async_pending = _PendingLimit()
+
+
+async def upload_face_async(request):
+    """Async version of upload_face for ASGI deployments.
+
+    Under ASGI, Django receives the request body on the event loop before
+    the view runs, so slow mobile uploads do not hold a thread. Parsing and
+    verification are CPU-bound and run on a dedicated executor sized to
+    the CPU count; at most ASYNC_MAX_PENDING uploads wait for it at once.
+    """
+    if request.method != "POST":
+        return JsonResponse({"success": False, "error": "POST method required"}, status=400)
+
+    # Same check csrf_protect performs (that decorator is sync-only before Django 5.0)
+    csrf_failure = CsrfViewMiddleware(lambda req: None).process_view(request, None, (), {})
+    if csrf_failure is not None:
+        return csrf_failure
+
+    if not _async_pending.acquire():
+        return JsonResponse({"success": False, "error": "Server busy, please retry"}, status=503)
+    try:
+        with metrics.collect_timings() as timings, metrics.collect_memory() as memory:
+            payload, status = await run_in_verify_executor(_handle_upload, request)
+    finally:
+        _async_pending.release()
+    return _timed_response(payload, status, timings, memory)
+
+
+def _extract_images(request):
+    """Pull the list of encoded images out of a multipart or JSON batch request."""
+    if request.content_type == "multipart/form-data":
+        return [_uploaded_file_bytes(uploaded) for uploaded in request.FILES.getlist("images")]
+    data = json.loads(request.body)
+    images = data.get("images") or []
+    if not isinstance(images, list):
+        raise ValueError("`images` must be a list")
+    return images
+
+
+@csrf_protect
+def upload_face_batch(request):
+    """Verifies several images in one POST and returns one result per image.
+
+    Send either `multipart/form-data` with repeated `images` file fields or
+    JSON `{"images": ["<data URL / base64>", ...]}`. Results are returned in
+    input order; a bad image only fails its own entry.
+    """
+    if request.method != "POST":
+        return JsonResponse({"success": False, "error": "POST method required"}, status=400)
+
+    try:
+        images = _extract_images(request)
+        if not images:
+            return JsonResponse({"success": False, "error": "No images provided"}, status=400)
+
+        max_size = get_setting("BATCH_MAX_SIZE")
+        if len(images) > max_size:
+            return JsonResponse(
+                {"success": False, "error": f"Too many images (max {max_size})"}, status=400
+            )
+
+        logger.info("Received upload_face_batch request with %d images", len(images))
+        results = verify_liveness_batch(images)
+
+        return JsonResponse({"success": True, "count": len(results), "results": results})
+
+    except Exception as e:
+        logger.exception("Exception in upload_face_batch")
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
 
+def metrics_view(request):
+    """Prometheus text-format metrics of this process.
+
+    Counters are per process; scrape every worker (or run one worker per
+    scrape target). The bundled metrics/ URL answers 404 unless
+    METRICS_ENDPOINT is set; expose it to the monitoring network only.
+    """
+    if not get_setting("METRICS_ENDPOINT"):
+        raise Http404("Metrics endpoint disabled")
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def capture_status_view(request, capture_id):
+    """Reports whether a capture returned by an upload has been written to disk.
+
+    Only the ID and status are returned: the storage path and write error
+    describe the server's filesystem and stay in the logs.
+    """
+    status = capture_status(capture_id)
+    if status is None:
+        return JsonResponse({"success": False, "error": "Unknown capture"}, status=404)
+    return JsonResponse({"success": True, "capture_id": capture_id, "status": status["status"]})
+
+
 def widget_view(request):
     """Render the frontend widget page (ensures CSRF cookie is set)."""
     # ensure CSRF cookie is set for JS POSTs
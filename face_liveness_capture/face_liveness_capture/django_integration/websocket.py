@@ -0,0 +1,249 @@
+# django_integration/websocket.py
+"""
+Streaming liveness sessions over a WebSocket, as a plain ASGI application.
+
+``websocket_router(get_asgi_application())`` serves WEBSOCKET_PATH from
+the same process as Django's ASGI handler. It needs no Channels layer,
+Redis or other outside service: each session's state is a LivenessSession
+(backend/liveness_session.py) held in this process's session_store
+(session_store.py). A session outlives a dropped connection until the
+store's TTL: reconnecting with ``?session=<key>`` continues it.
+
+Protocol, one JSON object per text message:
+
+* client -> server ``{"landmarks": [...]}``: one FaceMesh frame, either
+  468 ``[x, y, z]`` points or ``{"x", "y", "z"}`` dicts, or a dict with
+  just the FEATURE_POINTS indices (backend/landmarks.py). The camera
+  frame's width / height goes in the ``?aspect=`` query parameter.
+* client -> server, binary message: an encoded image. During the "face"
+  stage a small video frame is checked for a centred face. During the
+  "capture" stage it is the capture, and verify_liveness() checks it.
+* server -> client ``{"type": "stage", "stage": ..., ...}`` on every stage
+  transition (and once on connect, with the ``"session"`` key),
+  ``{"type": "result", ...}`` with the verify_liveness() result before the
+  server closes, and ``{"type": "error", "error": ...}`` for a rejected
+  message.
+
+Landmark frames are processed on the event loop in constant time. Images
+are decoded and checked on the verify executor. WEBSOCKET_MAX_SESSIONS
+caps the open connections per process; further connections are closed
+with code 1013 (try again later).
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from face_liveness_capture.backend.detection import run_in_verify_executor, verify_liveness
+from face_liveness_capture.backend.face_utils import decode_image_bytes, detect_face
+from face_liveness_capture.config import get_setting
+from face_liveness_capture.django_integration.session_store import session_store
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close codes (RFC 6455)
+CLOSE_NORMAL = 1000
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_MESSAGE_TOO_BIG = 1009
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class _SessionLimit:
+    """Thread-safe count of open liveness connections in this process,
+    and the stored sessions they are attached to."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.attached = set()
+
+    def acquire(self):
+        with self._lock:
+            if self.active >= get_setting("WEBSOCKET_MAX_SESSIONS"):
+                return False
+            self.active += 1
+            return True
+
+    def attach(self, key):
+        """Claim stored session `key` for one connection; False if taken."""
+        with self._lock:
+            if key in self.attached:
+                return False
+            self.attached.add(key)
+            return True
+
+    def release(self, key=None):
+        with self._lock:
+            self.active -= 1
+            self.attached.discard(key)
+
+
+_sessions = _SessionLimit()
+
+
+def session_stats():
+    """Open connections, the per-process limit, and session store stats."""
+    return {
+        "active": _sessions.active,
+        "limit": get_setting("WEBSOCKET_MAX_SESSIONS"),
+        "store": session_store.stats(),
+    }
+
+
+def _headers(scope):
+    return {name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", ())}
+
+
+def _origin_allowed(scope):
+    """Reject cross-site browser connections, as CSRF protection does for POSTs.
+
+    A browser always sends Origin on a WebSocket handshake; its host must
+    be the Host the client connected to, or be listed in
+    CSRF_TRUSTED_ORIGINS. Clients that send no Origin are not browsers.
+    """
+    headers = _headers(scope)
+    origin = headers.get("origin")
+    if origin is None:
+        return True
+    from django.conf import settings
+    if origin in getattr(settings, "CSRF_TRUSTED_ORIGINS", ()):
+        return True
+    return urlsplit(origin).netloc == headers.get("host")
+
+
+def _query(scope):
+    return parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+
+def _aspect(scope):
+    """Camera frame width / height from the ?aspect= query parameter."""
+    query = _query(scope)
+    try:
+        aspect = float(query.get("aspect", ["1"])[0])
+    except ValueError:
+        return 1.0
+    return aspect if 0.1 < aspect < 10 else 1.0
+
+
+async def _send_json(send, payload):
+    await send({"type": "websocket.send", "text": json.dumps(payload)})
+
+
+def _check_frame(data):
+    """Decode a small video frame and return (largest face, shape)."""
+    img = decode_image_bytes(data)
+    return detect_face(img).largest, img.shape
+
+
+async def _handle_message(session, message):
+    """Apply one client message to `session`; returns (replies, close code)."""
+    data = message.get("bytes")
+    text = message.get("text")
+    if data is None and text is None:
+        return [], None
+    if len(data if data is not None else text) > get_setting("WEBSOCKET_MAX_MESSAGE_BYTES"):
+        return [{"type": "error", "error": "Message too large"}], CLOSE_MESSAGE_TOO_BIG
+    if session.frames >= get_setting("WEBSOCKET_MAX_FRAMES"):
+        return [{"type": "error", "error": "Too many frames"}], CLOSE_POLICY_VIOLATION
+
+    if data is not None:
+        if session.stage == "capture":
+            result = await run_in_verify_executor(verify_liveness, data)
+            session.finish()
+            return [{"type": "result", **result}], CLOSE_NORMAL
+        if session.stage != "face":
+            return [{"type": "error", "error": "Landmarks required for this stage"}], None
+        try:
+            face, shape = await run_in_verify_executor(_check_frame, data)
+        except ValueError as e:
+            return [{"type": "error", "error": f"Invalid image: {e}"}], None
+        stage = session.add_face(face, shape)
+    else:
+        try:
+            points = json.loads(text)["landmarks"]
+            stage = session.add_landmarks(points)
+        except (ValueError, KeyError, TypeError) as e:
+            return [{"type": "error", "error": f"Invalid landmarks: {e}"}], None
+
+    if stage is None:
+        return [], None
+    return [{"type": "stage", **session.summary()}], None
+
+
+async def liveness_websocket(scope, receive, send):
+    """ASGI application running one streaming liveness session per connection."""
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    if not _origin_allowed(scope):
+        await send({"type": "websocket.close", "code": CLOSE_POLICY_VIOLATION})
+        return
+    if not _sessions.acquire():
+        await send({"type": "websocket.close", "code": CLOSE_TRY_AGAIN_LATER})
+        return
+    key = None
+    try:
+        resume = _query(scope).get("session", [None])[0]
+        session = session_store.get(resume) if resume else None
+        if session is not None:
+            key = resume
+        else:
+            key, session = session_store.create(aspect=_aspect(scope))
+        if not _sessions.attach(key):
+            # Another connection is driving this session
+            key = None
+            await send({"type": "websocket.close", "code": CLOSE_POLICY_VIOLATION})
+            return
+        await send({"type": "websocket.accept"})
+        await _send_json(send, {"type": "stage", "session": key, **session.summary()})
+
+        # Measured from the session's start, so reconnecting does not extend it
+        deadline = session.started + get_setting("WEBSOCKET_SESSION_TIMEOUT")
+        while True:
+            try:
+                message = await asyncio.wait_for(receive(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                session_store.discard(key)
+                await _send_json(send, {"type": "error", "error": "Session timed out"})
+                await send({"type": "websocket.close", "code": CLOSE_NORMAL})
+                return
+            if message["type"] == "websocket.disconnect":
+                # Kept in the store so a reconnect can continue it
+                return
+            if message["type"] != "websocket.receive":
+                continue
+            if session_store.get(key) is None:
+                # Evicted to stay under SESSION_STORE_MAX_BYTES
+                await _send_json(send, {"type": "error", "error": "Session expired"})
+                await send({"type": "websocket.close", "code": CLOSE_NORMAL})
+                return
+            replies, close_code = await _handle_message(session, message)
+            for reply in replies:
+                await _send_json(send, reply)
+            if close_code is not None:
+                session_store.discard(key)
+                await send({"type": "websocket.close", "code": close_code})
+                return
+    finally:
+        _sessions.release(key)
+
+
+def websocket_router(http_application, path=None):
+    """Wrap Django's ASGI application so WebSockets reach the liveness session.
+
+    Connections to `path` (default WEBSOCKET_PATH) run liveness_websocket;
+    other WebSocket paths are refused; every other scope goes to
+    `http_application`.
+    """
+    async def application(scope, receive, send):
+        if scope["type"] != "websocket":
+            return await http_application(scope, receive, send)
+        if scope["path"] == (path or get_setting("WEBSOCKET_PATH")):
+            return await liveness_websocket(scope, receive, send)
+        await receive()
+        await send({"type": "websocket.close", "code": CLOSE_POLICY_VIOLATION})
+
+    return application
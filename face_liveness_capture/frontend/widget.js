@@ -30,6 +30,18 @@ function getCookie(name) {
     return null;
 }
 
+// Convert a data URL into a Blob so the image can be uploaded as raw bytes
+function dataURLToBlob(dataURL) {
+    const [header, encoded] = dataURL.split(',');
+    const mime = header.match(/:(.*?);/)[1];
+    const binary = atob(encoded);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return new Blob([bytes], { type: mime });
+}
+
 async function startCamera() {
     try {
         const stream = await navigator.mediaDevices.getUserMedia({ 
@@ -316,54 +328,35 @@ function captureImage() {
     // Send to backend API (include CSRF token)
     const csrftoken = getCookie('csrftoken');
 
+    // Upload the encoded bytes directly; the server skips base64/JSON parsing
+    const imageBlob = dataURLToBlob(imageData);
+
     fetch('/face-capture/upload/', {
         method: 'POST',
         headers: {
-            'Content-Type': 'application/json',
+            'Content-Type': imageBlob.type,
             'X-CSRFToken': csrftoken || '',
             'X-Requested-With': 'XMLHttpRequest'
         },
-        body: JSON.stringify({ image: imageData })
+        body: imageBlob
     }).then(res => res.json()).then(json => {
         const resultDiv = document.getElementById('result-msg');
         if (resultDiv) {
             if (json.success) {
                 resultDiv.className = 'success';
+                resultDiv.style.display = 'block';
                 resultDiv.innerText = '✅ ' + (json.message || 'Face captured successfully!');
                 instructions.innerText = 'Face verified. Photo saved.';
                 document.getElementById('start-btn').style.display = 'none';
             } else {
                 resultDiv.className = 'error';
+                resultDiv.style.display = 'block';
                 resultDiv.innerText = '❌ ' + (json.error || 'Capture failed. Please try again.');
                 instructions.innerText = 'Retrying...';
                 document.getElementById('retry-btn').style.display = 'inline-block';
             }
         }
         stage = 5; // stop the flow
-        }).then(res => res.json()).then(json => {
-            const resultDiv = document.getElementById('result-msg');
-            if (resultDiv) {
-                if (json.success) {
-                    resultDiv.className = 'success';
-                    resultDiv.style.display = 'block';
-                    resultDiv.innerText = '✅ ' + (json.message || 'Face captured successfully!');
-                    instructions.innerText = 'Face verified. Photo saved. You can now submit the form.';
-                    video.style.display = 'none';
-                    canvas.style.display = 'none';
-                    document.getElementById('start-btn').style.display = 'none';
-                    // Enable submit button
-                    const submitBtn = document.getElementById('submit-btn');
-                    if (submitBtn) submitBtn.disabled = false;
-                } else {
-                    resultDiv.className = 'error';
-                    resultDiv.style.display = 'block';
-                    resultDiv.innerText = '❌ ' + (json.error || 'Capture failed. Please try again.');
-                    instructions.innerText = 'Liveness check failed. Click Retry.';
-                    document.getElementById('retry-btn').style.display = 'inline-block';
-                    stage = 0; // Reset to face detection
-                }
-            }
-            stage = 5; // stop the flow
     }).catch(err => {
         const resultDiv = document.getElementById('result-msg');
         if (resultDiv) {
@@ -18,11 +18,15 @@ setup(
     include_package_data=True, # ensures static/templates are included
     install_requires=[
         "Django>=4.2",
-        "djangorestframework",
-        "mediapipe",
         "numpy",
         "opencv-python"
     ],
+    extras_require={
+        # DRF serializers (django_integration/serializers.py)
+        "rest": ["djangorestframework", "Pillow"],
+        # Python MediaPipe; the widget itself loads MediaPipe in the browser
+        "mediapipe": ["mediapipe"],
+    },
     python_requires='>=3.8',
     classifiers=[
         'Development Status :: 4 - Beta',
@@ -124,6 +124,18 @@ function getCookie(name) {
     return null;
 }
 
+// Convert a data URL into a Blob so the image can be uploaded as raw bytes
+function dataURLToBlob(dataURL) {
+    const [header, encoded] = dataURL.split(',');
+    const mime = header.match(/:(.*?);/)[1];
+    const binary = atob(encoded);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return new Blob([bytes], { type: mime });
+}
+
 async function startCamera() {
     try {
         logDebug('Requesting camera via getUserMedia');
@@ -790,14 +802,17 @@ function captureImage() {
     // Send to backend API (include CSRF token)
     const csrftoken = getCookie('csrftoken');
 
+    // Upload the encoded bytes directly; the server skips base64/JSON parsing
+    const imageBlob = dataURLToBlob(outputData);
+
     fetch('/face-capture/upload/', {
         method: 'POST',
         headers: {
-            'Content-Type': 'application/json',
+            'Content-Type': imageBlob.type,
             'X-CSRFToken': csrftoken || '',
             'X-Requested-With': 'XMLHttpRequest'
         },
-        body: JSON.stringify({ image: outputData })
+        body: imageBlob
     }).then(res => res.json()).then(json => {
         const resultDiv = document.getElementById('result-msg');
         if (resultDiv) {
@@ -2,6 +2,8 @@
 ASGI config for test_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+WebSocket connections to the streaming liveness endpoint are routed to
+face_liveness_capture's ASGI session handler; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +15,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from face_liveness_capture.django_integration.websocket import websocket_router  # noqa: E402
+
+application = websocket_router(django_application)
@@ -0,0 +1,36 @@
+"""
+Synthetic FaceMesh landmarks with a known pose and eye opening
+"""
+
+import numpy as np
+
+from face_liveness_capture.backend.landmarks import CHIN, FOREHEAD, LEFT_EYE, RIGHT_EYE
+
+
+def canonical_face(eye_opening=0.0375):
+    """Frontal 3D face centred on the origin; EAR is 8 * eye_opening."""
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-0.3, 0.3, (468, 3)) * [1, 1, 0.2]
+    for eye, sign in ((LEFT_EYE, -1), (RIGHT_EYE, 1)):
+        outer, upper1, upper2, inner, lower2, lower1 = eye
+        points[outer] = (sign * 0.35, 0, 0)
+        points[inner] = (sign * 0.1, 0, 0)
+        points[upper1] = (sign * 0.28, -eye_opening, 0)
+        points[lower1] = (sign * 0.28, eye_opening, 0)
+        points[upper2] = (sign * 0.17, -eye_opening, 0)
+        points[lower2] = (sign * 0.17, eye_opening, 0)
+    points[FOREHEAD] = (0, -0.6, 0)
+    points[CHIN] = (0, 0.6, 0)
+    return points
+
+
+def posed(points, yaw=0.0, pitch=0.0, roll=0.0):
+    """Rotate a canonical face and place it in normalized image coordinates."""
+    yaw, pitch, roll = np.radians([yaw, pitch, roll])
+    # Turning towards image +x moves the facing vector (0, 0, -1) to +x
+    rot_y = np.array([[np.cos(yaw), 0, -np.sin(yaw)], [0, 1, 0], [np.sin(yaw), 0, np.cos(yaw)]])
+    # Positive pitch looks up (image -y), positive roll lowers the right eye
+    rot_x = np.array([[1, 0, 0], [0, np.cos(pitch), np.sin(pitch)], [0, -np.sin(pitch), np.cos(pitch)]])
+    rot_z = np.array([[np.cos(roll), -np.sin(roll), 0], [np.sin(roll), np.cos(roll), 0], [0, 0, 1]])
+    rotated = points @ (rot_y @ rot_x @ rot_z).T
+    return rotated * 0.25 + [0.5, 0.5, 0]
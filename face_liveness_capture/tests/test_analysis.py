@@ -0,0 +1,161 @@
+"""
+Unit tests for the shared FrameAnalysis object and validation checks
+"""
+
+import threading
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+
+from face_liveness_capture.backend.analysis import FrameAnalysis, as_analysis
+from face_liveness_capture.backend.validation import (
+    face_size_ok,
+    has_face_contrast,
+    is_bright_enough,
+    is_face_bright_enough,
+    is_face_sharp,
+    is_not_blurry,
+)
+
+
+@pytest.fixture
+def noisy_frame():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(240, 320, 3), dtype=np.uint8)
+
+
+class TestFrameAnalysis:
+    """FrameAnalysis computes each value once"""
+
+    def test_gray_computed_once(self, noisy_frame):
+        frame = FrameAnalysis(noisy_frame)
+        with patch('face_liveness_capture.backend.analysis.cv2.cvtColor',
+                   wraps=cv2.cvtColor) as cvt:
+            is_bright_enough(frame)
+            is_not_blurry(frame)
+            frame.faces
+        assert cvt.call_count == 1
+
+    def test_sharpness_matches_float_laplacian(self, noisy_frame):
+        frame = FrameAnalysis(noisy_frame)
+        expected = cv2.Laplacian(frame.gray, cv2.CV_64F).var()
+        assert frame.sharpness == pytest.approx(expected)
+
+    def test_face_stats(self):
+        frame = FrameAnalysis(np.full((100, 100, 3), 90, dtype=np.uint8))
+        frame.__dict__['faces'] = np.array([[10, 10, 20, 20], [0, 0, 50, 50]])
+        assert frame.largest_face == (0, 0, 50, 50)
+        mean, std = frame.face_stats
+        assert mean == pytest.approx(90)
+        assert std == pytest.approx(0)
+
+    def test_instances_compute_concurrently(self, noisy_frame):
+        # Both threads must be inside `gray` at once; a class-wide lock
+        # would leave the second one waiting and the barrier would break.
+        barrier = threading.Barrier(2, timeout=5)
+
+        def slow_cvt(*args):
+            barrier.wait()
+            return cv2.cvtColor(*args)
+
+        frames = [FrameAnalysis(noisy_frame.copy()) for _ in range(2)]
+        errors = []
+
+        def compute(frame):
+            try:
+                frame.gray
+            except threading.BrokenBarrierError as exc:
+                errors.append(exc)
+
+        with patch('face_liveness_capture.backend.analysis.cv2.cvtColor',
+                   side_effect=slow_cvt):
+            threads = [threading.Thread(target=compute, args=(f,)) for f in frames]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert errors == []
+        assert all("gray" in frame.__dict__ for frame in frames)
+
+    def test_as_analysis_rejects_other_types(self):
+        with pytest.raises(TypeError):
+            as_analysis("not an image")
+
+
+class TestValidationChecks:
+    """Checks accept a FrameAnalysis or a plain image"""
+
+    def test_brightness(self):
+        assert is_bright_enough(np.full((10, 10, 3), 200, dtype=np.uint8))
+        assert not is_bright_enough(np.full((10, 10, 3), 20, dtype=np.uint8))
+
+    def test_blur(self, noisy_frame):
+        assert is_not_blurry(noisy_frame)
+        assert not is_not_blurry(np.zeros((50, 50, 3), dtype=np.uint8))
+
+    def test_face_size_uses_largest_face(self):
+        frame = FrameAnalysis(np.zeros((100, 100, 3), dtype=np.uint8))
+        frame.__dict__['faces'] = np.array([[0, 0, 40, 40]])
+        assert face_size_ok(frame)
+        assert not face_size_ok(frame, (0, 0, 10, 10))
+
+    def test_face_size_without_face(self):
+        frame = FrameAnalysis(np.zeros((100, 100, 3), dtype=np.uint8))
+        frame.__dict__['faces'] = ()
+        assert not face_size_ok(frame)
+
+
+class TestFaceRoiChecks:
+    """Quality measured inside the largest face only"""
+
+    @pytest.fixture
+    def dark_face(self, noisy_frame):
+        img = np.full((240, 320, 3), 220, dtype=np.uint8)
+        img[60:160, 100:200] = noisy_frame[60:160, 100:200] // 4
+        frame = FrameAnalysis(img)
+        frame.__dict__['faces'] = np.array([[100, 60, 100, 100]])
+        return frame
+
+    def test_dark_face_on_bright_background(self, dark_face):
+        assert is_bright_enough(dark_face)
+        assert not is_face_bright_enough(dark_face)
+
+    def test_face_roi_is_a_view_of_gray(self, dark_face):
+        dark_face.gray
+        assert dark_face.face_roi.shape == (100, 100)
+        assert np.shares_memory(dark_face.face_roi, dark_face.gray)
+
+    def test_face_roi_without_gray_converts_crop_only(self, dark_face):
+        roi = dark_face.face_roi
+        assert 'gray' not in dark_face.__dict__
+        assert np.array_equal(roi, dark_face.gray[60:160, 100:200])
+
+    def test_face_sharpness_matches_crop_laplacian(self, dark_face):
+        crop = dark_face.gray[60:160, 100:200]
+        expected = cv2.Laplacian(crop, cv2.CV_64F).var()
+        assert dark_face.face_sharpness == pytest.approx(expected)
+
+    def test_blurred_face_on_sharp_background(self, noisy_frame):
+        img = noisy_frame.copy()
+        img[60:160, 100:200] = cv2.GaussianBlur(img[60:160, 100:200], (0, 0), 5)
+        frame = FrameAnalysis(img)
+        frame.__dict__['faces'] = np.array([[100, 60, 100, 100]])
+        assert is_not_blurry(frame)
+        assert not is_face_sharp(frame)
+
+    def test_flat_face_has_no_contrast(self):
+        frame = FrameAnalysis(np.full((100, 100, 3), 150, dtype=np.uint8))
+        frame.__dict__['faces'] = np.array([[10, 10, 50, 50]])
+        assert is_face_bright_enough(frame)
+        assert not has_face_contrast(frame)
+
+    def test_no_face_fails_roi_checks(self):
+        frame = FrameAnalysis(np.full((100, 100, 3), 150, dtype=np.uint8))
+        frame.__dict__['faces'] = ()
+        assert frame.face_roi is None
+        assert not is_face_bright_enough(frame)
+        assert not has_face_contrast(frame)
+        assert not is_face_sharp(frame)
@@ -0,0 +1,58 @@
+"""
+Tests for batch verification on the thread pool
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+from face_liveness_capture.backend.detection import verify_liveness_batch
+
+
+class TestVerifyLivenessBatch:
+    """verify_liveness_batch ordering, error isolation and bounds"""
+
+    def test_results_in_input_order(self):
+        def fake_verify(image_data):
+            time.sleep(0.01 * (5 - image_data))
+            return {"success": True, "path": str(image_data)}
+
+        with patch('face_liveness_capture.backend.detection.verify_liveness', fake_verify):
+            results = verify_liveness_batch(list(range(5)))
+
+        assert [r["path"] for r in results] == ["0", "1", "2", "3", "4"]
+
+    def test_errors_reported_per_item(self):
+        def fake_verify(image_data):
+            if image_data == "bad":
+                raise RuntimeError("boom")
+            return {"success": True}
+
+        with patch('face_liveness_capture.backend.detection.verify_liveness', fake_verify):
+            results = verify_liveness_batch(["ok", "bad", "ok"])
+
+        assert results[0]["success"] and results[2]["success"]
+        assert results[1] == {"success": False, "error": "Processing error: boom"}
+
+    def test_in_flight_is_bounded(self):
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def fake_verify(image_data):
+            with lock:
+                state["current"] += 1
+                state["peak"] = max(state["peak"], state["current"])
+            time.sleep(0.01)
+            with lock:
+                state["current"] -= 1
+            return {"success": True}
+
+        with patch('face_liveness_capture.backend.detection.verify_liveness', fake_verify):
+            verify_liveness_batch(range(12), max_in_flight=2)
+
+        assert state["peak"] <= 2
+
+    def test_invalid_images(self):
+        results = verify_liveness_batch([b"garbage", "data:image/jpeg;base64,!!"])
+        assert len(results) == 2
+        assert all(not r["success"] for r in results)
@@ -0,0 +1,138 @@
+"""
+Tests for the content-hash result cache
+"""
+
+import base64
+import threading
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from face_liveness_capture.backend.cache import ResultCache, result_cache, result_key
+from face_liveness_capture.backend.detection import verify_liveness
+from face_liveness_capture.backend.persistence import WriteBehindWriter
+from face_liveness_capture.backend.storage import storage
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    result_cache.clear()
+    yield
+    result_cache.clear()
+
+
+@pytest.fixture
+def counted_verify():
+    calls = []
+
+    def fake_verify_bytes(data):
+        calls.append(bytes(data))
+        return {"success": False, "error": "No face detected"}
+
+    with patch('face_liveness_capture.backend.detection._verify_bytes', fake_verify_bytes):
+        yield calls
+
+
+class TestResultCache:
+    """ResultCache LRU and TTL behaviour"""
+
+    def test_lru_eviction(self):
+        cache = ResultCache()
+        with override_settings(FACE_LIVENESS_RESULT_CACHE_SIZE=2):
+            cache.set("a", {"n": 1})
+            cache.set("b", {"n": 2})
+            cache.get("a")
+            cache.set("c", {"n": 3})
+        assert cache.get("b") is None
+        assert cache.get("a") == {"n": 1}
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        cache = ResultCache()
+        with override_settings(FACE_LIVENESS_RESULT_CACHE_TTL=-1):
+            cache.set("a", {"n": 1})
+        assert cache.get("a") is None
+
+    def test_shared_tier(self):
+        with override_settings(FACE_LIVENESS_RESULT_CACHE_ALIAS='default'):
+            ResultCache().set("k", {"n": 1})
+            other_worker = ResultCache()
+            assert other_worker.get("k") == {"n": 1}
+            assert other_worker.stats()["shared_hits"] == 1
+
+
+class TestVerifyLivenessCaching:
+    """verify_liveness consults the cache before doing any work"""
+
+    def test_repeated_payload_hits_cache(self, counted_verify, sample_image):
+        before = result_cache.stats()
+        first = verify_liveness(sample_image)
+        second = verify_liveness(sample_image)
+
+        assert first == second
+        assert len(counted_verify) == 1
+        after = result_cache.stats()
+        assert after["hits"] - before["hits"] == 1
+        assert after["misses"] - before["misses"] == 1
+
+    def test_base64_and_binary_share_entry(self, counted_verify, sample_image):
+        verify_liveness(sample_image)
+        verify_liveness('data:image/jpeg;base64,' + base64.b64encode(sample_image).decode())
+        assert len(counted_verify) == 1
+
+    def test_disabled(self, counted_verify, sample_image):
+        with override_settings(FACE_LIVENESS_RESULT_CACHE=False):
+            verify_liveness(sample_image)
+            verify_liveness(sample_image)
+        assert len(counted_verify) == 2
+
+    def test_processing_errors_not_cached(self, sample_image):
+        with patch('face_liveness_capture.backend.detection._verify_bytes',
+                   return_value={"success": False, "error": "Processing error: boom"}):
+            verify_liveness(sample_image)
+        assert result_cache.get(result_key(sample_image)) is None
+
+    def test_settings_change_misses(self, counted_verify, sample_image):
+        verify_liveness(sample_image)
+        with override_settings(FACE_LIVENESS_QUALITY_ROI=True):
+            verify_liveness(sample_image)
+        with override_settings(FACE_LIVENESS_DEFAULT_DETECTOR="lbp_frontalface"):
+            verify_liveness(sample_image)
+        verify_liveness(sample_image)
+        assert len(counted_verify) == 3
+
+    def test_failing_shared_tier_falls_back(self, counted_verify, sample_image):
+        with override_settings(FACE_LIVENESS_RESULT_CACHE_ALIAS='missing'):
+            first = verify_liveness(sample_image)
+            result_cache.clear()
+            second = verify_liveness(sample_image)
+        assert first == second == {"success": False, "error": "No face detected"}
+        assert len(counted_verify) == 2
+        assert result_cache.stats()["shared_errors"] == 4
+
+    def test_write_behind_cached_once_persisted(self, sample_image, tmp_path):
+        writer = WriteBehindWriter()
+        release = threading.Event()
+        real_save = storage.save
+        capture_id = "0" * 32
+
+        def slow_save(*args, **kwargs):
+            release.wait(5)
+            return real_save(*args, **kwargs)
+
+        def fake_verify_bytes(data):
+            writer.submit(capture_id, b"jpeg bytes")
+            return {"success": True, "capture_id": capture_id}
+
+        with override_settings(FACE_LIVENESS_WRITE_BEHIND=True,
+                               FACE_LIVENESS_CAPTURE_ROOT=str(tmp_path)), \
+                patch('face_liveness_capture.backend.detection.writer', writer), \
+                patch('face_liveness_capture.backend.detection._verify_bytes', fake_verify_bytes), \
+                patch.object(storage, 'save', slow_save):
+            key = result_key(sample_image)
+            verify_liveness(sample_image)
+            assert result_cache.get(key) is None
+            release.set()
+            writer.shutdown()
+        assert result_cache.get(key)["capture_id"] == capture_id
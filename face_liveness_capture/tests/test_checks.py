@@ -0,0 +1,126 @@
+"""
+Tests for the cost-ordered check scheduler
+"""
+
+import time
+
+import numpy as np
+from django.test import override_settings
+
+from face_liveness_capture.backend.analysis import FrameAnalysis, lazy_attribute
+from face_liveness_capture.backend.checks import (
+    ROI_CHECKS,
+    Check,
+    CheckScheduler,
+    get_scheduler,
+    roi_scheduler,
+    scheduler as frame_scheduler,
+)
+
+
+def make_check(name, cost, reject_rate, calls, passes=True, requires=(), shares=()):
+    def predicate(frame):
+        calls.append(name)
+        return passes
+    return Check(name, f"{name} failed", predicate, cost, reject_rate, requires, shares)
+
+
+class SlowGrayFrame:
+    """Frame whose shared grayscale conversion takes 20 ms"""
+
+    @lazy_attribute
+    def gray(self):
+        time.sleep(0.02)
+        return None
+
+
+class TestCheckScheduler:
+    """Ordering, early exit and adaptation"""
+
+    def test_cheap_selective_checks_run_first(self):
+        calls = []
+        scheduler = CheckScheduler([
+            make_check("slow", cost=1.0, reject_rate=0.5, calls=calls),
+            make_check("cheap", cost=0.001, reject_rate=0.5, calls=calls),
+        ])
+        assert scheduler.run(None) is None
+        assert calls == ["cheap", "slow"]
+
+    def test_early_exit(self):
+        calls = []
+        scheduler = CheckScheduler([
+            make_check("reject", cost=0.001, reject_rate=0.5, calls=calls, passes=False),
+            make_check("never", cost=1.0, reject_rate=0.5, calls=calls),
+        ])
+        assert scheduler.run(None) == "reject failed"
+        assert calls == ["reject"]
+
+    def test_requirements_respected(self):
+        calls = []
+        scheduler = CheckScheduler([
+            make_check("dependent", cost=0.0, reject_rate=0.9, calls=calls, requires=("base",)),
+            make_check("base", cost=1.0, reject_rate=0.1, calls=calls),
+        ])
+        scheduler.run(None)
+        assert calls == ["base", "dependent"]
+
+    def test_reorders_from_live_statistics(self):
+        calls = []
+        scheduler = CheckScheduler([
+            make_check("a", cost=0.001, reject_rate=0.9, calls=calls),
+            make_check("b", cost=0.002, reject_rate=0.1, calls=calls, passes=False),
+        ])
+        for _ in range(CheckScheduler.REORDER_EVERY * 2):
+            scheduler.run(None)
+        # "a" never rejects and "b" always does, so "b" moves to the front
+        assert scheduler.stats()["order"] == ["b", "a"]
+
+    def test_declared_order_when_disabled(self):
+        calls = []
+        scheduler = CheckScheduler([
+            make_check("slow", cost=1.0, reject_rate=0.5, calls=calls),
+            make_check("cheap", cost=0.001, reject_rate=0.5, calls=calls),
+        ])
+        with override_settings(FACE_LIVENESS_ADAPTIVE_CHECK_ORDER=False):
+            scheduler.run(None)
+        assert calls == ["slow", "cheap"]
+
+    def test_shared_values_not_charged_to_first_check(self):
+        calls = []
+        scheduler = CheckScheduler([
+            make_check("first", cost=0.001, reject_rate=0.5, calls=calls, shares=("gray",)),
+            make_check("second", cost=0.002, reject_rate=0.5, calls=calls, shares=("gray",)),
+        ])
+        scheduler.run(SlowGrayFrame())
+        stats = scheduler.stats()
+        assert calls == ["first", "second"]
+        assert stats["checks"]["first"]["cost"] < 0.002
+        assert stats["shared"]["gray"]["runs"] == 1
+        assert stats["shared"]["gray"]["cost"] > 0.0005
+
+    def test_shared_cost_counted_once_in_order(self):
+        calls = []
+        scheduler = CheckScheduler([
+            make_check("reader", cost=0.001, reject_rate=0.9, calls=calls, shares=("detection",)),
+            make_check("other", cost=0.015, reject_rate=0.5, calls=calls),
+            make_check("also_reader", cost=0.001, reject_rate=0.5, calls=calls,
+                       shares=("detection",)),
+        ])
+        # Once "reader" has paid for detection, "also_reader" is the cheapest
+        assert scheduler.stats()["order"] == ["reader", "also_reader", "other"]
+
+    def test_dark_frame_rejected_before_detection(self):
+        frame = FrameAnalysis(np.zeros((480, 640, 3), dtype=np.uint8))
+        assert CheckScheduler().run(frame) == "Image too dark"
+        assert "faces" not in frame.__dict__
+        assert "gray" not in frame.__dict__
+
+    def test_roi_checks_detect_first(self):
+        frame = FrameAnalysis(np.zeros((480, 640, 3), dtype=np.uint8))
+        assert CheckScheduler(ROI_CHECKS).run(frame) == "No face detected"
+        assert "face_stats" not in frame.__dict__
+
+    def test_quality_roi_selects_scheduler(self):
+        assert get_scheduler() is frame_scheduler
+        with override_settings(FACE_LIVENESS_QUALITY_ROI=True):
+            assert get_scheduler() is roi_scheduler
@@ -0,0 +1,206 @@
+"""
+Unit tests for the process-wide detector registry
+"""
+
+import threading
+
+import numpy as np
+import pytest
+from django.test import override_settings
+
+from face_liveness_capture.backend.analysis import FrameAnalysis
+from face_liveness_capture.backend.detectors import (
+    CascadeModel,
+    DetectorModel,
+    DetectorRegistry,
+    HAAR_FRONTALFACE,
+    SSD_RES10,
+    YUNET,
+    bound_detections,
+    bundled_model,
+    registry,
+    ssd_detections,
+    yunet_detections,
+)
+
+
+class TestDetectorRegistry:
+    """Tests for DetectorRegistry"""
+
+    def _fresh_registry(self):
+        default = registry._models[HAAR_FRONTALFACE]
+        fresh = DetectorRegistry()
+        fresh.register(HAAR_FRONTALFACE, CascadeModel(default.path))
+        return fresh
+
+    def test_same_thread_reuses_instance(self):
+        """A thread gets the same classifier on every call"""
+        fresh = self._fresh_registry()
+        assert fresh.get() is fresh.get()
+        assert fresh.stats()[HAAR_FRONTALFACE]["instances"] == 1
+
+    def test_threads_get_own_instances(self):
+        """Each thread builds its own classifier from the cached source"""
+        fresh = self._fresh_registry()
+        seen = []
+        worker = threading.Thread(target=lambda: seen.append(fresh.get()))
+        worker.start()
+        worker.join()
+
+        assert seen[0] is not fresh.get()
+        assert fresh.stats()[HAAR_FRONTALFACE]["instances"] == 2
+
+    def test_warm_up_reports_stats(self):
+        """Warm-up loads every model and records timings"""
+        fresh = self._fresh_registry()
+        stats = fresh.warm_up()[HAAR_FRONTALFACE]
+        assert stats["load_seconds"] > 0
+        assert stats["warmup_seconds"] is not None
+        assert stats["source_bytes"] > 0
+
+    def test_preload_builds_no_instance(self):
+        """Preloading reads the model source but leaves instances to each thread"""
+        fresh = self._fresh_registry()
+        stats = fresh.preload()[HAAR_FRONTALFACE]
+        assert stats["source_bytes"] > 0
+        assert stats["instances"] == 0
+        assert stats["warmed_threads"] == 0
+
+    def test_first_use_warms_the_thread(self):
+        """A thread warms its instance when it first builds it, if WARMUP is set"""
+        fresh = self._fresh_registry()
+
+        def use():
+            worker = threading.Thread(target=fresh.get)
+            worker.start()
+            worker.join()
+
+        with override_settings(FACE_LIVENESS_WARMUP=True):
+            use()
+        with override_settings(FACE_LIVENESS_WARMUP=False):
+            use()
+        stats = fresh.stats()[HAAR_FRONTALFACE]
+        assert stats["instances"] == 2
+        assert stats["warmed_threads"] == 1
+
+    def test_pool_threads_warm_themselves(self):
+        """warm_executors() starts every pool thread with its own detector"""
+        from face_liveness_capture.backend import detection
+        detection.warm_executors(["batch"])
+        workers = detection._executor_workers["batch"]
+        barrier = threading.Barrier(workers)
+
+        def warmed():
+            barrier.wait(5)
+            return HAAR_FRONTALFACE in getattr(registry._local, "instances", {})
+
+        jobs = [detection.get_batch_executor().submit(warmed) for _ in range(workers)]
+        assert all(job.result() for job in jobs)
+        assert registry.stats()[HAAR_FRONTALFACE]["warmed_threads"] >= workers
+
+    def test_loaded_classifier_detects(self):
+        """Classifier built from memory behaves like one loaded from disk"""
+        faces = registry.get().detectMultiScale(np.zeros((120, 160), dtype=np.uint8))
+        assert len(faces) == 0
+
+    def test_unknown_detector(self):
+        """Unknown model names raise ValueError"""
+        fresh = DetectorRegistry()
+        with pytest.raises(ValueError):
+            fresh.get("missing")
+
+
+class FakeColourModel(DetectorModel):
+    """Engine that records the image it was given"""
+
+    input = "bgr"
+
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    def create(self):
+        return object()
+
+    def detect(self, instance, image, min_size=None, max_size=None):
+        self.seen.append(image.shape)
+        return np.array([[1, 2, 3, 4]], dtype=np.int32), np.array([0.9], dtype=np.float32)
+
+
+class TestDetectorEngines:
+    """Engine interface, output parsing and selection"""
+
+    def test_cascade_returns_rects_and_scores(self):
+        rects, scores = registry.detect(np.zeros((120, 160, 3), dtype=np.uint8))
+        assert rects.shape == (0, 4) and rects.dtype == np.int32
+        assert scores.shape == (0,)
+
+    def test_yunet_output(self):
+        faces = np.zeros((2, 15), dtype=np.float32)
+        faces[0, :4] = (10.4, 20.6, 30, 40)
+        faces[0, 14] = 0.95
+        faces[1, :4] = (-5, 90, 20, 20)
+        faces[1, 14] = 0.7
+        rects, scores = yunet_detections(faces, (100, 100, 3))
+        assert rects.tolist() == [[10, 21, 30, 40], [0, 90, 15, 10]]
+        assert scores.tolist() == pytest.approx([0.95, 0.7])
+        assert yunet_detections(None, (100, 100))[0].shape == (0, 4)
+
+    def test_ssd_output(self):
+        output = np.zeros((1, 1, 3, 7), dtype=np.float32)
+        output[0, 0, 0] = (0, 1, 0.9, 0.1, 0.2, 0.5, 0.6)
+        output[0, 0, 1] = (0, 1, 0.3, 0.0, 0.0, 1.0, 1.0)
+        output[0, 0, 2] = (0, 1, 0.8, 0.9, 0.9, 1.2, 1.1)
+        rects, scores = ssd_detections(output, (200, 100, 3), 0.5)
+        assert rects.tolist() == [[10, 40, 40, 80], [90, 180, 10, 20]]
+        assert scores.tolist() == pytest.approx([0.9, 0.8])
+
+    def test_bound_detections(self):
+        rects = np.array([[0, 0, 10, 10], [0, 0, 20, 5], [0, 0, 50, 50]], dtype=np.int32)
+        scores = np.array([1, 2, 3], dtype=np.float32)
+        kept, kept_scores = bound_detections(rects, scores, 10, 40)
+        assert kept.tolist() == [[0, 0, 10, 10], [0, 0, 20, 5]]
+        assert kept_scores.tolist() == [1, 2]
+        assert bound_detections(rects, scores)[0] is rects
+
+    def test_cascade_skips_out_of_range_scales(self):
+        image = np.zeros((120, 160), dtype=np.uint8)
+        rects, _ = registry.detect(image, HAAR_FRONTALFACE, min_size=200, max_size=300)
+        assert rects.shape == (0, 4)
+
+    def test_missing_model_file(self, tmp_path):
+        model = CascadeModel(bundled_model("missing.xml"))
+        with override_settings(FACE_LIVENESS_DETECTOR_MODEL_DIR=str(tmp_path)):
+            assert model.path == str(tmp_path / "missing.xml")
+            assert not model.available()
+            with pytest.raises(ValueError, match="not found"):
+                model.create()
+
+    def test_warm_up_skips_unavailable_models(self, tmp_path):
+        fresh = DetectorRegistry()
+        fresh.register(HAAR_FRONTALFACE, CascadeModel(registry.model(HAAR_FRONTALFACE).path))
+        fresh.register("missing", CascadeModel(str(tmp_path / "missing.xml")))
+        assert fresh.available() == [HAAR_FRONTALFACE]
+        assert fresh.warm_up()["missing"]["instances"] == 0
+
+    def test_colour_engine_gets_colour_frame(self):
+        model = FakeColourModel()
+        registry.register("fake_colour", model)
+        try:
+            with override_settings(FACE_LIVENESS_DEFAULT_DETECTOR="fake_colour"):
+                frame = FrameAnalysis(np.zeros((48, 64, 3), dtype=np.uint8))
+                assert frame.largest_face == (1, 2, 3, 4)
+                assert frame.face_scores.tolist() == pytest.approx([0.9])
+                assert "gray" not in frame.__dict__
+        finally:
+            registry._models.pop("fake_colour")
+            registry._stats.pop("fake_colour")
+        # The first call warmed this thread's instance up
+        assert model.seen[-1] == (48, 64, 3)
+
+    @pytest.mark.parametrize("name", [YUNET, SSD_RES10])
+    def test_dnn_engine_runs(self, name):
+        if not registry.model(name).available():
+            pytest.skip(f"{name} model files not installed (tools/fetch_models.py)")
+        rects, scores = registry.detect(np.zeros((240, 320, 3), dtype=np.uint8), name)
+        assert rects.shape[1] == 4 and len(rects) == len(scores)
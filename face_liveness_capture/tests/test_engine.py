@@ -0,0 +1,87 @@
+"""
+Tests for the process-pool verification engine
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from face_liveness_capture.backend.analysis import FrameAnalysis
+from face_liveness_capture.backend.detection import run_checks
+from face_liveness_capture.backend.engine import EngineError, ProcessPoolEngine, _Worker
+
+
+@pytest.fixture(scope='module')
+def engine():
+    engine = ProcessPoolEngine(workers=1, max_jobs_per_worker=3, timeout=60)
+    yield engine
+    engine.shutdown()
+
+
+def wait_for_idle(engine, timeout=60):
+    deadline = time.time() + timeout
+    while engine.stats()['idle'] == 0 and time.time() < deadline:
+        time.sleep(0.05)
+
+
+@pytest.mark.slow
+class TestProcessPoolEngine:
+    """Checks in worker processes match inline checks"""
+
+    def test_matches_inline(self, engine):
+        img = np.full((240, 320, 3), 150, dtype=np.uint8)
+        frame = FrameAnalysis(img)
+        assert engine.check(img) == (run_checks(frame), frame.largest_face)
+
+    def test_worker_recycled_after_max_jobs(self, engine):
+        img = np.zeros((120, 160, 3), dtype=np.uint8)
+        before = engine.stats()['recycled']
+        for _ in range(3):
+            wait_for_idle(engine)
+            engine.check(img)
+        assert engine.stats()['recycled'] == before + 1
+
+    def test_recycle_does_not_block_request(self, engine):
+        stopped_in = []
+        real_stop = _Worker.stop
+
+        def stop(worker, *args):
+            stopped_in.append(threading.current_thread())
+            real_stop(worker, *args)
+
+        img = np.zeros((120, 160, 3), dtype=np.uint8)
+        with patch('face_liveness_capture.backend.engine._Worker.stop', stop):
+            for _ in range(3):
+                wait_for_idle(engine)
+                engine.check(img)
+            wait_for_idle(engine)
+        assert len(stopped_in) == 1
+        assert stopped_in[0] is not threading.current_thread()
+
+    def test_shared_memory_failure_returns_worker(self, engine):
+        wait_for_idle(engine)
+        worker = engine._idle.queue[0]
+        with patch.object(worker, 'frame_buffer', side_effect=OSError("No space left")):
+            with pytest.raises(OSError):
+                engine.check(np.zeros((120, 160, 3), dtype=np.uint8))
+        assert engine.stats()['idle'] == 1
+        assert engine.stats()['busy'] == 0
+        img = np.full((120, 160, 3), 150, dtype=np.uint8)
+        assert engine.check(img)[0] == "Image too blurry"
+
+    def test_crash_is_isolated(self, engine):
+        wait_for_idle(engine)
+        worker = engine._idle.queue[0]
+        worker.process.kill()
+        worker.process.join()
+
+        with pytest.raises(EngineError):
+            engine.check(np.zeros((120, 160, 3), dtype=np.uint8))
+        assert engine.stats()['crashes'] == 1
+
+        wait_for_idle(engine)
+        img = np.full((120, 160, 3), 150, dtype=np.uint8)
+        assert engine.check(img)[0] == "Image too blurry"
@@ -0,0 +1,120 @@
+"""
+Unit tests for face_liveness_capture.backend.face_utils
+"""
+
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+from django.test import override_settings
+
+from face_liveness_capture.backend.face_utils import (
+    FaceDetections,
+    decode_for_analysis,
+    detect_face,
+    downscale,
+    face_size_bounds,
+    full_resolution_shape,
+    image_dimensions,
+    is_jpeg,
+    reduction_factor,
+    scale_rect,
+)
+
+
+def encode(width, height, ext='.jpg'):
+    img = np.full((height, width, 3), 128, dtype=np.uint8)
+    ok, buf = cv2.imencode(ext, img)
+    assert ok
+    return buf.tobytes()
+
+
+class TestImageDimensions:
+    """Header-only dimension parsing"""
+
+    @pytest.mark.parametrize('ext', ['.jpg', '.png'])
+    def test_reads_dimensions(self, ext):
+        assert image_dimensions(encode(1280, 720, ext)) == (1280, 720)
+
+    def test_progressive_jpeg(self):
+        img = np.zeros((300, 400, 3), dtype=np.uint8)
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_PROGRESSIVE, 1])
+        assert image_dimensions(buf.tobytes()) == (400, 300)
+
+    def test_unknown_format(self):
+        assert image_dimensions(b'GIF89a' + b'\0' * 20) is None
+
+
+class TestAnalysisPyramid:
+    """Reduced analysis copies and rectangle mapping"""
+
+    def test_reduction_factor(self):
+        assert reduction_factor(640, 480, 640) == 1
+        assert reduction_factor(1920, 1080, 640) == 2
+        assert reduction_factor(4000, 3000, 640) == 4
+        assert reduction_factor(16000, 12000, 640) == 8
+
+    def test_reduced_jpeg_skips_full_decode(self):
+        analysis, full = decode_for_analysis(encode(4000, 3000), 640)
+        assert full is None
+        assert analysis.shape[:2] == (750, 1000)
+
+    def test_small_image_is_not_reduced(self):
+        analysis, full = decode_for_analysis(encode(640, 480), 640)
+        assert analysis is full
+
+    def test_downscale(self):
+        img = np.zeros((3000, 4000, 3), dtype=np.uint8)
+        assert downscale(img, 640).shape[:2] == (750, 1000)
+
+    def test_scale_rect(self):
+        rect = scale_rect((10, 20, 30, 40), (750, 1000), (3000, 4000))
+        assert rect == (40, 80, 120, 160)
+
+
+class TestFullResolutionShape:
+    """Full-resolution shape from the header, oriented like the decoded copy"""
+
+    def test_landscape(self):
+        analysis = np.zeros((300, 400, 3), dtype=np.uint8)
+        assert full_resolution_shape(encode(1600, 1200), analysis) == (1200, 1600)
+
+    def test_exif_rotated(self):
+        analysis = np.zeros((400, 300, 3), dtype=np.uint8)
+        assert full_resolution_shape(encode(1600, 1200), analysis) == (1600, 1200)
+
+    def test_is_jpeg(self):
+        assert is_jpeg(encode(10, 10))
+        assert not is_jpeg(encode(10, 10, '.png'))
+
+
+class TestFaceDetection:
+    """detect_face() returns rectangles and searches bounded face sizes"""
+
+    def test_face_size_bounds(self):
+        assert face_size_bounds((480, 640, 3)) == (123, 384)
+        with override_settings(FACE_LIVENESS_MIN_FACE_AREA=0.25,
+                               FACE_LIVENESS_MAX_FACE_HEIGHT=0.5):
+            assert face_size_bounds((480, 640)) == (277, 277)
+
+    def test_bounds_can_be_disabled(self):
+        with override_settings(FACE_LIVENESS_DETECTOR_SIZE_BOUNDS=False):
+            assert face_size_bounds((480, 640)) == (None, None)
+
+    def test_detect_face_passes_bounds(self):
+        rects = np.array([[10, 10, 150, 150], [300, 50, 200, 200]], dtype=np.int32)
+        scores = np.array([7, 12], dtype=np.float32)
+        with patch('face_liveness_capture.backend.face_utils.registry.detect',
+                   return_value=(rects, scores)) as detect:
+            result = detect_face(np.zeros((480, 640, 3), dtype=np.uint8))
+        assert detect.call_args.args[2:] == (123, 384)
+        assert result and len(result) == 2
+        assert result.largest == (300, 50, 200, 200)
+        assert result.scores.tolist() == [7, 12]
+
+    def test_no_face_is_falsy(self):
+        result = detect_face(np.zeros((120, 160, 3), dtype=np.uint8))
+        assert not result
+        assert result.largest is None
+        assert isinstance(result, FaceDetections)
@@ -0,0 +1,57 @@
+"""
+Import-time checks: loading the URLconf must not import the image stack
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from face_liveness_capture.backend.lazy import lazy_import
+
+HEAVY_MODULES = ["cv2", "numpy", "PIL", "rest_framework", "mediapipe"]
+
+SCRIPT = """
+import json, sys
+import django
+from django.conf import settings
+settings.configure(
+    INSTALLED_APPS=["django.contrib.contenttypes", "django.contrib.auth",
+                    "face_liveness_capture.django_integration"],
+    FACE_LIVENESS_WARMUP=False,
+)
+django.setup()
+import face_liveness_capture.django_integration.urls
+import face_liveness_capture.backend.detection
+print(json.dumps([m for m in %r if m in sys.modules]))
+""" % (HEAVY_MODULES,)
+
+
+def run_fresh_interpreter():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", SCRIPT], cwd=root, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+class TestImportTime:
+    """Heavy dependencies load on first use, not at import"""
+
+    def test_urlconf_does_not_import_heavy_modules(self):
+        assert run_fresh_interpreter() == []
+
+
+class TestLazyImport:
+    """LazyModule placeholders"""
+
+    def test_loads_on_first_attribute(self):
+        json_module = lazy_import("json")
+        assert json_module.dumps([1]) == "[1]"
+        assert "dumps" in vars(json_module)
+
+    def test_missing_module_raises_on_use(self):
+        missing = lazy_import("face_liveness_capture_missing_module")
+        with pytest.raises(ImportError):
+            missing.anything
@@ -0,0 +1,94 @@
+"""
+Tests for streaming base64 extraction from JSON bodies
+"""
+
+import base64
+import binascii
+import io
+import json
+import os
+import tracemalloc
+
+import pytest
+from django.test import Client
+
+from face_liveness_capture.backend.json_stream import extract_base64_field
+
+
+def extract(body, chunk_size=7, **kwargs):
+    if isinstance(body, str):
+        body = body.encode()
+    return extract_base64_field(io.BytesIO(body), chunk_size=chunk_size, **kwargs)
+
+
+@pytest.fixture
+def payload():
+    return os.urandom(3000) + b"end"
+
+
+class TestExtractBase64Field:
+    """Scanning the JSON object and decoding the field"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+    def test_data_url_after_other_members(self, payload, chunk_size):
+        body = json.dumps({
+            "name": 'say "image": no',
+            "nested": {"image": [1, 2, {"x": "}]"}], "n": None},
+            "count": -1.5e3,
+            "image": "data:image/jpeg;base64," + base64.b64encode(payload).decode(),
+            "after": True,
+        })
+        assert extract(body, chunk_size) == payload
+
+    def test_plain_base64_with_escapes(self, payload):
+        encoded = base64.b64encode(payload).decode()
+        body = '{"image": "%s"}' % encoded.replace("/", "\\/").replace("+", "\\u002b", 1)
+        assert extract(body) == payload
+
+    def test_whitespace_and_newlines(self, payload):
+        encoded = base64.encodebytes(payload).decode()
+        assert extract(json.dumps({"image": encoded}, indent=2)) == payload
+
+    def test_missing_or_not_a_string(self):
+        assert extract('{"other": "aGk="}') is None
+        assert extract('{"image": null}') is None
+        assert extract('{}') is None
+
+    def test_other_field(self):
+        assert extract('{"photo": "aGk="}', field="photo") == b"hi"
+
+    @pytest.mark.parametrize("body", ['["image"]', '{"image" "aGk="}', '{"image": "aGk=', ''])
+    def test_malformed_json(self, body):
+        with pytest.raises(ValueError):
+            extract(body)
+
+    def test_invalid_base64(self):
+        with pytest.raises(binascii.Error):
+            extract('{"image": "aGk"}')
+
+    def test_never_holds_the_whole_body(self):
+        payload = os.urandom(4 << 20)
+        body = json.dumps({"image": base64.b64encode(payload).decode()}).encode()
+        tracemalloc.start()
+        try:
+            data = extract_base64_field(io.BytesIO(body), size_hint=len(body))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert data == payload
+        assert peak < len(payload) * 1.2
+
+
+class TestJsonUpload:
+    """upload_face reads JSON through the streaming parser"""
+
+    def test_invalid_base64_is_rejected(self):
+        response = Client().post('/face-capture/upload/', json.dumps({"image": "aGk"}),
+                                 content_type='application/json')
+        assert response.status_code == 200
+        assert response.json()["error"].startswith("Invalid image")
+
+    def test_malformed_json_fails(self):
+        response = Client().post('/face-capture/upload/', '{"image": ',
+                                 content_type='application/json')
+        assert response.status_code == 500
@@ -0,0 +1,129 @@
+"""
+Tests for the vectorized landmark liveness checks
+"""
+
+import numpy as np
+import pytest
+
+from face_liveness_capture.backend.landmarks import (
+    as_landmark_array,
+    blink_events,
+    eye_aspect_ratio,
+    head_pose,
+    turn_events,
+    verify_landmark_sequence,
+)
+from tests.landmark_faces import canonical_face, posed
+
+
+def sequence(*segments):
+    """Frames from (count, kwargs) segments: eye_opening and pose angles."""
+    frames = []
+    for count, options in segments:
+        opening = options.pop("eye_opening", 0.0375)
+        frames += [posed(canonical_face(opening), **options)] * count
+    return np.array(frames, dtype=np.float32)
+
+
+class TestLandmarkArray:
+    """Input conversion"""
+
+    def test_widget_dicts(self):
+        frame = [{"x": 0.1, "y": 0.2, "z": 0.3}] * 468
+        landmarks = as_landmark_array([frame, frame])
+        assert landmarks.shape == (2, 468, 3)
+        assert landmarks.dtype == np.float32
+        assert landmarks[1, 5].tolist() == pytest.approx([0.1, 0.2, 0.3])
+
+    def test_widget_dicts_without_z(self):
+        landmarks = as_landmark_array([{"x": 0.1, "y": 0.2}] * 468)
+        assert landmarks.shape == (1, 468, 3)
+        assert not landmarks[..., 2].any()
+
+    def test_single_frame_without_z(self):
+        landmarks = as_landmark_array(np.full((468, 2), 0.5))
+        assert landmarks.shape == (1, 468, 3)
+        assert not landmarks[..., 2].any()
+
+    @pytest.mark.parametrize("frames", [
+        np.zeros((3, 10, 3)),
+        [[0.1, 0.2]],
+        [np.zeros((468, 3)), np.zeros((5, 3))],
+        [1, 2],
+        [[{"x": 0.1, "y": 0.2}] * 468, [{"x": 0.1, "y": 0.2}] * 467],
+        [[{"y": 0.2}] * 468],
+    ])
+    def test_rejects_other_shapes(self, frames):
+        with pytest.raises(ValueError):
+            as_landmark_array(frames)
+
+
+class TestMeasurements:
+    """EAR and head pose, for all frames at once"""
+
+    def test_eye_aspect_ratio(self):
+        frames = sequence((1, {}), (1, {"eye_opening": 0.01}))
+        assert eye_aspect_ratio(frames).tolist() == pytest.approx([0.3, 0.08], abs=1e-4)
+
+    def test_eye_aspect_ratio_uses_frame_aspect(self):
+        frames = sequence((1, {}))
+        frames[..., 1] = (frames[..., 1] - 0.5) * 0.75 + 0.5  # y normalized by a taller frame
+        assert eye_aspect_ratio(frames, aspect=0.75)[0] == pytest.approx(0.3, abs=1e-4)
+
+    @pytest.mark.parametrize("yaw, pitch, roll", [
+        (0, 0, 0), (30, 0, 0), (-25, 0, 0), (0, 15, 0), (-20, -10, 8),
+    ])
+    def test_head_pose(self, yaw, pitch, roll):
+        pose = head_pose(sequence((1, {"yaw": yaw, "pitch": pitch, "roll": roll})))[0]
+        assert pose.tolist() == pytest.approx([yaw, pitch, roll], abs=0.5)
+
+
+class TestEvents:
+    """Blink and turn events across a sequence"""
+
+    def test_blink(self):
+        ear = np.array([0.3, 0.3, 0.15, 0.1, 0.3, 0.3, 0.1, 0.3])
+        assert blink_events(ear) == [(2, 4), (6, 7)]
+
+    def test_blink_needs_open_eyes_around_it(self):
+        assert blink_events(np.array([0.1, 0.1, 0.3])) == []
+        assert blink_events(np.array([0.3, 0.1, 0.1])) == []
+
+    def test_long_closure_is_not_a_blink(self):
+        assert blink_events(np.array([0.3] + [0.1] * 20 + [0.3])) == []
+
+    def test_noise_between_thresholds_is_not_reopening(self):
+        ear = np.array([0.3, 0.1, 0.22, 0.1, 0.3])
+        assert blink_events(ear, max_frames=1) == [(1, 2), (3, 4)]
+        assert blink_events(np.array([0.22, 0.1, 0.22])) == []
+
+    def test_turns(self):
+        yaw = np.array([0, -25, -30, -22, 0, 25, 0, 30, 28])
+        assert turn_events(yaw) == {"turn_left": [(1, 4)], "turn_right": [(7, 9)]}
+
+
+class TestVerifySequence:
+    """End-to-end verdict"""
+
+    def test_live_sequence(self):
+        frames = sequence(
+            (5, {}), (2, {"eye_opening": 0.01}), (5, {}),
+            (4, {"yaw": -30}), (3, {}), (4, {"yaw": 30}), (2, {}),
+        )
+        result = verify_landmark_sequence(frames)
+        assert result["live"] and result["in_order"]
+        assert result["missing"] == []
+        assert result["events"] == {"blink": [(5, 7)], "turn_left": [(12, 16)], "turn_right": [(19, 23)]}
+        assert result["frames"] == 25
+
+    def test_static_face_is_not_live(self):
+        result = verify_landmark_sequence(sequence((30, {})))
+        assert not result["live"]
+        assert result["missing"] == ["blink", "turn_left", "turn_right"]
+
+    def test_out_of_order(self):
+        frames = sequence((3, {"yaw": 30}), (3, {}), (3, {"yaw": -30}), (3, {}),
+                          (2, {"eye_opening": 0.01}), (3, {}))
+        result = verify_landmark_sequence(frames)
+        assert not result["live"] and not result["in_order"]
+        assert verify_landmark_sequence(frames, ordered=False)["live"]
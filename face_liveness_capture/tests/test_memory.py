@@ -0,0 +1,135 @@
+"""
+Tests for per-stage memory accounting and low-memory mode
+"""
+
+import base64
+import binascii
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+from django.test import Client, override_settings
+
+from face_liveness_capture.backend import metrics
+from face_liveness_capture.backend.cache import result_cache
+from face_liveness_capture.backend.face_utils import Base64Decoder, decode_base64_bytes
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path):
+    result_cache.clear()
+    with override_settings(FACE_LIVENESS_CAPTURE_ROOT=str(tmp_path)):
+        yield
+    result_cache.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def profiling():
+    with override_settings(FACE_LIVENESS_MEMORY_PROFILE=True):
+        yield
+
+
+class TestMemoryStages:
+    """Peak allocation per stage"""
+
+    def test_nested_peaks(self, profiling):
+        with metrics.collect_memory() as memory:
+            with metrics.stage("outer"):
+                with metrics.stage("inner"):
+                    buffer = np.ones(4 << 20, dtype=np.uint8)
+                    del buffer
+                small = np.ones(1 << 20, dtype=np.uint8)
+                del small
+        assert memory["inner"]["peak_bytes"] >= 4 << 20
+        assert memory["outer"]["peak_bytes"] >= memory["inner"]["peak_bytes"]
+        assert metrics.STAGE_PEAK_BYTES.count("inner") >= 1
+
+    def test_still_timed(self, profiling):
+        with metrics.collect_timings() as timings:
+            with metrics.stage("decode"):
+                pass
+        assert "decode" in timings
+
+    def test_stops_tracing_it_started(self, profiling):
+        with metrics.stage("outer"):
+            with metrics.stage("inner"):
+                pass
+            assert tracemalloc.is_tracing()
+        assert not tracemalloc.is_tracing()
+
+    def test_leaves_outside_tracing_running(self, profiling):
+        tracemalloc.start()
+        with metrics.stage("decode"):
+            pass
+        assert tracemalloc.is_tracing()
+
+    def test_off_by_default(self):
+        with metrics.collect_memory() as memory:
+            with metrics.stage("decode"):
+                pass
+        assert memory == {}
+
+    def test_header_format(self):
+        memory = {"decode": {"peak_bytes": 1024, "rss_delta_bytes": None}}
+        assert metrics.memory_profile(memory) == "decode;peak=1024"
+
+    def test_upload_sends_memory_profile(self, profiling, sample_image):
+        response = Client().post('/face-capture/upload/', sample_image, content_type='image/jpeg')
+        profile = response['X-Memory-Profile']
+        assert 'extract;peak=' in profile
+        assert 'decode;peak=' in profile
+
+    def test_no_header_by_default(self, sample_image):
+        response = Client().post('/face-capture/upload/', sample_image, content_type='image/jpeg')
+        assert not response.has_header('X-Memory-Profile')
+
+
+class TestBase64Decoder:
+    """Chunked base64 decoding"""
+
+    def test_any_chunking_matches_b64decode(self):
+        data = bytes(range(256)) * 37 + b"tail"
+        text = base64.b64encode(data).decode()
+        for size in (1, 3, 4, 7, 1000):
+            decoder = Base64Decoder(len(text) * 3 // 4)
+            for offset in range(0, len(text), size):
+                decoder.feed(text[offset:offset + size])
+            assert decoder.finish() == data
+
+    def test_ignores_whitespace(self):
+        decoder = Base64Decoder()
+        decoder.feed(b"aGVs\nbG8g")
+        decoder.feed("d29y bGQ=")
+        assert decoder.finish() == b"hello world"
+
+    def test_incomplete_group_raises(self):
+        decoder = Base64Decoder()
+        decoder.feed("aGVsbG")
+        with pytest.raises(binascii.Error):
+            decoder.finish()
+
+
+class TestLowMemory:
+    """LOW_MEMORY gives the same results"""
+
+    def test_decode_data_url(self, sample_image):
+        url = "data:image/jpeg;base64," + base64.b64encode(sample_image).decode()
+        with override_settings(FACE_LIVENESS_LOW_MEMORY=True):
+            assert decode_base64_bytes(url) == sample_image
+        with override_settings(FACE_LIVENESS_LOW_MEMORY=True):
+            with pytest.raises(ValueError):
+                decode_base64_bytes("data:image/jpeg;base64,abcde")
+
+    def test_json_upload(self, sample_image):
+        body = json.dumps({"image": base64.b64encode(sample_image).decode()})
+        expected = Client().post('/face-capture/upload/', body,
+                                 content_type='application/json').json()
+        result_cache.clear()
+        with override_settings(FACE_LIVENESS_LOW_MEMORY=True):
+            response = Client().post('/face-capture/upload/', body,
+                                     content_type='application/json')
+        assert response.status_code == 200
+        assert response.json() == expected
@@ -0,0 +1,118 @@
+"""
+Tests for stage timing and Prometheus metrics
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.test import Client, override_settings
+
+from face_liveness_capture.backend import metrics
+from face_liveness_capture.backend.cache import result_cache
+from face_liveness_capture.backend.detection import verify_liveness
+from face_liveness_capture.backend.metrics import Counter, Histogram
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    result_cache.clear()
+    yield
+    result_cache.clear()
+
+
+class TestMetricTypes:
+    """Counter and histogram exposition"""
+
+    def test_histogram_render(self):
+        histogram = Histogram("h_seconds", "Help.", (0.1, 1), label="stage")
+        histogram.observe(0.05, "decode")
+        histogram.observe(0.5, "decode")
+        histogram.observe(5, "decode")
+        lines = histogram.render()
+        assert '# TYPE h_seconds histogram' in lines
+        assert 'h_seconds_bucket{stage="decode",le="0.1"} 1' in lines
+        assert 'h_seconds_bucket{stage="decode",le="1.0"} 2' in lines
+        assert 'h_seconds_bucket{stage="decode",le="+Inf"} 3' in lines
+        assert 'h_seconds_count{stage="decode"} 3' in lines
+
+    def test_counter_render(self):
+        counter = Counter("c_total", "Help.", label="outcome")
+        counter.inc("saved")
+        counter.inc("saved")
+        assert 'c_total{outcome="saved"} 2' in counter.render()
+
+    def test_outcome_label(self):
+        assert metrics.outcome_label({"success": True}) == "saved"
+        assert metrics.outcome_label({"error": "Image too dark"}) == "image_too_dark"
+        assert metrics.outcome_label({"error": "Invalid image: bad header"}) == "invalid_image"
+
+
+class TestStageTiming:
+    """Stage timers feed the histogram and the request's timings"""
+
+    def test_collects_request_timings(self):
+        with metrics.collect_timings() as timings:
+            with metrics.stage("decode"):
+                pass
+        assert set(timings) == {"decode"}
+        assert metrics.server_timing({"decode": 0.0125}) == "decode;dur=12.50"
+
+    def test_disabled_is_noop(self):
+        before = metrics.STAGE_SECONDS.count("noop_stage")
+        with override_settings(FACE_LIVENESS_METRICS=False):
+            with metrics.collect_timings() as timings:
+                with metrics.stage("noop_stage"):
+                    pass
+        assert timings == {}
+        assert metrics.STAGE_SECONDS.count("noop_stage") == before
+
+    def test_verify_liveness_records_outcome(self, sample_image):
+        before = metrics.RESULTS.value("invalid_image")
+        with metrics.collect_timings() as timings:
+            verify_liveness(b"not an image")
+        assert metrics.RESULTS.value("invalid_image") == before + 1
+        assert {"total", "decode"} <= set(timings)
+
+    def test_checks_are_timed(self, sample_image):
+        with metrics.collect_timings() as timings:
+            verify_liveness(sample_image)
+        assert "checks" in timings
+        assert any(name.startswith("check_") for name in timings)
+
+
+class TestMetricsEndpoints:
+    """metrics/ view and Server-Timing header"""
+
+    def test_prometheus_view_disabled_by_default(self):
+        assert Client().get('/face-capture/metrics/').status_code == 404
+
+    def test_prometheus_view(self, sample_image):
+        verify_liveness(sample_image)
+        with override_settings(FACE_LIVENESS_METRICS_ENDPOINT=True):
+            response = Client().get('/face-capture/metrics/')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = response.content.decode()
+        assert 'face_liveness_stage_seconds_bucket{stage="decode"' in body
+        assert 'face_liveness_image_pixels_count' in body
+
+    def test_engine_metrics(self):
+        stats = {"queue_depth": 3, "busy": 2, "completed": 7, "failed": 1, "crashes": 0,
+                 "timeouts": 0, "recycled": 1, "workers": 2, "idle": 0}
+        with patch('face_liveness_capture.backend.engine.engine_stats', return_value=stats):
+            assert 'face_liveness_engine' not in metrics.render()
+            with override_settings(FACE_LIVENESS_ENGINE="process"):
+                body = metrics.render()
+        assert 'face_liveness_engine_queue_depth 3' in body
+        assert '# TYPE face_liveness_engine_jobs_completed_total counter' in body
+        assert 'face_liveness_engine_busy_workers 2' in body
+
+    def test_upload_sends_server_timing(self, sample_image):
+        response = Client().post('/face-capture/upload/', sample_image, content_type='image/jpeg')
+        assert 'decode;dur=' in response['Server-Timing']
+
+    def test_no_header_when_disabled(self, sample_image):
+        with override_settings(FACE_LIVENESS_METRICS=False):
+            response = Client().post('/face-capture/upload/', sample_image,
+                                     content_type='image/jpeg')
+        assert not response.has_header('Server-Timing')
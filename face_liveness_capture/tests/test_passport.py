@@ -0,0 +1,85 @@
+"""
+Tests for the server-side passport crop and size-targeted encoder
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from face_liveness_capture.backend.passport import (
+    PASSPORT_ASPECT,
+    crop_passport,
+    encode_to_budget,
+    passport_capture,
+    passport_rect,
+)
+
+
+@pytest.fixture
+def noisy_image():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (900, 700, 3), dtype=np.uint8)
+
+
+class TestPassportRect:
+    """7:9 crop geometry"""
+
+    def test_aspect_and_position(self):
+        x, y, w, h = passport_rect((800, 400, 200, 200), (1080, 1920))
+        assert w / h == pytest.approx(PASSPORT_ASPECT, abs=0.01)
+        assert h == 400
+        assert x + w / 2 == pytest.approx(900, abs=1)
+        assert y < 400 < 400 + 200 < y + h
+
+    def test_clamped_to_frame(self):
+        x, y, w, h = passport_rect((0, 0, 300, 300), (480, 640))
+        assert x >= 0 and y >= 0
+        assert x + w <= 640 and y + h <= 480
+        assert w / h == pytest.approx(PASSPORT_ASPECT, abs=0.01)
+
+
+class TestCropPassport:
+    """Crop and resize to the canonical size"""
+
+    def test_output_size_and_face_mapping(self, noisy_image):
+        passport, face = crop_passport(noisy_image, (250, 300, 200, 200), size=(350, 450))
+        assert passport.shape == (450, 350, 3)
+        assert face[3] == pytest.approx(225, abs=2)
+        assert 0 <= face[0] and face[0] + face[2] <= 350
+
+
+class TestEncodeToBudget:
+    """Binary search over JPEG quality"""
+
+    def test_fits_budget_with_highest_quality(self, noisy_image):
+        sizes = {q: len(cv2.imencode('.jpg', noisy_image, [cv2.IMWRITE_JPEG_QUALITY, q])[1])
+                 for q in (30, 95)}
+        budget = (sizes[30] + sizes[95]) // 2
+        data, quality, passes = encode_to_budget(noisy_image, max_bytes=budget,
+                                                 min_quality=30, max_quality=95)
+        assert len(data) <= budget
+        over = cv2.imencode('.jpg', noisy_image, [cv2.IMWRITE_JPEG_QUALITY, quality + 1])[1]
+        assert len(over) > budget
+        assert passes <= 8
+
+    def test_small_image_fits_first_pass(self):
+        img = np.full((450, 350, 3), 128, dtype=np.uint8)
+        data, quality, passes = encode_to_budget(img, max_bytes=50_000,
+                                                 min_quality=30, max_quality=95)
+        assert (quality, passes) == (95, 1)
+
+    def test_impossible_budget_returns_lowest_quality(self, noisy_image):
+        data, quality, _ = encode_to_budget(noisy_image, max_bytes=100,
+                                            min_quality=30, max_quality=95)
+        assert quality == 30
+        assert cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) is not None
+
+
+class TestPassportCapture:
+    """Crop, encode and timings"""
+
+    def test_reports_details(self, noisy_image):
+        data, face, details = passport_capture(noisy_image, (250, 300, 200, 200))
+        assert data[:2] == b'\xff\xd8'
+        assert details['bytes'] == len(data)
+        assert set(details['timings']) == {'crop_ms', 'encode_ms'}
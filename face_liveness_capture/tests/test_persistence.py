@@ -0,0 +1,131 @@
+"""
+Tests for write-behind persistence
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from face_liveness_capture.backend import persistence
+from face_liveness_capture.backend.detection import capture_status
+from face_liveness_capture.backend.persistence import WriteBehindWriter
+from face_liveness_capture.backend.storage import storage
+
+
+def cid(i):
+    return f"{i:032x}"
+
+
+@pytest.fixture
+def image():
+    return b"\xff\xd8 not really a jpeg \xff\xd9"
+
+
+@pytest.fixture(autouse=True)
+def capture_root(tmp_path):
+    with override_settings(FACE_LIVENESS_CAPTURE_ROOT=str(tmp_path)):
+        yield tmp_path
+
+
+@pytest.fixture
+def writer():
+    writer = WriteBehindWriter()
+    yield writer
+    writer.shutdown()
+
+
+class TestWriteBehindWriter:
+    """Queueing, status reporting and flushing"""
+
+    def test_status_becomes_persisted_after_flush(self, writer, image):
+        path = writer.submit(cid(1), image)
+        writer.flush()
+        assert writer.status(cid(1))["status"] == persistence.PERSISTED
+        assert path == storage.path(cid(1))
+        with open(path, "rb") as fh:
+            assert fh.read() == image
+
+    def test_pending_until_written(self, writer, image):
+        release = threading.Event()
+        real_save = storage.save
+
+        def slow_save(*args, **kwargs):
+            release.wait(5)
+            return real_save(*args, **kwargs)
+
+        with patch.object(storage, 'save', slow_save):
+            writer.submit(cid(1), image)
+            assert writer.status(cid(1))["status"] == persistence.PENDING
+            release.set()
+            writer.flush()
+        assert writer.status(cid(1))["status"] == persistence.PERSISTED
+
+    def test_failed_write_is_reported(self, writer, image):
+        with patch.object(storage, 'save', side_effect=OSError("disk full")):
+            writer.submit(cid(1), image)
+            writer.flush()
+        status = writer.status(cid(1))
+        assert status["status"] == persistence.FAILED
+        assert "disk full" in status["error"]
+
+    def test_when_persisted_waits_for_the_write(self, writer, image):
+        calls = []
+        with patch.object(storage, 'save', side_effect=OSError("disk full")):
+            writer.submit(cid(1), image)
+            writer.when_persisted(cid(1), lambda: calls.append(1))
+            writer.flush()
+        writer.submit(cid(2), image)
+        writer.when_persisted(cid(2), lambda: calls.append(2))
+        writer.flush()
+        writer.when_persisted(cid(2), lambda: calls.append(3))
+        assert calls == [2, 3]
+
+    def test_full_queue_writes_synchronously(self, writer, image):
+        with override_settings(FACE_LIVENESS_WRITE_BEHIND_WORKERS=1,
+                               FACE_LIVENESS_WRITE_BEHIND_QUEUE_SIZE=1,
+                               FACE_LIVENESS_WRITE_BEHIND_PUT_TIMEOUT=0.01):
+            release = threading.Event()
+            real_save = storage.save
+
+            def blocking_save(*args, **kwargs):
+                if threading.current_thread().name.startswith("face-liveness-writer"):
+                    release.wait(5)
+                return real_save(*args, **kwargs)
+
+            with patch.object(storage, 'save', blocking_save):
+                for i in range(3):
+                    writer.submit(cid(i), image + bytes([i]))
+                release.set()
+                writer.flush()
+
+        assert writer.stats()["sync_fallbacks"] >= 1
+        assert all(writer.status(cid(i))["status"] == persistence.PERSISTED for i in range(3))
+
+    def test_shutdown_flushes_queue(self, image):
+        writer = WriteBehindWriter()
+        for i in range(5):
+            writer.submit(cid(i), image + bytes([i]))
+        writer.shutdown()
+        assert all(storage.exists(cid(i)) for i in range(5))
+
+
+class TestCaptureStatus:
+    """capture_status() lookups"""
+
+    def test_unknown_and_malformed_ids(self):
+        assert capture_status("0" * 32) is None
+        assert capture_status("../etc/passwd") is None
+
+    def test_stored_by_another_process(self, image):
+        capture_id = storage.save(image)
+        assert capture_status(capture_id)["status"] == persistence.PERSISTED
+
+    def test_reports_queued_capture(self, image):
+        capture_id = "ab" * 16
+        with patch.object(persistence.writer, 'status',
+                          return_value={"status": "pending", "path": "x", "error": None}):
+            assert capture_status(capture_id) == {
+                "capture_id": capture_id, "status": "pending", "path": "x", "error": None,
+            }
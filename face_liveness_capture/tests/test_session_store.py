@@ -0,0 +1,72 @@
+"""
+Tests for the in-memory liveness session store
+"""
+
+import pytest
+from django.test import override_settings
+
+from face_liveness_capture.backend.liveness_session import LivenessSession
+from face_liveness_capture.django_integration.session_store import LivenessSessionStore
+
+SESSION_BYTES = LivenessSession(window=8).nbytes
+
+
+@pytest.fixture(autouse=True)
+def small_window():
+    with override_settings(FACE_LIVENESS_SESSION_STORE_WINDOW=8):
+        yield
+
+
+class TestLivenessSessionStore:
+    """TTL, memory cap and accounting"""
+
+    def test_create_and_get(self):
+        store = LivenessSessionStore()
+        key, session = store.create(aspect=4 / 3)
+        assert store.get(key) is session
+        assert session.aspect == 4 / 3
+        assert store.get("missing") is None
+
+    def test_slots_and_fixed_buffers(self):
+        store = LivenessSessionStore()
+        _, session = store.create()
+        assert not hasattr(session, "__dict__")
+        assert session.landmarks.dtype == session.recent.dtype == "float32"
+        assert session.nbytes == SESSION_BYTES
+        assert store.stats()["bytes"] == SESSION_BYTES
+
+    def test_ttl_expiry(self):
+        store = LivenessSessionStore()
+        with override_settings(FACE_LIVENESS_SESSION_STORE_TTL=-1):
+            key, _ = store.create()
+        assert store.get(key) is None
+        stats = store.stats()
+        assert (stats["sessions"], stats["bytes"], stats["expired"]) == (0, 0, 1)
+
+    def test_memory_cap_evicts_least_recently_used(self):
+        store = LivenessSessionStore()
+        with override_settings(FACE_LIVENESS_SESSION_STORE_MAX_BYTES=2 * SESSION_BYTES):
+            a, _ = store.create()
+            b, _ = store.create()
+            store.get(a)
+            c, _ = store.create()
+            assert store.get(b) is None
+            assert store.get(a) is not None and store.get(c) is not None
+            stats = store.stats()
+        assert stats["evicted"] == 1
+        assert stats["sessions"] == 2
+        assert stats["bytes"] == 2 * SESSION_BYTES
+
+    def test_newest_session_kept_over_cap(self):
+        store = LivenessSessionStore()
+        with override_settings(FACE_LIVENESS_SESSION_STORE_MAX_BYTES=0):
+            key, _ = store.create()
+            assert store.get(key) is not None
+
+    def test_discard(self):
+        store = LivenessSessionStore()
+        key, _ = store.create()
+        store.discard(key)
+        store.discard(key)
+        assert store.stats()["sessions"] == 0
+        assert store.stats()["bytes"] == 0
@@ -0,0 +1,174 @@
+"""
+Tests for the sharded, content-addressed capture storage
+"""
+
+import os
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+from django.core.files.base import ContentFile
+from django.test import override_settings
+
+from face_liveness_capture.backend import detection
+from face_liveness_capture.backend.cache import content_hash, result_cache
+from face_liveness_capture.backend.storage import CaptureStorage
+from face_liveness_capture.django_integration.storage import CaptureFileStorage
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CaptureStorage(root=str(tmp_path))
+
+
+class TestCaptureStorage:
+    """Layout, deduplication and atomic writes"""
+
+    def test_sharded_content_addressed_path(self, store, tmp_path):
+        capture_id = store.save(b"jpeg bytes")
+        assert capture_id == content_hash(b"jpeg bytes")
+        expected = tmp_path / capture_id[:2] / capture_id[2:4] / f"{capture_id}.jpg"
+        assert store.path(capture_id) == str(expected)
+        assert expected.read_bytes() == b"jpeg bytes"
+
+    def test_duplicates_stored_once(self, store, tmp_path):
+        assert store.save(b"same") == store.save(b"same")
+        files = [f for _, _, names in os.walk(tmp_path) for f in names]
+        assert len(files) == 1
+
+    def test_no_temp_files_left(self, store, tmp_path):
+        capture_id = store.save(b"data", fsync=True)
+        assert os.listdir(os.path.dirname(store.path(capture_id))) == [f"{capture_id}.jpg"]
+
+    def test_fsync_flushes_new_directories(self, store, tmp_path):
+        capture_id = content_hash(b"durable")
+        with patch('face_liveness_capture.backend.storage._fsync_directory') as sync:
+            store.save(b"durable", fsync=True)
+        shard = tmp_path / capture_id[:2]
+        assert [call.args[0] for call in sync.call_args_list] == [
+            str(shard / capture_id[2:4]), str(shard), str(tmp_path),
+        ]
+
+    def test_rejects_bad_ids(self, store):
+        with pytest.raises(ValueError):
+            store.path("../../etc/passwd")
+
+    def test_delete(self, store):
+        capture_id = store.save(b"data")
+        store.delete(capture_id)
+        assert not store.exists(capture_id)
+        store.delete(capture_id)
+
+
+class TestCaptureListing:
+    """Paged listing without walking the whole store"""
+
+    @pytest.fixture
+    def ids(self, store):
+        return sorted(store.save(bytes([i])) for i in range(40))
+
+    def test_lists_everything_in_order(self, store, ids):
+        assert store.list(limit=None) == ids
+
+    def test_pagination(self, store, ids):
+        pages = []
+        start_after = None
+        while True:
+            page = store.list(start_after=start_after, limit=7)
+            if not page:
+                break
+            pages.extend(page)
+            start_after = page[-1]
+        assert pages == ids
+
+    def test_prefix(self, store, ids):
+        prefix = ids[5][:3]
+        assert store.list(prefix=prefix, limit=None) == [i for i in ids if i.startswith(prefix)]
+
+    def test_only_reads_needed_shards(self, store, ids, monkeypatch):
+        scanned = []
+        real_scandir = os.scandir
+
+        def counting_scandir(path):
+            scanned.append(path)
+            return real_scandir(path)
+
+        monkeypatch.setattr(os, 'scandir', counting_scandir)
+        assert store.list(prefix=ids[0][:4], limit=None) == [ids[0]]
+        assert len(scanned) == 3
+
+
+class TestCaptureFileStorage:
+    """Django Storage adapter"""
+
+    def test_save_open_exists(self, tmp_path):
+        files = CaptureFileStorage(location=str(tmp_path), base_url='/captures/')
+        name = files.save('ignored.jpg', ContentFile(b'image'))
+        capture_id = content_hash(b'image')
+        assert name == f"{capture_id[:2]}/{capture_id[2:4]}/{capture_id}.jpg"
+        assert files.exists(name)
+        assert files.save('other.jpg', ContentFile(b'image')) == name
+        with files.open(name) as fh:
+            assert fh.read() == b'image'
+        assert files.size(name) == 5
+        assert files.url(name) == f'/captures/{name}'
+
+    def test_listdir(self, tmp_path):
+        files = CaptureFileStorage(location=str(tmp_path))
+        name = files.save('x.jpg', ContentFile(b'image'))
+        shard1, shard2, filename = name.split('/')
+        assert files.listdir('') == ([shard1], [])
+        assert files.listdir(f'{shard1}/{shard2}') == ([], [filename])
+
+    def test_foreign_names(self, tmp_path):
+        files = CaptureFileStorage(location=str(tmp_path))
+        assert not files.exists('../secret.txt')
+
+
+class TestStoredCapture:
+    """verify_liveness stores the uploaded JPEG unless it has to re-encode"""
+
+    @pytest.fixture(autouse=True)
+    def passing_checks(self, tmp_path):
+        result_cache.clear()
+        with override_settings(FACE_LIVENESS_CAPTURE_ROOT=str(tmp_path)), \
+                patch('face_liveness_capture.backend.detection.check_frame',
+                      return_value=(None, (10, 20, 30, 40))), \
+                patch('face_liveness_capture.backend.detection.decode_image_bytes',
+                      wraps=detection.decode_image_bytes) as full_decode:
+            yield full_decode
+        result_cache.clear()
+
+    def encode(self, ext):
+        img = np.full((1200, 1600, 3), 90, dtype=np.uint8)
+        return cv2.imencode(ext, img)[1].tobytes()
+
+    def test_jpeg_stored_byte_for_byte(self, passing_checks):
+        data = self.encode('.jpg')
+        result = detection.verify_liveness(data)
+        assert result['success']
+        assert result['capture_id'] == content_hash(data)
+        with open(result['path'], 'rb') as fh:
+            assert fh.read() == data
+        assert result['face'] == [20, 40, 60, 80]
+        passing_checks.assert_not_called()
+
+    def test_png_is_reencoded(self):
+        data = self.encode('.png')
+        result = detection.verify_liveness(data)
+        with open(result['path'], 'rb') as fh:
+            stored = fh.read()
+        assert stored[:2] == b'\xff\xd8'
+        assert result['face'] == [20, 40, 60, 80]
+
+    def test_passport_crop_stores_budgeted_jpeg(self):
+        data = self.encode('.jpg')
+        with override_settings(FACE_LIVENESS_PASSPORT_CROP=True):
+            result = detection.verify_liveness(data)
+        with open(result['path'], 'rb') as fh:
+            stored = fh.read()
+        assert stored != data
+        assert len(stored) <= 50 * 1024
+        assert cv2.imdecode(np.frombuffer(stored, np.uint8), cv2.IMREAD_COLOR).shape == (450, 350, 3)
+        assert result['passport']['bytes'] == len(stored)
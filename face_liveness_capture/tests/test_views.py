@@ -0,0 +1,201 @@
+"""
+Tests for the upload_face view ingest modes
+"""
+
+import asyncio
+import base64
+import io
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, Client, override_settings
+
+UPLOAD_URL = '/face-capture/upload/'
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+@pytest.fixture
+def captured():
+    """Patch verify_liveness and record what the view passed to it"""
+    calls = []
+
+    def fake_verify(image_data):
+        calls.append(image_data)
+        return {"success": True, "path": "x.jpg", "message": "ok"}
+
+    with patch('face_liveness_capture.django_integration.views.verify_liveness', fake_verify):
+        yield calls
+
+
+class TestUploadFaceIngest:
+    """upload_face accepts JSON, raw binary and multipart bodies"""
+
+    def test_json_body(self, client, captured, sample_image):
+        data_url = 'data:image/jpeg;base64,' + base64.b64encode(sample_image).decode()
+        response = client.post(UPLOAD_URL, json.dumps({'image': data_url}),
+                               content_type='application/json')
+
+        assert response.status_code == 200
+        assert bytes(captured[0]) == sample_image
+
+    def test_raw_jpeg_body(self, client, captured, sample_image):
+        response = client.post(UPLOAD_URL, sample_image, content_type='image/jpeg')
+
+        assert response.status_code == 200
+        assert bytes(captured[0]) == sample_image
+
+    def test_raw_body_too_large(self, client, captured, sample_image):
+        with override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=len(sample_image) - 1):
+            response = client.post(UPLOAD_URL, sample_image, content_type='image/jpeg')
+        assert response.status_code == 413
+        assert response.json() == {"success": False, "error": "Request body too large"}
+        assert captured == []
+
+    def test_json_body_too_large(self, client, captured, sample_image):
+        body = json.dumps({'image': base64.b64encode(sample_image).decode()})
+        with override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=len(body) - 1):
+            response = client.post(UPLOAD_URL, body, content_type='application/json')
+        assert response.status_code == 413
+        assert captured == []
+
+    def test_forged_content_length(self, client, captured):
+        response = client.post(UPLOAD_URL, '{"image": "eA=="}', content_type='application/json',
+                               CONTENT_LENGTH='2000000000')
+        assert response.status_code == 413
+        assert captured == []
+
+    def test_json_stream_counts_bytes(self):
+        from django.core.exceptions import RequestDataTooBig
+        from face_liveness_capture.django_integration.views import _LimitedBody
+        body = _LimitedBody(io.BytesIO(b'x' * 100), limit=64)
+        assert body.read(64) == b'x' * 64
+        with pytest.raises(RequestDataTooBig):
+            body.read(64)
+
+    def test_multipart_body(self, client, captured, sample_image):
+        upload = SimpleUploadedFile('face.jpg', sample_image, content_type='image/jpeg')
+        response = client.post(UPLOAD_URL, {'image': upload})
+
+        assert response.status_code == 200
+        assert bytes(captured[0]) == sample_image
+
+    def test_multipart_without_image(self, client, captured):
+        response = client.post(UPLOAD_URL, {'name': 'x'})
+
+        assert response.status_code == 400
+        assert captured == []
+
+    def test_empty_decoded_image_is_invalid(self, client):
+        # "@@@@" holds no base64 characters, so the image decodes to nothing
+        response = client.post(UPLOAD_URL, '{"image": "@@@@"}', content_type='application/json')
+
+        assert response.status_code == 200
+        assert response.json()["success"] is False
+        assert response.json()["error"].startswith("Invalid image")
+
+
+class TestDecodeImageBytes:
+    """Raw bytes decode straight through cv2.imdecode"""
+
+    def test_decode_bytes(self, sample_image):
+        from face_liveness_capture.backend.face_utils import decode_image_bytes
+        img = decode_image_bytes(memoryview(sample_image))
+        assert img.shape == (480, 640, 3)
+
+    def test_decode_garbage(self):
+        from face_liveness_capture.backend.face_utils import decode_image_bytes
+        with pytest.raises(ValueError):
+            decode_image_bytes(b'not an image')
+
+
+class TestUploadFaceBatch:
+    """upload_face_batch accepts JSON and multipart batches"""
+
+    def test_json_batch(self, client):
+        with patch('face_liveness_capture.django_integration.views.verify_liveness_batch',
+                   lambda images: [{"success": True, "path": i} for i in images]):
+            response = client.post('/face-capture/upload/batch/',
+                                   json.dumps({'images': ['a', 'b']}),
+                                   content_type='application/json')
+
+        body = response.json()
+        assert response.status_code == 200
+        assert body['count'] == 2
+        assert [r['path'] for r in body['results']] == ['a', 'b']
+
+    def test_multipart_batch(self, client, sample_image):
+        uploads = [SimpleUploadedFile(f'{i}.jpg', sample_image, content_type='image/jpeg')
+                   for i in range(2)]
+        response = client.post('/face-capture/upload/batch/', {'images': uploads})
+
+        body = response.json()
+        assert response.status_code == 200
+        assert body['count'] == 2
+        assert not any(r['success'] for r in body['results'])
+
+    def test_empty_batch(self, client):
+        response = client.post('/face-capture/upload/batch/', json.dumps({'images': []}),
+                               content_type='application/json')
+        assert response.status_code == 400
+
+
+class TestUploadFaceAsync:
+    """upload_face_async offloads verification to the verify executor"""
+
+    def _post(self, *args, **kwargs):
+        return asyncio.run(AsyncClient().post(*args, **kwargs))
+
+    def test_binary_upload(self, captured, sample_image):
+        response = self._post('/face-capture/upload/async/', sample_image,
+                              content_type='image/jpeg')
+
+        assert response.status_code == 200
+        assert bytes(captured[0]) == sample_image
+
+    def test_runs_off_the_event_loop(self, sample_image):
+        threads = []
+
+        def fake_verify(image_data):
+            threads.append(threading.current_thread().name)
+            return {"success": False, "error": "No face detected"}
+
+        with patch('face_liveness_capture.django_integration.views.verify_liveness', fake_verify):
+            self._post('/face-capture/upload/async/', sample_image, content_type='image/jpeg')
+
+        assert threads[0].startswith('face-liveness-verify')
+
+    def test_rejects_when_busy(self, sample_image):
+        with override_settings(FACE_LIVENESS_ASYNC_MAX_PENDING=0):
+            response = self._post('/face-capture/upload/async/', sample_image,
+                                  content_type='image/jpeg')
+        assert response.status_code == 503
+
+    def test_enforces_csrf(self, sample_image):
+        client = AsyncClient(enforce_csrf_checks=True)
+        response = asyncio.run(client.post('/face-capture/upload/async/', sample_image,
+                                           content_type='image/jpeg'))
+        assert response.status_code == 403
+
+
+class TestCaptureStatusView:
+    """captures/<capture_id>/ reports persistence status"""
+
+    def test_known_capture(self, client):
+        status = {"capture_id": "a" * 32, "status": "failed",
+                  "path": "/srv/captures/aa/aa/x.jpg", "error": "disk full"}
+        with patch('face_liveness_capture.django_integration.views.capture_status',
+                   return_value=status):
+            response = client.get(f'/face-capture/captures/{"a" * 32}/')
+        assert response.status_code == 200
+        assert response.json() == {"success": True, "capture_id": "a" * 32, "status": "failed"}
+
+    def test_unknown_capture(self, client):
+        response = client.get(f'/face-capture/captures/{"0" * 32}/')
+        assert response.status_code == 404
@@ -0,0 +1,261 @@
+"""
+Tests for the streaming liveness session and its ASGI WebSocket endpoint
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.test import override_settings
+
+from face_liveness_capture.backend import metrics
+from face_liveness_capture.backend.landmarks import FEATURE_POINTS, verify_landmark_sequence
+from face_liveness_capture.backend.liveness_session import LivenessSession
+from face_liveness_capture.django_integration import websocket
+from face_liveness_capture.django_integration.session_store import session_store
+from face_liveness_capture.django_integration.websocket import session_stats, websocket_router
+from tests.landmark_faces import canonical_face, posed
+
+WS_PATH = '/face-capture/ws/liveness/'
+
+
+def frame(yaw=0.0, eye_opening=0.0375, offset=0.0):
+    points = posed(canonical_face(eye_opening), yaw=yaw)
+    points[:, 0] += offset
+    return points.tolist()
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    session_store.clear()
+    yield
+    session_store.clear()
+
+
+# Frames that walk through every stage: centred face, blink, left, right
+LIVE_FRAMES = (
+    [frame()] * 2 + [frame(eye_opening=0.01)] * 2 + [frame()] * 2
+    + [frame(yaw=-30)] * 2 + [frame()] + [frame(yaw=30)] * 2
+)
+
+
+class TestLivenessSession:
+    """Incremental stage machine"""
+
+    def test_walks_through_stages(self):
+        session = LivenessSession()
+        transitions = [session.add_landmarks(points) for points in LIVE_FRAMES]
+        assert [t for t in transitions if t] == ["blink", "turn_left", "turn_right", "capture"]
+        assert session.stage == "capture"
+        assert session.frames == len(LIVE_FRAMES)
+
+    def test_off_centre_face_waits(self):
+        session = LivenessSession()
+        assert session.add_landmarks(frame(offset=0.4)) is None
+        assert session.stage == "face"
+
+    def test_blink_before_prompt_does_not_count(self):
+        session = LivenessSession()
+        for points in [frame(eye_opening=0.01), frame(), frame()]:
+            session.add_landmarks(points)
+        assert session.stage == "blink"
+
+    def test_sparse_landmarks(self):
+        points = frame()
+        sparse = {str(i): points[i] for i in FEATURE_POINTS}
+        assert LivenessSession().add_landmarks(sparse) == "blink"
+
+    def test_running_statistics_and_window(self):
+        session = LivenessSession(window=4)
+        for points in [frame()] * 3 + [frame(eye_opening=0.01)] * 3:
+            session.add_landmarks(points)
+        ears = [0.3] * 3 + [0.08] * 3
+        assert session.ear_mean == pytest.approx(np.mean(ears), abs=1e-4)
+        assert session.ear_std == pytest.approx(np.std(ears, ddof=1), abs=1e-4)
+        assert session.window()[:, 0].tolist() == pytest.approx([0.3, 0.08, 0.08, 0.08], abs=1e-4)
+
+    def test_face_from_video_frame(self):
+        session = LivenessSession(aspect=4 / 3)
+        assert session.add_face(None, (240, 320, 3)) is None
+        assert session.add_face((10, 10, 50, 50), (240, 320, 3)) is None
+        assert session.add_face((120, 80, 80, 80), (240, 320, 3)) == "blink"
+
+    def test_landmark_window(self):
+        session = LivenessSession(window=4)
+        session.add_face(None, (240, 320, 3))
+        for yaw in (0, 10, 20, 30, 30, 30):
+            session.add_landmarks(frame(yaw=yaw))
+        frames = session.landmark_window()
+        assert frames.shape == (4, 468, 3)
+        assert session.window()[:, 1].tolist() == pytest.approx([20, 30, 30, 30], abs=0.5)
+        result = verify_landmark_sequence(frames, required=("turn_right",))
+        assert result["live"] and result["events"]["turn_right"] == [(1, 4)]
+        assert session.nbytes == frames[:, FEATURE_POINTS].nbytes + 4 * 3 * 4
+
+    def test_malformed_frame(self):
+        with pytest.raises(ValueError):
+            LivenessSession().add_landmarks([[0.5, 0.5]] * 10)
+
+
+class FakeConnection:
+    """Drives an ASGI application with a scripted WebSocket client"""
+
+    def __init__(self, messages, headers=(), query=b''):
+        self.incoming = [{'type': 'websocket.connect'}] + list(messages)
+        self.sent = []
+        self.scope = {'type': 'websocket', 'path': WS_PATH, 'query_string': query,
+                      'headers': [(k.encode(), v.encode()) for k, v in headers]}
+
+    async def receive(self):
+        if self.incoming:
+            return self.incoming.pop(0)
+        return {'type': 'websocket.disconnect', 'code': 1000}
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def run(self, app=None):
+        app = app or websocket_router(None)
+        asyncio.run(app(self.scope, self.receive, self.send))
+        return self
+
+    def json(self):
+        return [json.loads(m['text']) for m in self.sent if m['type'] == 'websocket.send']
+
+    @property
+    def close_code(self):
+        closes = [m['code'] for m in self.sent if m['type'] == 'websocket.close']
+        return closes[-1] if closes else None
+
+
+def text(payload):
+    return {'type': 'websocket.receive', 'text': json.dumps(payload)}
+
+
+class TestLivenessWebSocket:
+    """ASGI protocol, limits and routing"""
+
+    def test_full_session(self):
+        messages = [text({'landmarks': points}) for points in LIVE_FRAMES]
+        messages.append({'type': 'websocket.receive', 'bytes': b'jpeg'})
+        result = {'success': True, 'path': 'x.jpg', 'message': 'ok'}
+        with patch.object(websocket, 'verify_liveness', return_value=result) as verify:
+            conn = FakeConnection(messages).run()
+        verify.assert_called_once_with(b'jpeg')
+        replies = conn.json()
+        assert [r['stage'] for r in replies if r['type'] == 'stage'] == [
+            'face', 'blink', 'turn_left', 'turn_right', 'capture']
+        assert replies[-1] == {'type': 'result', **result}
+        assert conn.sent[0] == {'type': 'websocket.accept'}
+        assert conn.close_code == 1000
+        assert session_stats()['active'] == 0
+        assert session_stats()['store']['sessions'] == 0
+
+    def test_reconnect_resumes_session(self):
+        first = FakeConnection([text({'landmarks': frame()})]).run()
+        key = first.json()[0]['session']
+        assert first.json()[-1]['stage'] == 'blink'
+        second = FakeConnection([], query=f'session={key}'.encode()).run()
+        resumed = second.json()[0]
+        assert (resumed['session'], resumed['stage'], resumed['frames']) == (key, 'blink', 1)
+        fresh = FakeConnection([], query=b'session=unknown').run()
+        assert fresh.json()[0]['session'] != 'unknown'
+        assert fresh.json()[0]['stage'] == 'face'
+
+    def test_reconnect_does_not_extend_timeout(self):
+        key, session = session_store.create()
+        session.started -= 10
+        with override_settings(FACE_LIVENESS_WEBSOCKET_SESSION_TIMEOUT=5):
+            conn = FakeConnection([text({'landmarks': frame()})], query=f'session={key}'.encode()).run()
+        assert conn.json()[-1] == {'type': 'error', 'error': 'Session timed out'}
+        assert session_store.get(key) is None
+
+    def test_stats_in_metrics(self):
+        session_store.create()
+        body = metrics.render()
+        assert 'face_liveness_websocket_connections 0' in body
+        assert 'face_liveness_sessions 1' in body
+        assert f'face_liveness_session_bytes {session_stats()["store"]["bytes"]}' in body
+
+    def test_session_in_use_refused(self):
+        key, _ = session_store.create()
+        websocket._sessions.attach(key)
+        try:
+            conn = FakeConnection([], query=f'session={key}'.encode()).run()
+        finally:
+            websocket._sessions.attached.discard(key)
+        assert conn.sent == [{'type': 'websocket.close', 'code': 1008}]
+        assert session_stats()['active'] == 0
+
+    def test_evicted_session_closes(self):
+        with override_settings(FACE_LIVENESS_SESSION_STORE_MAX_BYTES=0):
+            messages = [{'type': 'websocket.receive', 'text': '{}'}] * 2
+            conn = FakeConnection(messages)
+            app = websocket_router(None)
+
+            async def receive():
+                message = await FakeConnection.receive(conn)
+                if message.get('text'):
+                    session_store.create()  # a newer session pushes this one out
+                return message
+
+            asyncio.run(app(conn.scope, receive, conn.send))
+        assert conn.json()[-1] == {'type': 'error', 'error': 'Session expired'}
+        assert conn.close_code == 1000
+
+    def test_bad_packet_reports_error_and_continues(self):
+        conn = FakeConnection([text({'landmarks': [1, 2]}),
+                               text({'landmarks': frame()})]).run()
+        replies = conn.json()
+        assert replies[1]['type'] == 'error'
+        assert replies[2]['stage'] == 'blink'
+
+    def test_session_limit(self):
+        with override_settings(FACE_LIVENESS_WEBSOCKET_MAX_SESSIONS=0):
+            conn = FakeConnection([]).run()
+        assert conn.sent == [{'type': 'websocket.close', 'code': 1013}]
+
+    def test_message_too_large(self):
+        with override_settings(FACE_LIVENESS_WEBSOCKET_MAX_MESSAGE_BYTES=100):
+            conn = FakeConnection([text({'landmarks': frame()})]).run()
+        assert conn.close_code == 1009
+
+    def test_frame_limit(self):
+        with override_settings(FACE_LIVENESS_WEBSOCKET_MAX_FRAMES=1):
+            conn = FakeConnection([text({'landmarks': frame(offset=0.4)})] * 2).run()
+        assert conn.json()[-1] == {'type': 'error', 'error': 'Too many frames'}
+        assert conn.close_code == 1008
+
+    def test_timeout(self):
+        class Silent(FakeConnection):
+            async def receive(self):
+                if self.incoming:
+                    return self.incoming.pop(0)
+                await asyncio.sleep(10)
+
+        with override_settings(FACE_LIVENESS_WEBSOCKET_SESSION_TIMEOUT=0.05):
+            conn = Silent([]).run()
+        assert conn.json()[-1] == {'type': 'error', 'error': 'Session timed out'}
+        assert conn.close_code == 1000
+
+    def test_cross_site_origin_refused(self):
+        headers = [('host', 'testserver'), ('origin', 'https://evil.example')]
+        conn = FakeConnection([], headers=headers).run()
+        assert conn.sent == [{'type': 'websocket.close', 'code': 1008}]
+        headers = [('host', 'testserver'), ('origin', 'http://testserver')]
+        assert FakeConnection([], headers=headers).run().sent[0] == {'type': 'websocket.accept'}
+
+    def test_router(self):
+        calls = []
+
+        async def http_app(scope, receive, send):
+            calls.append(scope['type'])
+
+        app = websocket_router(http_app)
+        asyncio.run(app({'type': 'http', 'path': '/'}, None, None))
+        assert calls == ['http']
+        conn = FakeConnection([])
+        conn.scope['path'] = '/elsewhere/'
+        assert conn.run(app).sent == [{'type': 'websocket.close', 'code': 1008}]
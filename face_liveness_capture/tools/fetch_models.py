@@ -0,0 +1,86 @@
+"""
+Download the detector model files into face_liveness_capture/backend/models/.
+
+The Haar cascade ships with OpenCV; the LBP cascade, YuNet and the
+ResNet-10 SSD are published by the OpenCV project and are fetched here so
+they can be packaged with a release::
+
+    python tools/fetch_models.py
+    python tools/fetch_models.py --dest /srv/models yunet
+
+Existing files are kept unless ``--force`` is given.
+"""
+import argparse
+import os
+import sys
+import urllib.request
+
+OPENCV_RAW = "https://raw.githubusercontent.com/opencv"
+MODELS = {
+    "lbp_frontalface": {
+        "lbpcascade_frontalface_improved.xml":
+            f"{OPENCV_RAW}/opencv/4.x/data/lbpcascades/lbpcascade_frontalface_improved.xml",
+    },
+    "yunet": {
+        "face_detection_yunet_2023mar.onnx":
+            "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/"
+            "face_detection_yunet_2023mar.onnx",
+    },
+    "ssd_res10": {
+        "deploy.prototxt":
+            f"{OPENCV_RAW}/opencv/4.x/samples/dnn/face_detector/deploy.prototxt",
+        "res10_300x300_ssd_iter_140000_fp16.caffemodel":
+            f"{OPENCV_RAW}/opencv_3rdparty/dnn_samples_face_detector_20180205_fp16/"
+            "res10_300x300_ssd_iter_140000_fp16.caffemodel",
+    },
+}
+DEFAULT_DEST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "face_liveness_capture", "backend", "models")
+
+
+def fetch(url, path):
+    tmp_path = path + ".part"
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response, open(tmp_path, "wb") as fh:
+            while True:
+                chunk = response.read(1 << 16)
+                if not chunk:
+                    break
+                fh.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download detector model files")
+    parser.add_argument("engines", nargs="*",
+                        help=f"engines to fetch: {', '.join(sorted(MODELS))} (default: all)")
+    parser.add_argument("--dest", default=DEFAULT_DEST, help="model directory")
+    parser.add_argument("--force", action="store_true", help="download existing files again")
+    args = parser.parse_args(argv)
+    unknown = set(args.engines) - set(MODELS)
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(sorted(unknown))}")
+
+    os.makedirs(args.dest, exist_ok=True)
+    failed = False
+    for engine in args.engines or sorted(MODELS):
+        for filename, url in MODELS[engine].items():
+            path = os.path.join(args.dest, filename)
+            if os.path.exists(path) and not args.force:
+                print(f"{engine}: {filename} already present")
+                continue
+            try:
+                fetch(url, path)
+            except OSError as e:
+                print(f"{engine}: {filename} failed: {e}", file=sys.stderr)
+                failed = True
+                continue
+            print(f"{engine}: {filename} ({os.path.getsize(path)} bytes)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+HTTP load generator for the upload endpoint.
+
+Fetches a CSRF token from the widget page, then drives /face-capture/upload/
+with images from a local corpus and reports throughput and latency
+percentiles per outcome ("saved", a rejection reason such as
+"no_face_detected", "http_503", "transport_error").
+
+Two modes:
+
+* closed loop (``--concurrency N``): N clients send back to back, which
+  measures the maximum throughput of the instance;
+* open loop (``--rate R``): requests start R times per second regardless of
+  how fast the server answers; latency is measured from the scheduled start
+  so queueing shows up instead of being hidden.
+
+Only the standard library is needed, and the tool has no outside services,
+so it runs against ``manage.py runserver`` or the docker-compose stack::
+
+    python -m benchmarks.corpus corpus/ --per-resolution 3
+    python tools/load_test.py --corpus corpus/ --concurrency 8 --duration 30
+    python tools/load_test.py --rate 20 --duration 60 --json-out load.json
+
+Without ``--corpus`` a small synthetic corpus is generated in memory. Each
+request gets distinct bytes so the server's result cache does not answer
+it; ``--allow-cache-hits`` resends identical images instead. Every saved
+upload is written to the server's capture storage.
+"""
+import argparse
+import base64
+import glob
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+
+
+def load_corpus(directory, resolutions):
+    """List of (content_type, bytes) from `directory`, or synthetic frames."""
+    if directory:
+        images = []
+        for path in sorted(glob.glob(os.path.join(directory, "*"))):
+            content_type = CONTENT_TYPES.get(os.path.splitext(path)[1].lower())
+            if content_type:
+                with open(path, "rb") as fh:
+                    images.append((content_type, fh.read()))
+        if not images:
+            sys.exit(f"No images found in {directory}")
+        return images
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from benchmarks.corpus import corpus
+    return [("image/jpeg", data) for frames in corpus(resolutions).values() for data in frames]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def outcome_of(status, body):
+    """Bounded outcome label, matching the server's metrics labels."""
+    if status != 200:
+        return f"http_{status}"
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return "invalid_response"
+    if payload.get("success"):
+        return "saved"
+    error = payload.get("error") or "unknown"
+    return error.split(":", 1)[0].strip().lower().replace(" ", "_")
+
+
+class Client:
+    """Keep-alive connection per thread, sharing one CSRF token."""
+
+    def __init__(self, base_url, upload_path, widget_path, mode, timeout):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.upload_path = upload_path
+        self.mode = mode
+        self.timeout = timeout
+        self._local = threading.local()
+        self.csrf_token = self._fetch_csrf_token(widget_path)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _fetch_csrf_token(self, widget_path):
+        conn = self._connection()
+        try:
+            conn.request("GET", widget_path)
+            response = conn.getresponse()
+            response.read()
+        except OSError as e:
+            sys.exit(f"Cannot reach {self.scheme}://{self.host}:{self.port}{widget_path}: {e}")
+        cookies = SimpleCookie()
+        for header in response.headers.get_all("Set-Cookie") or []:
+            cookies.load(header)
+        if "csrftoken" not in cookies:
+            sys.exit(f"No csrftoken cookie from {widget_path} (status {response.status})")
+        return cookies["csrftoken"].value
+
+    def _body(self, content_type, data):
+        if self.mode == "binary":
+            return content_type, data
+        if self.mode == "json":
+            url = f"data:{content_type};base64," + base64.b64encode(data).decode()
+            return "application/json", json.dumps({"image": url}).encode()
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="image"; filename="capture"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        return f"multipart/form-data; boundary={boundary}", body
+
+    def prepare(self, images, unique):
+        """Return a function producing the request body for image `i`.
+
+        With `unique`, a random suffix after the end-of-image marker makes
+        every body distinct, so the server's content-hash result cache
+        cannot answer for it. Otherwise bodies are built once up front.
+        """
+        if unique:
+            def body(i):
+                content_type, data = images[i % len(images)]
+                return self._body(content_type, data + uuid.uuid4().bytes)
+            return body
+        bodies = [self._body(content_type, data) for content_type, data in images]
+        return lambda i: bodies[i % len(bodies)]
+
+    def upload(self, content_type, body):
+        """Send one upload; returns the outcome label."""
+        headers = {
+            "Content-Type": content_type,
+            "X-CSRFToken": self.csrf_token,
+            "Cookie": f"csrftoken={self.csrf_token}",
+            "Referer": f"{self.scheme}://{self.host}" + (f":{self.port}" if self.port else "") + "/",
+        }
+        try:
+            conn = self._connection()
+            conn.request("POST", self.upload_path, body=body, headers=headers)
+            response = conn.getresponse()
+            return outcome_of(response.status, response.read())
+        except (OSError, http.client.HTTPException):
+            self._drop_connection()
+            return "transport_error"
+
+
+class Recorder:
+    """Latencies per outcome, ignoring requests started during warm-up."""
+
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.latencies = {}
+        self._lock = threading.Lock()
+
+    def record(self, started, outcome):
+        latency = time.perf_counter() - started
+        if started < self.measure_from:
+            return
+        with self._lock:
+            self.latencies.setdefault(outcome, []).append(latency)
+
+
+def run_closed_loop(client, bodies, recorder, concurrency, deadline, max_requests):
+    counter = iter(range(max_requests)) if max_requests else None
+    lock = threading.Lock()
+
+    def worker(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            if counter is not None:
+                with lock:
+                    if next(counter, None) is None:
+                        return
+            started = time.perf_counter()
+            recorder.record(started, client.upload(*bodies(i)))
+            i += concurrency
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open_loop(client, bodies, recorder, rate, deadline, max_requests, max_in_flight):
+    interval = 1.0 / rate
+
+    def send(scheduled, i):
+        recorder.record(scheduled, client.upload(*bodies(i)))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        start = time.perf_counter()
+        i = 0
+        while True:
+            scheduled = start + i * interval
+            if scheduled >= deadline or (max_requests and i >= max_requests):
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, scheduled, i)
+            i += 1
+
+
+def summarize(latencies, elapsed):
+    rows = {}
+    everything = []
+    for outcome, values in sorted(latencies.items()):
+        values.sort()
+        everything.extend(values)
+        rows[outcome] = _row(values, elapsed)
+    everything.sort()
+    rows["all"] = _row(everything, elapsed)
+    return rows
+
+
+def _row(values, elapsed):
+    return {
+        "count": len(values),
+        "throughput": len(values) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": (values[-1] if values else 0.0) * 1000,
+    }
+
+
+def print_report(rows, elapsed):
+    print(f"\nMeasured {elapsed:.1f}s")
+    print(f"{'outcome':<22}{'count':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for outcome, row in rows.items():
+        print(f"{outcome:<22}{row['count']:>8}{row['throughput']:>10.1f}{row['p50_ms']:>10.1f}"
+              f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the face upload endpoint")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--upload-path", default="/face-capture/upload/")
+    parser.add_argument("--widget-path", default="/face-capture/",
+                        help="page that sets the CSRF cookie")
+    parser.add_argument("--corpus", help="directory of .jpg/.png/.webp images")
+    parser.add_argument("--resolutions", nargs="+", default=["vga", "hd"],
+                        help="synthetic corpus resolutions when --corpus is not given")
+    parser.add_argument("--mode", choices=["binary", "json", "multipart"], default="binary",
+                        help="request body format")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=4, help="closed-loop clients")
+    load.add_argument("--rate", type=float, help="open-loop requests per second")
+    parser.add_argument("--allow-cache-hits", action="store_true",
+                        help="resend identical bytes (measures the result cache)")
+    parser.add_argument("--max-in-flight", type=int, default=256,
+                        help="open-loop limit on outstanding requests")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds excluded from results")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json-out", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    images = load_corpus(args.corpus, args.resolutions)
+    client = Client(args.base_url.rstrip("/"), args.upload_path, args.widget_path,
+                    args.mode, args.timeout)
+    bodies = client.prepare(images, unique=not args.allow_cache_hits)
+
+    start = time.perf_counter()
+    warmup = 0 if args.requests else args.warmup
+    recorder = Recorder(start + warmup)
+    deadline = start + warmup + args.duration
+    if args.rate:
+        print(f"Open loop at {args.rate:g} req/s for {args.duration:g}s ({len(images)} images)")
+        run_open_loop(client, bodies, recorder, args.rate, deadline, args.requests,
+                      args.max_in_flight)
+    else:
+        print(f"Closed loop with {args.concurrency} clients for {args.duration:g}s "
+              f"({len(images)} images)")
+        run_closed_loop(client, bodies, recorder, args.concurrency, deadline, args.requests)
+    elapsed = time.perf_counter() - (start + warmup)
+
+    rows = summarize(recorder.latencies, elapsed)
+    print_report(rows, elapsed)
+    if args.json_out:
+        report = {
+            "base_url": args.base_url,
+            "mode": "open" if args.rate else "closed",
+            "rate": args.rate,
+            "concurrency": None if args.rate else args.concurrency,
+            "body": args.mode,
+            "duration_s": elapsed,
+            "outcomes": rows,
+        }
+        with open(args.json_out, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()